@@ -1,543 +1,1040 @@
 import asyncio
+import collections
 import websockets
-import json
+import codec
 import random
 import time
-from cartas import white_cards 
-from cartas import black_cards
+from deck import Deck, Mao, catalogo_brancas, catalogo_pretas, versao_catalogo
+from rodada import Rodada
+from placar import Placar
+from cache_frames import frames_estaticos
+from timers import agendador
+from eventos import Entrar, Sair, Mensagem, Tick
+import registro
+import metricas
 import os
-import traceback
+import sys
+import math
+from urllib.parse import parse_qs, urlsplit
 # import random # Removido import duplicado
 
-# --- Server State ---
-clients = set()
-# {websocket: {"score": 0, "submitted_this_round": False, "voted_this_round": False, "hand": []}}
-players = {}
-# Combinando as duas listas de cartas brancas fornecidas
-# A segunda lista fornecida parece mais com cartas pretas/perguntas
-current_black_card = None
-submitted_white_cards = [] # [{"player": websocket, "card": card_text}]
-votes = {} # {card_text: count}
+# --- Configuração do jogo (compartilhada por todas as salas) ---
 max_points = 2
 min_players = 2 # Mínimo de jogadores para iniciar
 HAND_SIZE = 7 # Tamanho da mão de cartas brancas de cada jogador
-
-# Game state
-game_state = "waiting_for_players" # "waiting_for_players", "starting_countdown", "in_game", "game_over"
-start_timer_task = None # Task para o countdown
-countdown_seconds_left = 0
 COUNTDOWN_DURATION = 10 # Segundos para o countdown
+GAME_OVER_DELAY = 10 # Tempo para o cliente exibir "Game Over" antes da revanche
+ROUND_RESULT_DELAY = 3 # Pausa para o frontend mostrar o resultado da rodada
+# Prazos das fases da rodada: quando vencem, o servidor joga pelos jogadores ausentes
+# (carta aleatória da mão / voto aleatório), para um jogador AFK não travar a sala
+SUBMIT_TIMEOUT = 60 # Segundos para submeter a carta branca
+VOTE_TIMEOUT = 30 # Segundos para votar
+EVENTOS_MAX = 256 # Eventos pendentes na fila de cada sala antes de os handlers esperarem
+
+# --- Máquina de estados da sala ---
+# Estados (os mesmos nomes chegam aos clientes em game_state_update) e as transições
+# permitidas; update_game_state recusa qualquer outra. Dentro de "in_game" a fase da
+# rodada (envio, votação, apurada) fica em Rodada.
+TRANSICOES_DE_ESTADO = {
+    "waiting_for_players": {"starting_countdown"},
+    "starting_countdown": {"waiting_for_players", "in_game"},
+    "in_game": {"game_over"},
+    "game_over": {"waiting_for_players"},
+}
+
+# --- Protocolo por IDs ---
+# Clientes que conectam com `?cartas=ids` recebem só os IDs inteiros das cartas e
+# traduzem pelo catálogo, baixado uma única vez. Se o cliente informar a versão que
+# já tem em cache (`&catalogo=<versao>`), o catálogo nem é reenviado.
+# Com `lote=1`, tudo o que a sala mandar para o cliente num mesmo tick do event loop
+# chega em um único frame {"action": "batch", "messages": [...]}.
+# O formato dos frames (JSON ou msgpack) é negociado pelo subprotocolo (ver codec.py).
+MODO_IDS = "ids"
+mensagem_catalogo = {
+    "action": "catalogo",
+    "versao": versao_catalogo,
+    "brancas": catalogo_brancas.textos,
+    "pretas": catalogo_pretas.textos,
+}
+# Mensagens que não dependem do destinatário são codificadas uma vez por processo e
+# codec e reaproveitadas pelo cache de frames (ver cache_frames.py e frame_estatico)
+
+
+def opcoes_da_conexao(websocket):
+    """Parâmetros da query string da conexão (ex.: /sala/1234?cartas=ids&catalogo=ab12)."""
+    request = getattr(websocket, "request", None)
+    if request is None:
+        return {}
+    query = parse_qs(urlsplit(request.path).query)
+    return {chave: valores[-1] for chave, valores in query.items()}
+
+
+def id_da_mensagem(data):
+    """ID da carta branca em uma mensagem do cliente: `id` inteiro ou, no protocolo antigo, o texto em `card`."""
+    card_id = data.get("id")
+    if isinstance(card_id, int) and not isinstance(card_id, bool):
+        return card_id if 0 <= card_id < len(catalogo_brancas) else None
+    card_text = data.get("card")
+    # Texto -> ID pelo catálogo (O(1)); cartas desconhecidas viram None
+    return catalogo_brancas.id(card_text) if isinstance(card_text, str) else None
+
+
+class GameRoom:
+    """Estado e lógica de uma sala de jogo.
+
+    Antes cada sala era um processo `app.py` separado com o estado em variáveis
+    globais. Agora cada sala é uma instância, e um único event loop asyncio
+    hospeda quantas salas forem necessárias (ver rooms.py).
+    """
+
+    def __init__(self, codigo):
+        self.codigo = str(codigo)
+        self.log = registro.com(sala=self.codigo) # Todo registro da sala leva o código dela
+
+        # --- Server State ---
+        self.clients = set()
+        self.clientes_ids = set() # Subconjunto de clients que usa o protocolo por IDs
+        self.clientes_lote = set() # Subconjunto de clients que aceita o envelope "batch"
+        self.codecs = {} # {websocket: Codec} negociado na conexão (ver codec.py)
+        self.clientes_por_codec = {} # {Codec: set(websockets)}, só codecs em uso
+        self.filas_saida = {} # {websocket: [frames]} a enviar no fim do tick atual
+        self.descarga_agendada = False
+        # {websocket: {"nome": "", "submitted_this_round": False, "voted_this_round": False,
+        #              "hand": Mao, "hand_seq": 0, "hand_removidas": [], "id": 1}}
+        # hand_seq numera as mensagens de mão enviadas ao jogador; hand_removidas guarda as
+        # cartas que saíram da mão desde a última mensagem (vão no próximo mao_delta)
+        self.players = {}
+        # Baralhos da sala (IDs inteiros, compra sem reposição; ver deck.py)
+        self.baralho_brancas = Deck(catalogo_brancas)
+        self.baralho_pretas = Deck(catalogo_pretas)
+        self.current_black_card = None
+        self.current_black_card_id = None
+        # Placar versionado, por ID de jogador (ver placar.py)
+        self.placar = Placar()
+        self.proximo_id_jogador = 1
+        # Submissões e votos da rodada atual (ver rodada.py)
+        self.rodada = Rodada()
+
+        # Game state
+        self.game_state = "waiting_for_players" # "waiting_for_players", "starting_countdown", "in_game", "game_over"
+        self.countdown_timer = None # Prazo no agendador compartilhado (timers.py)
+        self.countdown_deadline = None # loop.time() em que o countdown termina
+        self.prazo_fase = None # Prazo da fase atual da rodada (envio ou votação), no mesmo agendador
+        self.fase_atual = None # (fase, loop.time() do início), para a métrica de duração das fases
+        # Transições de fase (ver enfileirar_transicao)
+        self.transicoes = collections.deque() # [(corrotina, args)] disparadas pelo evento atual
+        self.prazo_transicao = None # Transição agendada para depois de uma pausa (resultado, game over)
+
+        # Ator da sala (ver executar)
+        self.eventos = asyncio.Queue(EVENTOS_MAX)
+        self.tarefa_ator = None # Criada no primeiro evento
+        self.encerrada = False
+        self.conexoes = 0 # Handlers ativos, inclusive os que ainda não tiveram o Entrar aplicado
+        self.eventos_processados = 0
+        self.tratadores = {Entrar: self.ao_entrar, Sair: self.ao_sair, Mensagem: self.ao_receber, Tick: self.ao_tick}
+        # Ações dos clientes: (estados em que valem, None = qualquer um; tratador)
+        self.acoes = {
+            "resync_mao": (None, self.acao_resync_mao),
+            "resync_placar": (None, self.acao_resync_placar),
+            "get_black_card": ({"in_game"}, self.acao_get_black_card),
+            "submit_white_card": ({"in_game"}, self.acao_submit_white_card),
+            "nome": ({"in_game"}, self.acao_nome),
+            "vote": ({"in_game"}, self.acao_vote),
+        }
+
+    # --- Helper Functions ---
+
+    # --- Saída ---
+    # Tudo que a sala envia passa por filas por cliente. O que for enfileirado durante
+    # um mesmo tick do event loop sai junto em descarregar(): clientes com `?lote=1`
+    # recebem um único frame {"action": "batch", "messages": [...]}, os demais recebem
+    # os frames um a um, como antes. Cada mensagem é serializada uma vez por codec em uso.
+
+    def enfileirar(self, clientes, frame, action):
+        """Agenda um frame já serializado para os clientes; o envio acontece no fim do tick."""
+        metricas.mensagens_enviadas.inc(action, len(clientes))
+        filas = self.filas_saida
+        for websocket in clientes:
+            fila = filas.get(websocket)
+            if fila is None:
+                filas[websocket] = [frame]
+            else:
+                fila.append(frame)
+        if filas and not self.descarga_agendada:
+            self.descarga_agendada = True
+            asyncio.get_running_loop().call_soon(self.descarregar)
+
+
+    def descarregar(self):
+        """Envia as filas do tick, agrupando clientes que receberiam exatamente os mesmos frames."""
+        self.descarga_agendada = False
+        inicio = time.perf_counter()
+        filas, self.filas_saida = self.filas_saida, {}
+        # Numa rodada típica quase todos recebem a mesma sequência (broadcasts), então
+        # cada grupo é serializado uma vez e escrito com o broadcast nativo do websockets.
+        # Conexões fechadas são ignoradas; a limpeza fica no finally do handler de cada uma.
+        grupos = {}
+        for websocket, frames in filas.items():
+            if websocket not in self.clients:
+                continue
+            chave = (self.codecs[websocket], websocket in self.clientes_lote and len(frames) > 1, tuple(frames))
+            grupo = grupos.get(chave)
+            if grupo is None:
+                grupos[chave] = [websocket]
+            else:
+                grupo.append(websocket)
+        for (codec_grupo, em_lote, frames), conexoes in grupos.items():
+            if em_lote:
+                # O envelope é montado a partir dos frames já codificados, sem decodificar nada
+                websockets.broadcast(conexoes, codec_grupo.lote(frames))
+            else:
+                for frame in frames:
+                    websockets.broadcast(conexoes, frame)
+        metricas.duracao_descarga.observar(time.perf_counter() - inicio)
+
+
+    async def broadcast(self, message):
+        """Envia mensagem a todos os clientes conectados."""
+        # print(f"Broadcasting: {message}") # Debugging broadcast
+        # Serializa UMA vez por codec, não por destinatário
+        for codec_conexoes, conexoes in self.clientes_por_codec.items():
+            self.enfileirar(conexoes, codec_conexoes.codificar(message), message["action"])
+
+
+    async def broadcast_cartas(self, message_texto, message_ids):
+        """Broadcast de mensagem com cartas: IDs para quem usa o catálogo, textos para os demais."""
+        for codec_conexoes, conexoes in self.clientes_por_codec.items():
+            if self.clientes_ids:
+                clientes_ids = conexoes & self.clientes_ids
+                if clientes_ids:
+                    self.enfileirar(clientes_ids, codec_conexoes.codificar(message_ids), message_ids["action"])
+                clientes_texto = conexoes - self.clientes_ids
+            else:
+                clientes_texto = conexoes
+            if clientes_texto:
+                self.enfileirar(clientes_texto, codec_conexoes.codificar(message_texto), message_texto["action"])
+
+
+    async def send_to_client(self, websocket, message):
+        """Envia mensagem a um cliente específico, tratando desconexões."""
+        codec_conexao = self.codecs.get(websocket)
+        if codec_conexao is not None:
+            await self.send_frame(websocket, codec_conexao.codificar(message), message["action"])
+
+
+    async def send_frame(self, websocket, frame, action):
+        """Envia um frame já serializado (no codec do cliente) a um cliente específico."""
+        # Verifica se o websocket ainda está no set clients antes de enfileirar
+        if websocket in self.clients:
+            self.enfileirar((websocket,), frame, action)
+
+
+    def registrar_no_placar(self, websocket):
+        """Copia o nome do jogador para o placar, que guarda a pontuação (não envia nada)."""
+        dados = self.players[websocket]
+        self.placar.definir(dados["id"], dados["nome"], self.placar.pontos(dados["id"]))
+
+
+    async def publicar_placar(self):
+        """Broadcast das alterações do placar desde a última publicação, se houver alguma."""
+        mensagem = self.placar.publicar()
+        if mensagem:
+            await self.broadcast(mensagem)
+
+
+    def mensagem_mao(self, websocket):
+        """Mensagem nova_mao com a mão inteira do jogador (IDs ou textos, conforme o cliente).
+
+        É o ponto de partida da sequência de deltas e também a resposta ao
+        resync_mao, então consome um número de sequência.
+        """
+        dados = self.players[websocket]
+        dados["hand_seq"] += 1
+        dados["hand_removidas"] = []
+        mao = dados["hand"]
+        if websocket in self.clientes_ids:
+            return {"action": "nova_mao", "seq": dados["hand_seq"], "ids": list(mao)}
+        return {"action": "nova_mao", "seq": dados["hand_seq"], "cartas": [catalogo_brancas.texto(i) for i in mao]}
+
+
+    def mensagem_mao_delta(self, websocket, adicionadas):
+        """Mensagem mao_delta: só as cartas que entraram e saíram da mão desde a última mensagem.
+
+        O cliente aplica o delta se `seq` for o seguinte ao último que recebeu;
+        se houver um buraco na sequência, ele pede resync_mao e recebe a mão inteira.
+        """
+        dados = self.players[websocket]
+        dados["hand_seq"] += 1
+        removidas = dados["hand_removidas"]
+        dados["hand_removidas"] = []
+        if websocket in self.clientes_ids:
+            return {"action": "mao_delta", "seq": dados["hand_seq"], "cards_added": adicionadas, "cards_removed": removidas}
+        texto = catalogo_brancas.texto
+        return {"action": "mao_delta", "seq": dados["hand_seq"],
+                "cards_added": [texto(i) for i in adicionadas], "cards_removed": [texto(i) for i in removidas]}
+
+
+    def frame_estatico(self, websocket, chave, construir):
+        """Frame pré-codificado (no codec do cliente) da mensagem que `chave` identifica."""
+        return frames_estaticos.obter(self.codecs[websocket], chave, construir)
+
+
+    async def broadcast_estatico(self, chave, construir, construir_ids=None):
+        """Broadcast pelo cache de frames; com `construir_ids`, quem usa o catálogo recebe a versão com IDs.
+
+        As chaves começam pela action da mensagem (ex.: ("next_round",)).
+        """
+        for codec_conexoes, conexoes in self.clientes_por_codec.items():
+            if construir_ids is not None and self.clientes_ids:
+                clientes_ids = conexoes & self.clientes_ids
+                if clientes_ids:
+                    self.enfileirar(clientes_ids, frames_estaticos.obter(codec_conexoes, chave + (MODO_IDS,), construir_ids), chave[0])
+                conexoes = conexoes - self.clientes_ids
+            if conexoes:
+                self.enfileirar(conexoes, frames_estaticos.obter(codec_conexoes, chave, construir), chave[0])
+
+
+    def chave_carta_preta(self):
+        # O texto (e o significado do ID) dependem da versão do catálogo
+        return ("black_card", versao_catalogo, self.current_black_card_id)
+
+
+    def frame_carta_preta(self, websocket):
+        """Frame black_card da rodada atual para um cliente específico."""
+        if websocket in self.clientes_ids:
+            card_id = self.current_black_card_id
+            return self.frame_estatico(websocket, self.chave_carta_preta() + (MODO_IDS,), lambda: {"action": "black_card", "id": card_id})
+        texto = self.current_black_card
+        return self.frame_estatico(websocket, self.chave_carta_preta(), lambda: {"action": "black_card", "card": texto})
+
+
+    def get_player_count(self):
+        """Retorna o número de jogadores conectados (excluindo possíveis espectadores, se houvesse distinção)."""
+        # Conta quantos websockets estão no dicionário players (representam jogadores ativos)
+        return len(self.players)
+
+    async def update_game_state(self, new_state, message=""):
+        """Atualiza o estado do jogo e broadcasta a mudança (só transições de TRANSICOES_DE_ESTADO)."""
+        if self.game_state == new_state:
+            return
+        if new_state not in TRANSICOES_DE_ESTADO[self.game_state]:
+            self.log.aviso("transicao_invalida", de=self.game_state, para=new_state)
+            return
+        self.game_state = new_state
+        self.log.info("estado", estado=self.game_state, mensagem=message)
+        await self.broadcast({"action": "game_state_update", "state": self.game_state, "message": message})
+
+    # --- Transições ---
+    # Mudanças de fase (abrir a votação, apurar, nova rodada, fim de jogo, revanche) não rodam
+    # no loop de recepção de quem as disparou: o evento só valida e enfileira, e o ator da sala
+    # executa as transições logo depois dele, uma de cada vez, na ordem. As pausas entre fases
+    # são prazos no agendador compartilhado (timers.py), não asyncio.sleep, e voltam ao ator
+    # como eventos Tick; nenhum cliente fica esperando o ritmo do jogo.
+
+    def enfileirar_transicao(self, transicao, *args):
+        """Executa a transição depois do evento atual (só dentro do ator)."""
+        self.transicoes.append((transicao, args))
+
+
+    def agendar_transicao(self, atraso, transicao, *args):
+        """Enfileira a transição daqui a `atraso` segundos (substitui a que estava agendada)."""
+        self.cancelar_transicao_agendada()
+        if atraso <= 0:
+            self.enfileirar_transicao(transicao, *args)
+        else:
+            self.prazo_transicao = agendador().agendar_em(atraso, self.postar_tick, transicao, *args)
 
-# --- Helper Functions ---
 
-async def broadcast(message):
-    """Envia mensagem a todos os clientes conectados."""
-    if clients:
-        # print(f"Broadcasting: {message}") # Debugging broadcast
-        # Usa list() para criar uma cópia e evitar "Set changed size during iteration" se um cliente desconectar durante o broadcast
-        # Envia em paralelo usando gather
-        await asyncio.gather(*[send_to_client(client, message) for client in list(clients)])
+    def cancelar_transicao_agendada(self):
+        if self.prazo_transicao is not None:
+            self.prazo_transicao.cancelar()
+            self.prazo_transicao = None
 
 
-async def send_to_client(websocket, message):
-    """Envia mensagem a um cliente específico, tratando desconexões."""
-    # Verifica se o websocket ainda está no set clients antes de tentar enviar
-    if websocket in clients:
-        try:
-            # Use asyncio.wait_for para adicionar um timeout ao envio (opcional, mas pode evitar hangs)
-            # await asyncio.wait_for(websocket.send(json.dumps(message)), timeout=5.0) # Exemplo com timeout
-             await websocket.send(json.dumps(message))
-            # print(f"Mensagem enviada para {websocket.remote_address}: {message}") # Debugging send sucesso
-        except websockets.exceptions.ConnectionClosed:
-            # Esta exceção é esperada se o cliente desconectar, não precisa de erro grave
-            print(f"Falha ao enviar mensagem para {websocket.remote_address}, conexão já fechada.")
-            # A limpeza deste cliente será tratada no finally do handler dele
-        except Exception as e:
-            # Captura outros erros de envio (buffer cheio, etc.)
-            print(f"Erro ao enviar mensagem para {websocket.remote_address}: {e}")
-            # O handler deste cliente eventualmente terá seu loop encerrado ou exceção tratada.
-
-
-def get_player_count():
-    """Retorna o número de jogadores conectados (excluindo possíveis espectadores, se houvesse distinção)."""
-    # Conta quantos websockets estão no dicionário players (representam jogadores ativos)
-    return len(players)
-
-async def update_game_state(new_state, message=""):
-    """Atualiza o estado do jogo e broadcasta a mudança."""
-    global game_state
-    if game_state != new_state:
-        game_state = new_state
-        print(f"Game State changed to: {game_state}. Message: {message}") # Debugging state change
-        await broadcast({"action": "game_state_update", "state": game_state, "message": message})
-
-# --- Game Logic Functions ---
-
-async def start_countdown():
-    """Inicia o countdown para começar o jogo."""
-    global game_state, countdown_seconds_left, start_timer_task
-    # Garante que o countdown só inicie se estiver no estado de espera e houver jogadores suficientes
-    if game_state == "waiting_for_players" and get_player_count() >= min_players:
-        await update_game_state("starting_countdown", f"Game starting in {COUNTDOWN_DURATION} seconds...")
-        countdown_seconds_left = COUNTDOWN_DURATION
-        # Cancela a task anterior caso start_countdown seja chamado novamente
-        if start_timer_task and not start_timer_task.done():
-            start_timer_task.cancel()
-            try:
-                 await start_timer_task # Aguarda a task ser cancelada (evita warning)
-            except asyncio.CancelledError:
-                 pass
-        start_timer_task = asyncio.create_task(run_countdown_timer())
-    # else: # Debugging
-        # print(f"Não iniciou countdown. State: {game_state}, Players: {get_player_count()}")
+    # --- Game Logic Functions ---
 
+    async def start_countdown(self):
+        """Inicia o countdown para começar o jogo.
 
-async def run_countdown_timer():
-    """Tarefa assíncrona que executa o timer do countdown."""
-    global countdown_seconds_left, start_timer_task
-    try:
-        while countdown_seconds_left > 0:
-            # Verifica se o número de jogadores ainda é suficiente DENTRO do loop do timer
-            if get_player_count() < min_players:
-                 print("Número de jogadores insuficiente durante countdown. Cancelando.") # Debugging
-                 # Levanta CancelledError para ser pego na exceção e ir para finally
-                 raise asyncio.CancelledError
-
-            await broadcast({"action": "countdown", "seconds": countdown_seconds_left})
-            await asyncio.sleep(1)
-            countdown_seconds_left -= 1
-
-        # Timer terminou (sem ser cancelado)
-        if get_player_count() >= min_players:
-            await start_game()
-            
+        Os clientes recebem só o prazo final (relógio do servidor, ver `relogio`) e
+        exibem a contagem sozinhos; nada é reenviado a cada segundo. O fim do
+        countdown vem do agendador compartilhado por todas as salas (timers.py).
+        """
+        # Garante que o countdown só inicie se estiver no estado de espera e houver jogadores suficientes
+        if self.game_state == "waiting_for_players" and self.get_player_count() >= min_players:
+            await self.update_game_state("starting_countdown", f"Game starting in {COUNTDOWN_DURATION} seconds...")
+            # Descarta um prazo anterior caso start_countdown seja chamado novamente
+            self.cancelar_countdown()
+            self.countdown_deadline = asyncio.get_running_loop().time() + COUNTDOWN_DURATION
+            self.countdown_timer = agendador().agendar(self.countdown_deadline, self.postar_tick, self.fim_do_countdown)
+            await self.broadcast(self.mensagem_countdown())
+        # else: # Debugging
+            # print(f"Não iniciou countdown. State: {self.game_state}, Players: {self.get_player_count()}")
+
+
+    def mensagem_countdown(self):
+        """Prazo do countdown em ms no relógio do servidor (`seconds` para clientes antigos)."""
+        restante = self.countdown_deadline - asyncio.get_running_loop().time()
+        return {"action": "countdown", "deadline": round(self.countdown_deadline * 1000), "seconds": max(0, math.ceil(restante))}
+
+
+    def cancelar_countdown(self):
+        if self.countdown_timer is not None:
+            self.countdown_timer.cancelar()
+            self.countdown_timer = None
+        self.countdown_deadline = None
+
+
+    async def fim_do_countdown(self):
+        """Chamado pelo agendador quando o prazo do countdown vence."""
+        self.countdown_timer = None
+        if self.game_state != "starting_countdown":
+            return
+        if self.get_player_count() >= min_players:
+            await self.start_game()
         else:
-            # Esta parte só seria atingida se o get_player_count() mudasse exatamente após o loop
-            # O raise CancelledError acima lida melhor com a queda de jogadores
-            print("Countdown terminou, mas jogadores insuficientes (Edge case?).") # Debugging
-            await update_game_state("waiting_for_players", "Not enough players. Countdown stopped.")
-
-    except asyncio.CancelledError:
-        print("Countdown timer task was cancelled.") # Debugging
-        # O estado será definido para waiting_for_players no handler do cliente que causou a queda de jogadores.
-        # Ou podemos definir aqui se quisermos:
-        # if game_state == "starting_countdown": # Evita mudar estado se já for game over, etc.
-        #      await update_game_state("waiting_for_players", "Not enough players. Countdown stopped.")
-    except Exception as e:
-         print(f"Erro inesperado no countdown timer: {e}")
-         traceback.print_exc() # Imprime o traceback do erro no timer
-
-
-async def start_game():
-    """Inicia a primeira rodada do jogo."""
-    global game_state
-    print("Starting game...") # Debugging
-    # Resetar pontuações APENAS se quisermos um jogo completamente novo a cada vez que atinge min_players
-    # Caso contrário, as pontuações persistem para quem continua conectado
-    # for player_data in players.values():
-    #     player_data["score"] = 0
-
-    await update_game_state("in_game", "Game started!")
-    # Começa a primeira rodada
-    await start_new_round()
-
-
-async def start_new_round():
-    """Prepara e inicia uma nova rodada."""
-    global current_black_card, submitted_white_cards, votes
-
-    print("Starting new round...") # Debugging
-
-    # Resetar estado da rodada
-    submitted_white_cards.clear()
-    votes.clear()
-
-    # Resetar flags de submissão/voto E DISTRIBUIR NOVAS MÃOS para TODOS os jogadores ATIVOS
-    # Cria uma lista temporária das chaves para evitar "dictionary changed size during iteration"
-    for player_ws in list(players.keys()):
-        if player_ws in players: # Verifica novamente se o player ainda existe (edge case)
-             players[player_ws]["submitted_this_round"] = False
-             players[player_ws]["voted_this_round"] = False
-             
-             await send_to_client(player_ws, {"action": "get_nome"})
-             # >>> CORRIGIDO/AJUSTADO: Distribuir nova mão para CADA jogador <<<
-             # Garante que há cartas brancas suficientes para dar uma mão completa
-             if len(players[player_ws]["hand"]) < HAND_SIZE and white_cards:
-                nova_carta = random.choice(white_cards)
-                players[player_ws]["hand"].append(nova_carta)
-                await send_to_client(player_ws, {"action": "nova_mao", "cartas": players[player_ws]["hand"]})
+            # Normalmente o countdown já foi cancelado na saída do jogador (ver finally do handler)
+            self.log.aviso("countdown_sem_jogadores")
+            await self.update_game_state("waiting_for_players", "Not enough players. Countdown stopped.")
+
+
+    async def agendar_prazo_fase(self, fase, segundos, callback):
+        """Agenda o fim da fase atual da rodada e avisa os clientes do prazo (ms, relógio do servidor)."""
+        self.cancelar_prazo_fase()
+        self.concluir_fase()
+        deadline = asyncio.get_running_loop().time() + segundos
+        self.fase_atual = (fase, deadline - segundos)
+        # A rodada vai junto: um prazo que vencer depois de a rodada mudar é ignorado
+        self.prazo_fase = agendador().agendar(deadline, self.postar_tick, callback, self.rodada)
+        await self.broadcast({"action": "prazo_fase", "fase": fase, "deadline": round(deadline * 1000)})
+
+
+    def concluir_fase(self):
+        """Registra a duração da fase que acabou (envio ou votação)."""
+        if self.fase_atual is not None:
+            fase, inicio = self.fase_atual
+            metricas.duracao_fase.observar(asyncio.get_running_loop().time() - inicio, fase)
+            self.fase_atual = None
+
+
+    def cancelar_prazo_fase(self):
+        if self.prazo_fase is not None:
+            self.prazo_fase.cancelar()
+            self.prazo_fase = None
+
+
+    async def fim_do_prazo_envio(self, rodada):
+        """Prazo de envio venceu: submete uma carta aleatória por quem ainda não jogou."""
+        self.prazo_fase = None
+        if rodada is not self.rodada or rodada.votacao_aberta or self.game_state != "in_game":
+            return
+        for websocket in list(rodada.pendentes_envio):
+            mao = self.players[websocket]["hand"] if websocket in self.players else None
+            if mao:
+                self.log.info("prazo_envio_esgotado", jogador=self.players[websocket]["nome"])
+                await self.registrar_envio(websocket, random.choice(list(mao)))
+            else:
+                rodada.remover_jogador(websocket) # Sem cartas para jogar: não é mais esperado
+        if rodada.envios_completos():
+            await self.iniciar_votacao()
+        elif not rodada.autores:
+            # Ninguém tinha carta para jogar: não há o que votar
+            await self.start_new_round()
+
+
+    async def fim_do_prazo_voto(self, rodada):
+        """Prazo de votação venceu: vota aleatoriamente por quem ainda não votou (de preferência não na própria carta)."""
+        self.prazo_fase = None
+        if rodada is not self.rodada or not rodada.votacao_aberta or rodada.apurada or self.game_state != "in_game":
+            return
+        for websocket in list(rodada.pendentes_voto):
+            opcoes = [card_id for card_id, autor in rodada.autores.items() if autor is not websocket] or rodada.cartas()
+            self.log.info("prazo_voto_esgotado", jogador=self.players[websocket]["nome"] if websocket in self.players else str(websocket.remote_address))
+            self.registrar_voto(websocket, random.choice(opcoes))
+        if rodada.votos_completos():
+            await self.apurar_votos()
+
+
+    async def registrar_envio(self, websocket, card_id):
+        """Tira a carta da mão do jogador e a registra na rodada. Retorna False se o envio não vale."""
+        mao = self.players[websocket]["hand"]
+        if not self.rodada.submeter(websocket, card_id):
+            return False
+        mao.remover(card_id)
+        self.players[websocket]["hand_removidas"].append(card_id)
+        self.players[websocket]["submitted_this_round"] = True
+        self.log.debug("carta_recebida", amostra=100, carta=card_id, jogador=self.players[websocket]["nome"])
+        await self.broadcast({"action": "white_card_submitted", "count": len(self.rodada.autores)})
+        return True
+
+
+    def registrar_voto(self, websocket, card_id):
+        """Registra o voto na rodada. Retorna False se o voto não vale."""
+        if not self.rodada.votar(websocket, card_id):
+            return False
+        if websocket in self.players:
+            self.players[websocket]["voted_this_round"] = True
+        return True
+
+
+    async def start_game(self):
+        """Inicia a primeira rodada do jogo."""
+        self.log.info("partida_iniciada")
+        # Resetar pontuações APENAS se quisermos um jogo completamente novo a cada vez que atinge min_players
+        # Caso contrário, as pontuações persistem para quem continua conectado
+        # for player_data in self.players.values():
+        #     player_data["score"] = 0
+
+        await self.update_game_state("in_game", "Game started!")
+        # Começa a primeira rodada
+        await self.start_new_round()
+
+
+    async def start_new_round(self):
+        """Prepara e inicia uma nova rodada."""
+        if self.game_state != "in_game":
+            return # A partida acabou durante a pausa do resultado
+        self.log.debug("rodada_iniciada")
+
+        # Resetar estado da rodada; as cartas jogadas na rodada anterior vão para o descarte
+        self.baralho_brancas.descartar(self.rodada.cartas())
+        # Participam da rodada os jogadores conectados agora; quem chegar depois espera a próxima
+        self.rodada = Rodada(self.players)
+
+        # Resetar flags de submissão/voto E DISTRIBUIR NOVAS MÃOS para TODOS os jogadores ATIVOS
+        # Cria uma lista temporária das chaves para evitar "dictionary changed size during iteration"
+        for player_ws in list(self.players.keys()):
+            if player_ws in self.players: # Verifica novamente se o player ainda existe (edge case)
+                 self.players[player_ws]["submitted_this_round"] = False
+                 self.players[player_ws]["voted_this_round"] = False
+
+                 await self.send_frame(player_ws, self.frame_estatico(player_ws, ("get_nome",), lambda: {"action": "get_nome"}), "get_nome")
+                 # >>> CORRIGIDO/AJUSTADO: Completar a mão de CADA jogador comprando do baralho da sala <<<
+                 # Compra sem reposição: nenhuma carta aparece em duas mãos ao mesmo tempo
+                 mao = self.players[player_ws]["hand"]
+                 compradas = []
+                 if len(mao) < HAND_SIZE:
+                     compradas = self.baralho_brancas.comprar(HAND_SIZE - len(mao))
+                     mao.adicionar(compradas)
+                 if len(mao) < HAND_SIZE:
+                     # Tratar caso não haja cartas brancas suficientes para dar uma mão
+                     self.log.erro("brancas_insuficientes")
+                     await self.send_to_client(player_ws, {"action": "error", "reason": "Not enough white cards for a full hand."})
+                     # Talvez terminar o jogo ou esperar mais cartas? Vamos esperar.
+                 # Só o que mudou desde a última mensagem (a carta jogada e as compradas)
+                 if compradas or self.players[player_ws]["hand_removidas"]:
+                     await self.send_to_client(player_ws, self.mensagem_mao_delta(player_ws, compradas))
                  # to escrevendo isso aqui pra dar uma enrolada haha atumalaca rsrs
 
+
+        # Selecionar nova carta preta (a anterior vai para o descarte)
+        if self.current_black_card_id is not None:
+            self.baralho_pretas.descartar([self.current_black_card_id])
+        self.current_black_card_id = self.baralho_pretas.comprar_uma()
+        if self.current_black_card_id is not None:
+            self.current_black_card = catalogo_pretas.texto(self.current_black_card_id)
+            self.log.debug("carta_preta", carta=self.current_black_card_id)
+            # Broadcast para avisar que uma nova rodada vai começar/está pronta
+            # O cliente Pygame/Web, ao receber next_round, saberá que uma nova rodada começou.
+            # A carta preta será enviada APÓS o next_round (se o cliente solicitar) ou pode ser enviada aqui também.
+            await self.broadcast_estatico(("next_round",), lambda: {"action": "next_round"})
+
+            # >>> AJUSTADO: Enviar a carta preta para todos AGORA, após distribuir as mãos e o next_round <<<
+            # Isso garante que todos recebam a carta preta para a nova rodada de forma sincronizada.
+            # O cliente ainda pode solicitar com get_black_card se precisar.
+            card_id, texto = self.current_black_card_id, self.current_black_card
+            await self.broadcast_estatico(
+                self.chave_carta_preta(),
+                lambda: {"action": "black_card", "card": texto},
+                lambda: {"action": "black_card", "id": card_id},
+            )
+            await self.agendar_prazo_fase("envio", SUBMIT_TIMEOUT, self.fim_do_prazo_envio)
+
+
+        else:
+            # Tratar caso não haja mais cartas pretas
+            self.log.aviso("pretas_esgotadas")
+            await self.end_game(winner_ws=None) # Termina o jogo se não há mais cartas
+            # O estado já será game_over via end_game
+
+
+    async def iniciar_votacao(self):
+        """Todos submeteram: abre a votação com as cartas da rodada embaralhadas."""
+        if not self.rodada.envios_completos():
+            return # Já aberta (ex.: duas saídas seguidas agendaram a abertura)
+        self.log.debug("votacao_iniciada")
+        self.rodada.abrir_votacao(self.players)
+        ids_to_vote = self.rodada.cartas()
+        # Embaralhar a ordem das cartas para votação (para anonimato)
+        random.shuffle(ids_to_vote)
+        # Broadcasta as cartas para votação E sinaliza a mudança de estado
+        await self.broadcast_cartas(
+            {"action": "start_vote", "cards": [catalogo_brancas.texto(i) for i in ids_to_vote]},
+            {"action": "start_vote", "ids": ids_to_vote},
+        )
+        await self.agendar_prazo_fase("votacao", VOTE_TIMEOUT, self.fim_do_prazo_voto)
+        # O estado do jogo MUDARÁ para voting NO FRONTEND ao receber start_vote.
+
+
+    async def apurar_votos(self):
+        """Todos votaram: pontua o vencedor e agenda a próxima rodada (ou termina o jogo)."""
+        if not self.rodada.votos_completos():
+            return # Já apurada (ex.: o último voto e uma saída enfileiraram a apuração)
+        self.log.debug("votos_completos")
+        self.rodada.apurada = True
+        self.cancelar_prazo_fase()
+        self.concluir_fase()
+        players = self.players
+        # Carta com mais votos, já acompanhada a cada voto (empate: sorteio)
+        winner_card = self.rodada.vencedora()
+        if winner_card is None:
+            self.log.aviso("apuracao_sem_votos")
+            await self.broadcast_cartas(
+                {"action": "round_result", "winner_card": "No votes recorded", "winner_address": "N/A", "score": "N/A"},
+                {"action": "round_result", "winner_id": None, "winner_address": "N/A", "score": "N/A"},
+            )
+            await self.publicar_placar() # Só vai para os clientes se algo mudou
+            self.agendar_transicao(ROUND_RESULT_DELAY, self.start_new_round)
+            return
+
+        # Jogador que submeteu a carta vencedora (O(1) pelo mapa carta -> autor)
+        winner_player_ws = self.rodada.autores.get(winner_card)
+
+        # Verifica se o jogador vencedor ainda está conectado E está no dicionário players
+        # Um jogador desconectado não estará em 'players'
+        if winner_player_ws and winner_player_ws in players:
+             winner_score = self.placar.pontuar(players[winner_player_ws]["id"])
+             self.log.debug("rodada_vencida", carta=winner_card, jogador=winner_player_ws.remote_address, pontos=winner_score)
+
+             # Broadcasta o resultado da rodada
+             await self.broadcast_cartas({
+                 "action": "round_result",
+                 "winner_card": catalogo_brancas.texto(winner_card),
+                 # Envia o endereço do vencedor (ou uma representação string)
+                 "winner_address": players[winner_player_ws]['nome'],
+                 # O score enviado aqui é o score ATUALIZADO do vencedor da rodada
+                 # Isso pode ser confuso para o frontend. Melhor enviar score_update separado.
+                 # "score": winner_score
+             }, {
+                 "action": "round_result",
+                 "winner_id": winner_card,
+                 "winner_address": players[winner_player_ws]['nome'],
+             })
+
+             # Broadcasta a pontuação ATUALIZADA APÓS o resultado da rodada (só a entrada do vencedor)
+             await self.publicar_placar()
+
+             # Verifica se o vencedor atingiu a pontuação máxima
+             if winner_score >= max_points:
+                 self.log.info("pontuacao_maxima", jogador=players[winner_player_ws]["nome"], pontos=max_points)
+                 await self.end_game(winner_player_ws) # Termina o jogo
              else:
-                 # Tratar caso não haja cartas brancas suficientes para dar uma mão
-                 print("Erro: Não há cartas brancas suficientes para dar uma mão completa!") # Debugging
-                 await send_to_client(player_ws, {"action": "error", "reason": "Not enough white cards for a full hand."})
-                 # Talvez terminar o jogo ou esperar mais cartas? Vamos esperar.
-
-
-    # Selecionar nova carta preta
-    if black_cards:
-        current_black_card = random.choice(black_cards)
-        print(f"New Black Card: {current_black_card}") # Debugging
-        # Broadcast para avisar que uma nova rodada vai começar/está pronta
-        # O cliente Pygame/Web, ao receber next_round, saberá que uma nova rodada começou.
-        # A carta preta será enviada APÓS o next_round (se o cliente solicitar) ou pode ser enviada aqui também.
-        await broadcast({"action": "next_round"})
-
-        # >>> AJUSTADO: Enviar a carta preta para todos AGORA, após distribuir as mãos e o next_round <<<
-        # Isso garante que todos recebam a carta preta para a nova rodada de forma sincronizada.
-        # O cliente ainda pode solicitar com get_black_card se precisar.
-        await broadcast({"action": "black_card", "card": current_black_card})
-
-
-    else:
-        # Tratar caso não haja mais cartas pretas
-        print("No more black cards!") # Debugging
-        await end_game(winner_ws=None) # Termina o jogo se não há mais cartas
-        # O estado já será game_over via end_game
-
-
-async def end_game(winner_ws=None):
-    """Finaliza o jogo."""
-    global game_state, start_timer_task, current_black_card
-    print("Game ending...") # Debugging
-
-    winner_address = "No winner (game ended unexpectedly)"
-    final_winner_score = "N/A"
-
-    # Encontrar o endereço e pontuação do vencedor (se houver um)
-    if winner_ws and winner_ws in players:
-         try:
-              winner_address = str(players[winner_ws]['nome'])
-              final_winner_score = players[winner_ws]["score"]
-         except Exception as e:
-              print(f"Erro ao obter endereço/score do vencedor: {e}")
-              winner_address = "Unknown Winner"
-              final_winner_score = "N/A"
-
-    # Broadcast final de scores ANTES do game over principal, para garantir que o frontend os receba
-    scores_data = {
-        players[ws]["nome"]: data["score"]
-        for ws, data in players.items()
-    }  
-    await broadcast({"action": "scores_update", "scores": scores_data})
-
-    # Broadcast da mensagem de game over
-    await broadcast({"action": "game_over", "winner": winner_address, "score": final_winner_score}) # Inclui pontuação final do vencedor
-
-    # Atualiza o estado interno do servidor
-    await update_game_state("game_over", f"Game Over! Winner: {winner_address} ({final_winner_score} pts)")
-
-    # Cancelar qualquer timer ativo (countdown)
-    if start_timer_task and not start_timer_task.done():
+                 # Iniciar próxima rodada após uma pausa
+                 # Pequena pausa para o frontend mostrar o resultado
+                 self.agendar_transicao(ROUND_RESULT_DELAY, self.start_new_round)
+        else:
+             self.log.aviso("vencedor_desconectado")
+             # O que fazer se o vencedor desconectou? Vamos iniciar uma nova rodada.
+             # Broadcasta o resultado da rodada com informação de jogador desconectado
+             await self.broadcast_cartas(
+                 {"action": "round_result", "winner_card": catalogo_brancas.texto(winner_card), "winner_address": "Disconnected Player", "score": "N/A"},
+                 {"action": "round_result", "winner_id": winner_card, "winner_address": "Disconnected Player", "score": "N/A"},
+             )
+             # A saída do vencedor já foi publicada no finally dele; aqui só sai algo se houver alteração pendente
+             await self.publicar_placar()
+             self.agendar_transicao(ROUND_RESULT_DELAY, self.start_new_round)
+
+
+    async def end_game(self, winner_ws=None):
+        """Finaliza o jogo e agenda a revanche."""
+        if self.game_state == "game_over":
+            return # Já finalizado (ex.: duas saídas seguidas)
+        self.log.info("partida_encerrando")
+
+        winner_address = "No winner (game ended unexpectedly)"
+        final_winner_score = "N/A"
+
+        # Encontrar o endereço e pontuação do vencedor (se houver um)
+        if winner_ws and winner_ws in self.players:
+             try:
+                  winner_address = str(self.players[winner_ws]['nome'])
+                  final_winner_score = self.placar.pontos(self.players[winner_ws]["id"])
+             except Exception:
+                  self.log.erro("vencedor_indisponivel", exc=True)
+                  winner_address = "Unknown Winner"
+                  final_winner_score = "N/A"
+
+        # Publica alterações pendentes do placar ANTES do game over principal, para garantir que o frontend as receba
+        await self.publicar_placar()
+
+        # Broadcast da mensagem de game over
+        await self.broadcast({"action": "game_over", "winner": winner_address, "score": final_winner_score}) # Inclui pontuação final do vencedor
+
+        # Atualiza o estado interno do servidor
+        await self.update_game_state("game_over", f"Game Over! Winner: {winner_address} ({final_winner_score} pts)")
+
+        # Cancelar qualquer timer ativo (countdown, prazo da fase e a próxima rodada agendada)
+        self.cancelar_countdown()
+        self.cancelar_prazo_fase()
+        self.cancelar_transicao_agendada()
+        self.fase_atual = None # Fase interrompida: não entra na métrica de duração
+
+        # Resetar estado do jogo para aguardar novos jogadores (sem limpar clientes/players)
+        # Mantém clientes e pontuações para um novo jogo com os mesmos jogadores
+        self.rodada = Rodada()
+        self.current_black_card = None
+        self.current_black_card_id = None
+        # As flags submitted_this_round/voted_this_round serão resetadas ao iniciar uma nova rodada.
+        # As mãos serão distribuídas na próxima start_new_round.
+
+        # Transiciona para o estado de espera após um breve delay para o cliente processar GAME_OVER
+        # Revanche em memória: os jogadores continuam conectados e só o estado da partida é zerado
+        self.agendar_transicao(GAME_OVER_DELAY, self.nova_partida)
+
+
+    async def nova_partida(self):
+        """Zera pontuações, mãos e rodada para uma revanche com os jogadores que continuam conectados."""
+        self.log.info("nova_partida", jogadores=self.get_player_count())
+        self.rodada = Rodada()
+        self.current_black_card = None
+        self.current_black_card_id = None
+        self.cancelar_countdown()
+        self.cancelar_prazo_fase()
+        # Baralhos novos e embaralhados para a revanche
+        self.baralho_brancas = Deck(catalogo_brancas)
+        self.baralho_pretas = Deck(catalogo_pretas)
+
+        for player_ws, player_data in list(self.players.items()):
+            self.placar.definir(player_data["id"], player_data["nome"], 0)
+            player_data["submitted_this_round"] = False
+            player_data["voted_this_round"] = False
+            player_data["hand"] = Mao(self.baralho_brancas.comprar(HAND_SIZE))
+            await self.send_to_client(player_ws, self.mensagem_mao(player_ws))
+
+        # Um único delta com todas as pontuações zeradas
+        await self.publicar_placar()
+
+        await self.update_game_state("waiting_for_players", f"Waiting for at least {min_players} players...") # Volta para o estado de espera
+        # Verifica se ainda há jogadores suficientes para iniciar um novo countdown imediatamente
+        if self.get_player_count() >= min_players:
+             self.log.info("revanche")
+             await self.start_countdown() # Inicia um novo countdown
+
+
+    # --- Ator da sala ---
+    # As conexões não mexem no estado da sala: o handler de cada uma só decodifica e posta
+    # eventos (eventos.py) na fila da sala, e uma única task da sala (executar) os aplica, um
+    # de cada vez e na ordem de chegada. Entre um evento e o próximo nenhuma outra corrotina vê
+    # o estado pela metade, então não há locks nem intercalações (duas rodadas começando ao
+    # mesmo tempo, voto chegando no meio de start_new_round). A fila é limitada: cheia, quem
+    # posta espera, o handler para de ler o socket e a pressão volta para o cliente pelo TCP.
+
+    def iniciar_ator(self):
+        if self.tarefa_ator is None and not self.encerrada:
+            self.tarefa_ator = asyncio.get_running_loop().create_task(self.executar())
+
+
+    async def postar(self, evento):
+        """Entrega um evento ao ator da sala, esperando se a fila estiver cheia."""
+        self.iniciar_ator()
+        await self.eventos.put(evento)
+
+
+    def postar_tick(self, callback, *args):
+        """Chamado pelo agendador (fora do ator): o prazo vencido vira um evento Tick."""
+        if self.encerrada:
+            return
+        self.iniciar_ator()
         try:
-            start_timer_task.cancel()
-            await start_timer_task # Aguarda a task ser cancelada (evita warning)
-        except asyncio.CancelledError:
-            pass # Já era esperado
-        except Exception as e:
-             print(f"Erro ao cancelar/aguardar task do timer: {e}")
-             traceback.print_exc()
-
-
-    # Resetar estado do jogo para aguardar novos jogadores (sem limpar clientes/players)
-    # Mantém clientes e pontuações para um novo jogo com os mesmos jogadores
-    submitted_white_cards.clear()
-    votes.clear()
-    current_black_card = None
-    # As flags submitted_this_round/voted_this_round serão resetadas ao iniciar uma nova rodada.
-    # As mãos serão distribuídas na próxima start_new_round.
-    
-    # Transiciona para o estado de espera após um breve delay para o cliente processar GAME_OVER
-    await asyncio.sleep(10) # Tempo para o cliente exibir "Game Over"
-    os.execv(sys.executable, [sys.executable] + sys.argv)
-    # Verifica se ainda há jogadores suficientes para iniciar um novo countdown imediatamente
-    if get_player_count() >= min_players:
-         print("Jogadores suficientes ainda conectados. Iniciando novo countdown para novo jogo.")
-         await start_countdown() # Inicia um novo countdown
-    else:
-         await update_game_state("waiting_for_players", f"Waiting for at least {min_players} players...") # Volta para o estado de espera
-
-
-# --- WebSocket Handler ---
-
-async def handler(websocket):
-    """Lida com a conexão e as mensagens de um cliente."""
-    print(f"Cliente conectado: {websocket.remote_address}") # Debugging
-    
-
-    # Adiciona o novo cliente e inicializa os dados do jogador
-    # Cria um novo registro para a NOVA conexão deste websocket object
-    # Inicializa a mão vazia aqui
-    players[websocket] = {"nome": "","score": 0, "submitted_this_round": False, "voted_this_round": False, "hand": random.sample(white_cards, HAND_SIZE)}
-    clients.add(websocket) # Adiciona ao set de clientes ATIVOS para broadcast
-    print(f"Total players connected: {len(players)}") # Debugging (usando len(players) pois todos são jogadores por enquanto)
-
-
-    # Informar o novo cliente sobre o estado atual do jogo e pontuações
-    # Envia o estado ANTES das pontuações ou countdown, para o cliente saber o que esperar
-    await send_to_client(websocket, {"action": "game_state_update", "state": game_state, "message": f"Current state: {game_state}"})
-    await send_to_client(websocket, {"action": "nova_mao", "cartas": players[websocket]["hand"]})
-    # Enviar pontuações atuais para o novo cliente (SEMPRE)
-    scores_data = {
-        players[ws]["nome"]: data["score"]
-        for ws, data in players.items()
-    }   
-    await send_to_client(websocket, {"action": "scores_update", "scores": scores_data})
-    await send_to_client(websocket, {"action": "codigo_sala", "sala": sys.argv[1]})
-
-    # Envia info específica do estado atual
-    if game_state == "starting_countdown":
-         await send_to_client(websocket, {"action": "countdown", "seconds": countdown_seconds_left})
-         await send_to_client(websocket, {"action": "nova_mao", "cartas": players[websocket]["hand"]})
-
-    elif game_state in ["in_game", "round_result", "voting"]: # Inclui 'voting' e 'round_result'
-         if current_black_card:
-              await send_to_client(websocket, {"action": "black_card", "card": current_black_card})
-         # Em 'voting', enviar cartas submetidas (não implementado para simplificar, cliente espera 'start_vote')
-         # Em 'round_result', enviar resultado da rodada (não implementado, cliente espera 'round_result')
-
-         # >>> AJUSTADO: Enviar mão do jogador ao conectar mid-game (se ele tiver uma) <<<
-         # Isso é para o caso de reconexão ou join mid-round
-         if players[websocket]["hand"]:
-              await send_to_client(websocket, {"action": "nova_mao", "cartas": players[websocket]["hand"]})
-              print(f"Enviando mão existente para novo cliente {websocket.remote_address}: {players[websocket]['hand']}") # Debugging
-         # Senão, ele receberá a mão na próxima start_new_round
-
-
-    # Verifica se é hora de iniciar o countdown
-    # Faz essa checagem APÓS enviar o estado inicial para o novo cliente
-    if game_state == "waiting_for_players" and get_player_count() >= min_players:
-        await start_countdown()
-
-
-    # --- Loop principal para receber mensagens ---
-    # Usamos async for, que lida nativamente com ConnectionClosed levantando StopAsyncIteration
-    try:
-        async for message in websocket:
-            data = json.loads(message)
-            # print(f"Mensagem recebida de {websocket.remote_address}: {data}") # Debugging received message
-
-            action = data.get("action")
-
-            # Ações permitidas dependendo do estado
-            # Permite get_black_card no estado 'waiting_for_black_card' também,
-            # para clientes que chegam após next_round mas antes de receberem black_card 
-
-            
-            if game_state == "in_game" or (action == "get_black_card" and game_state == "waiting_for_black_card"):
-
-                if action == "get_black_card":
-                    # O cliente está pedindo a carta preta atual
-                    # Responde APENAS se uma carta preta estiver definida
-                    if current_black_card:
-                        await send_to_client(websocket, {"action": "black_card", "card": current_black_card})
-                    # else: # Debugging
-                         # print(f"Received get_black_card from {websocket.remote_address} but current_black_card is None. State: {game_state}")
-
-                elif action == "submit_white_card":
-                    card_text = data.get("card")
-                    # Verifica se a carta é válida, o jogador ainda não submeteu, E A CARTA ESTÁ NA MÃO DELE
-                    if card_text and websocket in players:
-                        print("rodou")
-                        submitted_white_cards.append({"player": websocket, "card": card_text})
-                        players[websocket]["submitted_this_round"] = True
-                        players[websocket]["hand"].remove(card_text)  # Remover carta usada
-                        print(f"Carta branca recebida. Carta: {card_text} Player: {players[websocket]}")
-
-                        # >>> AJUSTADO: Remover a carta da mão do jogador após submeter <<<
-                        
-                        print(f"Card submitted by {websocket.remote_address}. Removed from hand. Total submitted: {len(submitted_white_cards)}") # Debugging
-
-
-                        await broadcast({"action": "white_card_submitted", "count": len(submitted_white_cards)})
-
-                        # Verifica se todos os jogadores ATIVOS submeteram
-                        # O round de submissão termina quando o número de cartas submetidas
-                        # for igual ao número de jogadores ATIVOS (que estão no dicionário players)
-                        if len(submitted_white_cards) == len(players):
-                             print("All active players submitted. Starting vote.") # Debugging
-                             # Todos enviaram, enviar cartas para votação
-                             cards_to_vote = [entry["card"] for entry in submitted_white_cards]
-                             # Embaralhar a ordem das cartas para votação (para anonimato)
-                             random.shuffle(cards_to_vote)
-                             # Broadcasta as cartas para votação E sinaliza a mudança de estado
-                             await broadcast({"action": "start_vote", "cards": cards_to_vote})
-                             # O estado do jogo MUDARÁ para voting NO FRONTEND ao receber start_vote.
-
-                elif action == "nome":
-                    nome = data.get("nome")
-                    print(f"Nome do {players[websocket]} é {nome}")
-                    if nome:
-                        players[websocket]["nome"] = nome
-
-                elif action == "vote" and game_state == "in_game":
-                    chosen_card = data.get("card")
-                    # Verifica se a carta votada está entre as submetidas nesta rodada e se o jogador ainda não votou
-                    # Verifica se o jogador ainda está no dicionário players
-                    valid_cards_to_vote = [entry["card"] for entry in submitted_white_cards]
-                    if chosen_card and chosen_card in valid_cards_to_vote and websocket in players and not players[websocket]["voted_this_round"]:
-                        votes[chosen_card] = votes.get(chosen_card, 0) + 1
-                        players[websocket]["voted_this_round"] = True
-                        print(f"Vote received for '{chosen_card}' from {websocket.remote_address}. Total votes: {sum(votes.values())}") # Debugging
-
-                        # Verifica se todos os jogadores ATIVOS votaram.
-                        # Compara o total de votos com o número de jogadores atualmente conectados.
-                        # Isso lida implicitamente com jogadores que desconectaram antes de votar.
-                        if sum(votes.values()) == len(players):
-                            print("All active players voted. Calculating result.") # Debugging
-                            # Todos votaram, calcular vencedor
-                            if votes:
-                                # Encontrar a carta com mais votos. Se houver empate, random.choice
-                                max_votes = max(votes.values())
-                                potential_winners = [card for card, count in votes.items() if count == max_votes]
-                                winner_card = random.choice(potential_winners) # Escolhe aleatoriamente em caso de empate
-
-                                # Encontrar o jogador que submeteu a carta vencedora
-                                winner_player_ws = None
-                                # Itera sobre as cartas submetidas para encontrar o websocket do jogador
-                                for entry in submitted_white_cards:
-                                    # Usa 'is' para comparar objetos websocket, mais seguro que ==
-                                    if entry["card"] == winner_card:
-                                        winner_player_ws = entry["player"]
-                                        break # Encontrou o jogador que submeteu a carta vencedora
-
-                                # Verifica se o jogador vencedor ainda está conectado E está no dicionário players
-                                # Um jogador desconectado não estará em 'players'
-                                if winner_player_ws and winner_player_ws in players:
-                                     players[winner_player_ws]["score"] += 1
-                                     winner_score = players[winner_player_ws]["score"]
-                                     print(f"Round winner card: '{winner_card}' by {winner_player_ws.remote_address}. New score: {winner_score}") # Debugging
-
-                                     # Broadcasta o resultado da rodada
-                                     await broadcast({
-                                         "action": "round_result",
-                                         "winner_card": winner_card,
-                                         # Envia o endereço do vencedor (ou uma representação string)
-                                         "winner_address": players[winner_player_ws]['nome'],
-                                         # O score enviado aqui é o score ATUALIZADO do vencedor da rodada
-                                         # Isso pode ser confuso para o frontend. Melhor enviar score_update separado.
-                                         # "score": winner_score
-                                     })
-
-                                     # Broadcasta a pontuação ATUALIZADA de TODOS os jogadores APÓS o resultado da rodada
-                                     scores_data = {
-                                        players[ws]["nome"]: data["score"]
-                                        for ws, data in players.items()
-                                    }                                
-                                     await broadcast({"action": "scores_update", "scores": scores_data})
-
-                                     # Verifica se o vencedor atingiu a pontuação máxima
-                                     if winner_score >= max_points:
-                                         print(f"Jogador {players[winner_player_ws]['nome']} atingiu {max_points} pontos. Finalizando jogo.")
-                                         await end_game(winner_player_ws) # Termina o jogo
-                                     else:
-                                         # Iniciar próxima rodada após uma pausa
-                                         print("Round finished. Starting next round.") # Debugging
-                                         await asyncio.sleep(3) # Pequena pausa para o frontend mostrar o resultado
-                                         await start_new_round() # Inicia uma nova rodada
-                                else:
-                                     print("Erro/Edge case: Jogador que submeteu a carta vencedora desconectou antes do fim da votação.") # Debugging
-                                     # O que fazer se o vencedor desconectou? Vamos iniciar uma nova rodada.
-                                     # Broadcasta o resultado da rodada com informação de jogador desconectado
-                                     await broadcast({"action": "round_result", "winner_card": winner_card, "winner_address": "Disconnected Player", "score": "N/A"})
-                                     # Broadcasta as pontuações atuais (sem o vencedor desconectado, pois ele já foi removido de 'players' no finally anterior)
-                                     scores_data = {
-                                        players[ws]["nome"]: data["score"]
-                                        for ws, data in players.items()
-                                    }                                    
-                                     await broadcast({"action": "scores_update", "scores": scores_data})
-                                     await asyncio.sleep(3)
-                                     await start_new_round()
-
-                            else: # Caso não tenha votos (improvável se sum(votes.values()) > 0, mas seguro)
-                                 print("Vote check passed, but no votes recorded?") # Debugging
-                                 await broadcast({"action": "round_result", "winner_card": "No votes recorded", "winner_address": "N/A", "score": "N/A"})
-                                 scores_data = {
-                                    players[ws]["nome"]: data["score"]
-                                    for ws, data in players.items()
-                                }                                
-                                 await broadcast({"action": "scores_update", "scores": scores_data})
-                                 await asyncio.sleep(3)
-                                 await start_new_round()
-
-
-                    # else: # Debugging invalid vote attempt
-                         # print(f"Invalid vote attempt from {websocket.remote_address}. Card: {chosen_card}, Voted before: {players[websocket]['voted_this_round'] if websocket in players else 'N/A'}, Card in list: {chosen_card in valid_cards_to_vote}")
-
-            # else if actions allowed in other states (like get_black_card in waiting_for_black_card)
-            # A lógica para get_black_card em 'waiting_for_black_card' foi movida para o if principal acima.
-
-            # else: # Debugging ignored actions
-                 # print(f"Ignorando ação '{action}' no estado '{game_state}' de {websocket.remote_address}")
-
-
-    # --- Tratamento de Exceções e Limpeza Final ---
-    # Este bloco try/except/finally captura exceções que ocorrem DENTRO do loop 'async for message'
-    # Incluindo ConnectionClosed, que faz o loop terminar normalmente e NÃO levanta uma exceção aqui, mas vai para finally.
-    except Exception as e:
-        # Captura QUALQUER outra exceção inesperada durante o processamento de mensagens
-        # A exceção ConnectionClosed NÃO virá para cá.
-        print(f"Erro inesperado com o cliente {websocket.remote_address} durante processamento:\n")
-        traceback.print_exc() # Imprime o traceback completo
-
-
-    finally:
-        # Este bloco é executado quando o handler task termina (loop async for concluído, exceção capturada, cancelamento)
-        # O 'websocket' aqui refere-se ao cliente cuja task handler está terminando.
-        print(f"Limpando dados do cliente: {websocket.remote_address}") # Debugging
+            self.eventos.put_nowait(Tick(callback, args))
+        except asyncio.QueueFull:
+            # O agendador não pode esperar: o tick entra na fila assim que houver espaço
+            asyncio.get_running_loop().create_task(self.eventos.put(Tick(callback, args)))
+
+
+    async def executar(self):
+        """Task do ator: aplica os eventos e, depois de cada um, as transições que ele disparou."""
+        while True:
+            evento = await self.eventos.get()
+            try:
+                await self.tratadores[type(evento)](evento)
+                while self.transicoes:
+                    transicao, args = self.transicoes.popleft()
+                    await transicao(*args)
+            except Exception:
+                self.log.erro("falha_no_evento", evento=type(evento).__name__, exc=True)
+                self.transicoes.clear()
+            finally:
+                if type(evento) is Sair and not evento.concluido.done():
+                    evento.concluido.set_result(None)
+            self.eventos_processados += 1
+
+
+    def vazia(self):
+        """Nenhuma conexão ativa nem a caminho (inclusive eventos Entrar ainda na fila)."""
+        return self.conexoes == 0
+
+
+    def encerrar(self):
+        """Sala descartada pelo gateway: para o ator e cancela os prazos pendentes."""
+        self.encerrada = True
+        self.cancelar_countdown()
+        self.cancelar_prazo_fase()
+        self.cancelar_transicao_agendada()
+        if self.tarefa_ator is not None:
+            self.tarefa_ator.cancel()
+            self.tarefa_ator = None
+
+
+    async def ao_tick(self, evento):
+        await evento.callback(*evento.args)
+
+
+    async def ao_entrar(self, evento):
+        websocket = evento.websocket
+        players = self.players
+
+        # Adiciona o novo cliente e inicializa os dados do jogador
+        # Cria um novo registro para a NOVA conexão deste websocket object
+        # Inicializa a mão vazia aqui
+        players[websocket] = {"nome": evento.nome or "", "submitted_this_round": False, "voted_this_round": False, "hand": Mao(self.baralho_brancas.comprar(HAND_SIZE)), "hand_seq": 0, "hand_removidas": [], "id": self.proximo_id_jogador}
+        self.proximo_id_jogador += 1
+        # Os outros recebem o novo jogador como delta; ele recebe o placar inteiro logo abaixo
+        self.registrar_no_placar(websocket)
+        await self.publicar_placar()
+        codec_conexao = codec.da_conexao(websocket)
+        self.codecs[websocket] = codec_conexao
+        self.clientes_por_codec.setdefault(codec_conexao, set()).add(websocket)
+        self.clients.add(websocket) # Adiciona ao set de clientes ATIVOS para broadcast
+        opcoes = opcoes_da_conexao(websocket)
+        if opcoes.get("cartas") == MODO_IDS:
+            self.clientes_ids.add(websocket)
+        if opcoes.get("lote") == "1":
+            self.clientes_lote.add(websocket)
+        self.log.debug("jogadores_conectados", total=len(players))
+
+
+        # Clientes por IDs recebem o catálogo antes de qualquer carta (só a versão, se já o têm em cache)
+        if websocket in self.clientes_ids:
+            if opcoes.get("catalogo") == versao_catalogo:
+                frame = self.frame_estatico(websocket, ("catalogo", versao_catalogo, "em_cache"), lambda: {"action": "catalogo", "versao": versao_catalogo})
+            else:
+                frame = self.frame_estatico(websocket, ("catalogo", versao_catalogo), lambda: mensagem_catalogo)
+            await self.send_frame(websocket, frame, "catalogo")
+
+        # Relógio do servidor (ms): o cliente calcula o offset para o seu e exibe prazos localmente
+        await self.send_to_client(websocket, {"action": "relogio", "agora": round(asyncio.get_running_loop().time() * 1000)})
+
+        # Informar o novo cliente sobre o estado atual do jogo e pontuações
+        # Envia o estado ANTES das pontuações ou countdown, para o cliente saber o que esperar
+        estado = self.game_state
+        await self.send_frame(websocket, self.frame_estatico(websocket, ("game_state_update", estado),
+                                                             lambda: {"action": "game_state_update", "state": estado, "message": f"Current state: {estado}"}),
+                              "game_state_update")
+        # A mão vai uma única vez na conexão; depois disso só seguem deltas
+        await self.send_to_client(websocket, self.mensagem_mao(websocket))
+        # Enviar pontuações atuais para o novo cliente (SEMPRE): snapshot já serializado do placar
+        await self.send_frame(websocket, self.placar.snapshot(self.codecs[websocket]), "scores_update")
+        await self.send_frame(websocket, self.frame_estatico(websocket, ("codigo_sala", self.codigo), lambda: {"action": "codigo_sala", "sala": self.codigo}), "codigo_sala")
+
+        # Envia info específica do estado atual
+        if self.game_state == "starting_countdown":
+             await self.send_to_client(websocket, self.mensagem_countdown())
+
+        elif self.game_state == "in_game":
+             if self.current_black_card:
+                  await self.send_frame(websocket, self.frame_carta_preta(websocket), "black_card")
+             # Na votação, o cliente espera o próximo 'start_vote' (cartas submetidas não são reenviadas)
+
+
+        # Verifica se é hora de iniciar o countdown
+        # Faz essa checagem APÓS enviar o estado inicial para o novo cliente
+        if self.game_state == "waiting_for_players" and self.get_player_count() >= min_players:
+            await self.start_countdown()
+
+
+    async def ao_receber(self, evento):
+        """Despacha a mensagem pela tabela de ações, se a ação vale no estado atual da sala."""
+        websocket = evento.websocket
+        nome_acao = evento.data.get("action")
+        acao = self.acoes.get(nome_acao)
+        # Só ações conhecidas viram rótulo: o valor vem do cliente
+        metricas.mensagens_recebidas.inc(nome_acao if acao is not None else "desconhecida")
+        if websocket not in self.players or acao is None:
+            return
+        estados, tratador = acao
+        if estados is None or self.game_state in estados:
+            await tratador(websocket, evento.data)
+        # else: # Debugging ignored actions
+             # print(f"Ignorando ação '{evento.data.get('action')}' no estado '{self.game_state}' de {websocket.remote_address}")
+
+
+    async def acao_resync_mao(self, websocket, data):
+        # O cliente detectou um buraco na sequência de deltas: reenvia a mão inteira
+        await self.send_to_client(websocket, self.mensagem_mao(websocket))
+
+
+    async def acao_resync_placar(self, websocket, data):
+        # Mesma ideia para o placar: o snapshot já está serializado
+        await self.send_frame(websocket, self.placar.snapshot(self.codecs[websocket]), "scores_update")
+
+
+    async def acao_get_black_card(self, websocket, data):
+        # O cliente está pedindo a carta preta atual
+        # Responde APENAS se uma carta preta estiver definida
+        if self.current_black_card:
+            await self.send_frame(websocket, self.frame_carta_preta(websocket), "black_card")
+
+
+    async def acao_submit_white_card(self, websocket, data):
+        # `id` no protocolo por IDs, texto no antigo
+        card_id = id_da_mensagem(data)
+        mao = self.players[websocket]["hand"]
+        # A carta precisa estar NA MÃO DELE e ele precisa estar devendo carta nesta rodada (tudo O(1))
+        if card_id is not None and card_id in mao and await self.registrar_envio(websocket, card_id):
+            self.log.debug("carta_enviada", amostra=100, jogador=websocket.remote_address, enviadas=len(self.rodada.autores))
+
+            # O round de submissão termina quando ninguém que estava na rodada deve carta
+            if self.rodada.envios_completos():
+                 self.enfileirar_transicao(self.iniciar_votacao)
+
+        elif card_id not in mao:
+            await self.send_to_client(websocket, {"action": "error", "reason": "Card not in hand."})
+
+
+    async def acao_nome(self, websocket, data):
+        nome = data.get("nome")
+        self.log.debug("nome", jogador=websocket.remote_address, nome=nome)
+        if nome:
+            self.players[websocket]["nome"] = nome
+            self.registrar_no_placar(websocket)
+            await self.publicar_placar()
+
+
+    async def acao_vote(self, websocket, data):
+        chosen_card = id_da_mensagem(data)
+        # A apuração valida votação aberta, voto único e carta submetida nesta rodada em O(1)
+        if chosen_card is not None and self.registrar_voto(websocket, chosen_card):
+            self.log.debug("voto_recebido", amostra=100, carta=chosen_card, jogador=websocket.remote_address, votos=self.rodada.total_votos)
+
+            # Todos os jogadores esperados na votação já votaram
+            # (quem desconectou antes de votar é retirado dos pendentes na saída)
+            if self.rodada.votos_completos():
+                self.enfileirar_transicao(self.apurar_votos)
+
+
+    async def ao_sair(self, evento):
+        websocket = evento.websocket
+        players = self.players
+        self.log.info("cliente_saiu", jogador=websocket.remote_address)
         # Garantir a remoção segura do cliente dos sets e dicionários
-        # Usa copy() e verifica a existência antes de remover
-        client_to_remove = websocket
-        if client_to_remove in clients:
-            clients.remove(client_to_remove)
+        self.clients.discard(websocket)
+        self.clientes_ids.discard(websocket)
+        self.clientes_lote.discard(websocket)
+        codec_conexao = self.codecs.pop(websocket, None)
+        if codec_conexao is not None:
+            conexoes = self.clientes_por_codec[codec_conexao]
+            conexoes.discard(websocket)
+            if not conexoes:
+                del self.clientes_por_codec[codec_conexao]
         # A remoção de 'players' significa que este websocket não é mais um jogador ATIVO para contagem ou lógica de rodada.
-        if client_to_remove in players:
-            del players[client_to_remove] # Remove do dicionário de jogadores ativos
+        if websocket in players:
+            # As cartas da mão de quem saiu voltam para o baralho da sala
+            self.baralho_brancas.descartar(players[websocket]["hand"].esvaziar())
+            self.placar.remover(players[websocket]["id"])
+            del players[websocket] # Remove do dicionário de jogadores ativos
+        # Quem saiu deixa de ser esperado na rodada
+        self.rodada.remover_jogador(websocket)
+        await self.publicar_placar()
 
-        print(f"Clientes restantes: {len(clients)}. Jogadores restantes: {len(players)}") # Debugging
+        self.log.debug("restantes", clientes=len(self.clients), jogadores=len(players))
 
         # Verifica se o jogo deve parar ou countdown ser cancelado
         # Se o número de jogadores ATIVOS cair abaixo do mínimo
-        if game_state in ["starting_countdown", "in_game", "round_result"] and get_player_count() < min_players:
-            print("Número de jogadores insuficiente após desconexão. Verificando ação.") # Debugging
-            if game_state == "starting_countdown" and start_timer_task and not start_timer_task.done():
-                 print("Cancelando countdown devido a poucos jogadores.")
-                 start_timer_task.cancel() # Cancela o timer
-                 # O run_countdown_timer lidará com o estado 'waiting_for_players'
-            elif game_state in ["in_game", "round_result"]:
-                 print("Finalizando jogo devido a poucos jogadores.")
-                 # Cria uma task separada para chamar end_game para não bloquear o finally
+        if self.game_state in ("starting_countdown", "in_game") and self.get_player_count() < min_players:
+            if self.game_state == "starting_countdown":
+                 self.log.info("countdown_cancelado", motivo="poucos_jogadores")
+                 self.cancelar_countdown()
+                 # A mudança de estado é o aviso de cancelamento para os clientes
+                 await self.update_game_state("waiting_for_players", "Not enough players. Countdown stopped.")
+            else:
+                 self.log.info("partida_encerrada", motivo="poucos_jogadores")
                  # Passa None como vencedor, pois o jogo terminou por falta de jogadores
-                 asyncio.create_task(end_game(winner_ws=None))
-
-        # Se o jogo está em game_over e jogadores suficientes ainda estão conectados, talvez reiniciar o countdown?
-        # Isso já é tratado no final da função end_game.
+                 self.enfileirar_transicao(self.end_game, None)
+        elif self.game_state == "in_game":
+            # A saída pode ter sido a última pendência da fase (verificação O(1))
+            if self.rodada.envios_completos():
+                self.enfileirar_transicao(self.iniciar_votacao)
+            elif self.rodada.votos_completos():
+                self.enfileirar_transicao(self.apurar_votos)
+
+        # Se o jogo está em game_over e jogadores suficientes ainda estão conectados, a revanche
+        # agendada por end_game (nova_partida) inicia um novo countdown.
+
+    # --- WebSocket Handler ---
+
+    async def handler(self, websocket, nome=""):
+        """Lê as mensagens de um cliente e as posta no ator da sala.
+
+        `nome` pode vir do gateway (rooms.py) quando a sala foi escolhida pela
+        primeira mensagem da conexão, que já foi decodificada lá.
+        """
+        self.log.info("cliente_conectado", jogador=websocket.remote_address)
+        self.conexoes += 1
+        codec_conexao = codec.da_conexao(websocket)
+        try:
+            await self.postar(Entrar(websocket, nome))
+
+            # --- Loop principal para receber mensagens ---
+            # Usamos async for, que lida nativamente com ConnectionClosed levantando StopAsyncIteration
+            async for message in websocket:
+                data = codec_conexao.decodificar(message)
+                if isinstance(data, dict):
+                    # Com a fila da sala cheia, esperamos aqui (e paramos de ler o socket)
+                    await self.postar(Mensagem(websocket, data))
+
+        # --- Tratamento de Exceções e Limpeza Final ---
+        except Exception:
+            # Captura QUALQUER outra exceção inesperada (ex.: frame inválido); ConnectionClosed NÃO vem para cá
+            self.log.erro("falha_na_conexao", jogador=websocket.remote_address, exc=True) # Com o traceback completo
+
+        finally:
+            # A limpeza também passa pelo ator; esperamos que ela seja aplicada para que o
+            # gateway (rooms.py) veja a sala já sem este cliente
+            concluido = asyncio.get_running_loop().create_future()
+            try:
+                await self.postar(Sair(websocket, concluido))
+                # No encerramento do processo o ator é cancelado junto com os handlers e a saída
+                # nunca seria aplicada: basta um dos dois terminar
+                esperas = [concluido] if self.tarefa_ator is None else [concluido, self.tarefa_ator]
+                await asyncio.wait(esperas, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.conexoes -= 1
 
 
 # --- Server Startup ---
 
-async def main(port):
-    print(f"Iniciando servidor na porta {port}...")
-    # Inicializa o estado do jogo
-    # Use create_task para a primeira atualização de estado para não bloquear o main
-    asyncio.create_task(update_game_state("waiting_for_players", f"Waiting for at least {min_players} players..."))
+async def main(port, codigo=None):
+    """Modo standalone: um processo servindo uma única sala (útil para testes)."""
+    log = registro.com()
+    log.info("servidor_iniciando", porta=port)
+    sala = GameRoom(codigo if codigo is not None else port)
 
     # Configura e roda o servidor WebSocket
-    async with websockets.serve(handler, "0.0.0.0", port):
-        print("Servidor iniciado com sucesso.")
+    async with websockets.serve(sala.handler, "0.0.0.0", port, select_subprotocol=codec.escolher_subprotocolo):
+        log.info("servidor_iniciado", porta=port)
         # Mantém o servidor rodando indefinidamente
         await asyncio.Future() # Bloqueia aqui até que o loop de eventos seja interrompido
 
 # --- Run the server ---
 if __name__ == "__main__":
     try:
-        import sys
         # Roda o loop de eventos asyncio
         port = int(os.environ.get("PORT", 10000))
-        asyncio.run(main(port))
+        codigo = sys.argv[1] if len(sys.argv) > 1 else None
+        asyncio.run(main(port, codigo))
     except KeyboardInterrupt:
-        print("Servidor encerrado manualmente (KeyboardInterrupt).")
-    except Exception as e:
-        print(f"Erro fatal no servidor: {e}")
-        traceback.print_exc() # Imprime o traceback completo para erros na inicialização
+        registro.com().info("servidor_encerrado", motivo="KeyboardInterrupt")
+    except Exception:
+        # Traceback completo para erros na inicialização (escrito antes de o processo sair, no atexit)
+        registro.com().erro("erro_fatal", exc=True)
@@ -0,0 +1,55 @@
+"""Cache de frames pré-codificados, compartilhado por todas as salas do processo.
+
+Várias mensagens são iguais para todo mundo e quase nunca mudam: o catálogo,
+a carta preta de cada ID, o estado da sala para quem entra, a saudação com o
+código da sala, o get_nome de cada rodada. Em vez de montar e serializar de
+novo a cada conexão, o frame é guardado pelo endereço do conteúdo: uma chave
+que determina a mensagem por completo, incluindo a versão do estado de que ela
+depende (ex.: ("catalogo", versao_catalogo)). Quando o estado muda, a chave
+muda junto; a entrada antiga deixa de ser pedida e sai pelo LRU. Conteúdo igual
+em salas diferentes (a mesma carta preta, o mesmo estado) é o mesmo frame.
+
+O cache é limitado em bytes (LRU) e conta acertos e faltas, expostos em
+/metrics (metricas.py).
+"""
+import collections
+
+MAX_BYTES = 8 * 1024 * 1024 # Tamanho aproximado (caracteres ou bytes dos frames) antes de descartar
+
+
+class CacheDeFrames:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._frames = collections.OrderedDict() # {(codec, chave): frame}, do menos ao mais recente
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+
+    def obter(self, codec_frame, chave, construir):
+        """Frame da mensagem `construir()` no codec dado; `construir` só é chamado numa falta."""
+        endereco = (codec_frame, chave)
+        frame = self._frames.get(endereco)
+        if frame is not None:
+            self._frames.move_to_end(endereco)
+            self.acertos += 1
+            return frame
+        self.faltas += 1
+        frame = codec_frame.codificar(construir())
+        tamanho = len(frame)
+        if tamanho <= self.max_bytes:
+            self._frames[endereco] = frame
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, antigo = self._frames.popitem(last=False)
+                self.bytes -= len(antigo)
+                self.descartes += 1
+        return frame
+
+    def estatisticas(self):
+        return {"acertos": self.acertos, "faltas": self.faltas, "descartes": self.descartes,
+                "itens": len(self._frames), "bytes": self.bytes}
+
+
+# Instância do processo, usada por todas as salas
+frames_estaticos = CacheDeFrames()
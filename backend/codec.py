@@ -0,0 +1,114 @@
+"""Codificação das mensagens, escolhida pelo subprotocolo WebSocket da conexão.
+
+  cah.msgpack  frames binários msgpack (client1.py, se o msgpack estiver instalado)
+  cah.json     frames de texto JSON (também o padrão de quem não pede subprotocolo,
+               como o frontend web)
+
+O JSON usa orjson quando ele está instalado e cai para o módulo json da
+biblioteca padrão se não estiver; para o cliente é o mesmo JSON. Todo
+encode/decode do servidor passa por aqui: a sala guarda o Codec de cada conexão
+e serializa uma mensagem uma vez por codec em uso, não por cliente.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SUBPROTOCOLO_JSON = "cah.json"
+SUBPROTOCOLO_MSGPACK = "cah.msgpack"
+
+
+class Codec:
+    """Serializa mensagens (dicts) em frames e monta o envelope "batch" sem decodificar os frames."""
+
+    nome = ""
+    binario = False
+
+    def codificar(self, mensagem):
+        raise NotImplementedError
+
+    def decodificar(self, frame):
+        raise NotImplementedError
+
+    def lote(self, frames):
+        """Frame {"action": "batch", "messages": [...]} a partir de frames já codificados."""
+        raise NotImplementedError
+
+
+class CodecJson(Codec):
+    nome = "json"
+
+    def codificar(self, mensagem):
+        return json.dumps(mensagem)
+
+    def decodificar(self, frame):
+        return json.loads(frame)
+
+    def lote(self, frames):
+        # Os frames já são JSON válidos: o envelope é montado por concatenação
+        return '{"action": "batch", "messages": [' + ", ".join(frames) + "]}"
+
+
+class CodecOrjson(CodecJson):
+    nome = "orjson"
+
+    def codificar(self, mensagem):
+        # Chaves inteiras (IDs de jogador no placar) viram strings, como no json;
+        # o resultado vai como texto para continuar sendo um frame de texto
+        return orjson.dumps(mensagem, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def decodificar(self, frame):
+        return orjson.loads(frame)
+
+
+class CodecMsgpack(Codec):
+    nome = "msgpack"
+    binario = True
+
+    # Mapa de 2 entradas {"action": "batch", "messages": <array>}, até o cabeçalho do array
+    _CABECALHO_LOTE = b"\x82\xa6action\xa5batch\xa8messages"
+
+    def codificar(self, mensagem):
+        return msgpack.packb(mensagem)
+
+    def decodificar(self, frame):
+        # IDs de jogador são chaves inteiras no placar
+        return msgpack.unpackb(frame, strict_map_key=False)
+
+    def lote(self, frames):
+        n = len(frames)
+        if n < 16:
+            tamanho = bytes((0x90 | n,))
+        elif n < 1 << 16:
+            tamanho = b"\xdc" + n.to_bytes(2, "big")
+        else:
+            tamanho = b"\xdd" + n.to_bytes(4, "big")
+        return self._CABECALHO_LOTE + tamanho + b"".join(frames)
+
+
+JSON = CodecOrjson() if orjson is not None else CodecJson()
+
+# {subprotocolo: Codec} que este servidor aceita (msgpack só se estiver instalado)
+CODECS = {SUBPROTOCOLO_JSON: JSON}
+if msgpack is not None:
+    CODECS[SUBPROTOCOLO_MSGPACK] = CodecMsgpack()
+
+
+def escolher_subprotocolo(_conexao, oferecidos):
+    """select_subprotocol do websockets: o primeiro oferecido que conhecemos; sem nenhum, JSON sem subprotocolo."""
+    for subprotocolo in oferecidos:
+        if subprotocolo in CODECS:
+            return subprotocolo
+    return None
+
+
+def da_conexao(websocket):
+    """Codec negociado no handshake da conexão."""
+    return CODECS.get(getattr(websocket, "subprotocol", None), JSON)
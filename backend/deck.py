@@ -0,0 +1,112 @@
+"""Baralhos de cartas com IDs inteiros.
+
+O catálogo interna os textos de cartas.py uma única vez por processo: cada
+carta vira um ID inteiro (sua posição no catálogo). As salas só manipulam IDs;
+o texto é consultado em O(1) quando precisa ir para o cliente.
+
+Cada sala tem seus próprios baralhos (`Deck`): uma pilha de compra embaralhada,
+sem reposição, e uma pilha de descarte que é reembaralhada quando a compra acaba.
+"""
+import hashlib
+import json
+import random
+
+from cartas import white_cards
+from cartas import black_cards
+
+
+class Catalogo:
+    """Textos das cartas indexados por ID inteiro, e o caminho inverso."""
+
+    def __init__(self, textos):
+        # dict.fromkeys remove duplicatas mantendo a ordem (IDs estáveis)
+        self.textos = list(dict.fromkeys(textos))
+        self.ids = {texto: i for i, texto in enumerate(self.textos)}
+
+    def __len__(self):
+        return len(self.textos)
+
+    def texto(self, card_id):
+        return self.textos[card_id]
+
+    def id(self, texto):
+        """ID da carta com este texto, ou None se ela não existir."""
+        return self.ids.get(texto)
+
+
+catalogo_brancas = Catalogo(white_cards)
+catalogo_pretas = Catalogo(black_cards)
+
+# Versão do catálogo = hash do conteúdo. Clientes guardam o catálogo por versão
+# e só precisam baixá-lo de novo quando as cartas mudarem.
+versao_catalogo = hashlib.sha256(
+    json.dumps([catalogo_brancas.textos, catalogo_pretas.textos], ensure_ascii=False).encode()
+).hexdigest()[:16]
+
+
+class Deck:
+    """Pilha de compra embaralhada (sem reposição) com descarte e reembaralhamento."""
+
+    def __init__(self, catalogo):
+        self.catalogo = catalogo
+        self.compra = list(range(len(catalogo)))
+        random.shuffle(self.compra)
+        self.descarte = []
+
+    def comprar(self, quantidade=1):
+        """Compra até `quantidade` cartas. Retorna menos se o baralho inteiro estiver nas mãos."""
+        if len(self.compra) < quantidade and self.descarte:
+            self._reembaralhar()
+        quantidade = min(quantidade, len(self.compra))
+        if quantidade <= 0:
+            return []
+        cartas = self.compra[-quantidade:]
+        del self.compra[-quantidade:]
+        return cartas
+
+    def comprar_uma(self):
+        """Compra uma carta, ou None se não houver nenhuma disponível."""
+        cartas = self.comprar(1)
+        return cartas[0] if cartas else None
+
+    def descartar(self, cartas):
+        self.descarte.extend(cartas)
+
+    def _reembaralhar(self):
+        random.shuffle(self.descarte)
+        # As cartas que restavam na compra continuam no topo
+        self.compra = self.descarte + self.compra
+        self.descarte = []
+
+
+class Mao:
+    """Mão de um jogador: IDs em ordem de chegada, com pertinência e remoção em O(1)."""
+
+    def __init__(self, cartas=()):
+        # dict preserva a ordem de inserção e funciona como um conjunto ordenado
+        self.cartas = dict.fromkeys(cartas)
+
+    def __len__(self):
+        return len(self.cartas)
+
+    def __contains__(self, card_id):
+        return card_id in self.cartas
+
+    def __iter__(self):
+        return iter(self.cartas)
+
+    def adicionar(self, cartas):
+        for card_id in cartas:
+            self.cartas[card_id] = None
+
+    def remover(self, card_id):
+        """Remove a carta da mão. Retorna False se ela não estava na mão."""
+        if card_id in self.cartas:
+            del self.cartas[card_id]
+            return True
+        return False
+
+    def esvaziar(self):
+        cartas = list(self.cartas)
+        self.cartas.clear()
+        return cartas
@@ -0,0 +1,46 @@
+"""Eventos de uma sala.
+
+Cada GameRoom é um ator: as conexões não mexem no estado da sala, só postam
+estes eventos numa fila limitada, e uma única task da sala os aplica um de
+cada vez, na ordem de chegada (ver GameRoom.executar em app.py).
+"""
+
+
+class Entrar:
+    """Conexão nova na sala (`nome` vem do gateway, se a sala foi escolhida pela primeira mensagem)."""
+
+    __slots__ = ("websocket", "nome")
+
+    def __init__(self, websocket, nome=""):
+        self.websocket = websocket
+        self.nome = nome
+
+
+class Sair:
+    """Conexão encerrada. `concluido` é resolvido depois que a saída foi aplicada."""
+
+    __slots__ = ("websocket", "concluido")
+
+    def __init__(self, websocket, concluido):
+        self.websocket = websocket
+        self.concluido = concluido
+
+
+class Mensagem:
+    """Mensagem JSON já decodificada de um cliente (submit, vote, nome, resync...)."""
+
+    __slots__ = ("websocket", "data")
+
+    def __init__(self, websocket, data):
+        self.websocket = websocket
+        self.data = data
+
+
+class Tick:
+    """Prazo vencido no agendador (countdown, fase da rodada, pausa entre fases): `callback(*args)`."""
+
+    __slots__ = ("callback", "args")
+
+    def __init__(self, callback, args=()):
+        self.callback = callback
+        self.args = args
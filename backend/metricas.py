@@ -0,0 +1,188 @@
+"""Métricas do processo no formato de texto do Prometheus.
+
+Três tipos, todos registrados em METRICAS ao serem criados:
+
+  Contador    só cresce (mensagens por action); um rótulo opcional. Pode ler o
+              total na coleta, de quem já conta (acertos do cache de frames)
+  Medidor     valor lido na hora da coleta, por uma função (salas, conexões, filas)
+  Histograma  buckets fixos, escolhidos na criação (duração de broadcast, das fases)
+
+Registrar uma observação não aloca estruturas: o contador do bucket é uma
+posição de uma lista criada junto com o histograma (achada por bisect), e os
+rótulos dos histogramas também são fixos na criação. O texto só é montado
+quando alguém lê /metrics.
+
+O endpoint é um servidor HTTP mínimo em 127.0.0.1 (ver servir), na porta de
+METRICAS_PORTA (padrão 9400; 0 desliga). No modo supervisor, o worker i usa
+METRICAS_PORTA + i, já que cada worker tem as suas salas.
+"""
+import asyncio
+import bisect
+import os
+
+import registro
+from cache_frames import frames_estaticos
+
+log = registro.com()
+
+METRICAS = [] # Na ordem de criação, que é a ordem de exposição
+PORTA = int(os.environ.get("METRICAS_PORTA", 9400))
+
+# Buckets (segundos) para operações dentro de um tick e para fases de jogo
+BUCKETS_RAPIDOS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+BUCKETS_FASES = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120)
+
+
+def _rotulos(nome, valor, extra=""):
+    if nome is None:
+        return "{" + extra + "}" if extra else ""
+    par = f'{nome}="{valor}"'
+    return "{" + par + ("," + extra if extra else "") + "}"
+
+
+class Contador:
+    def __init__(self, nome, ajuda, rotulo=None, coletar=None):
+        """Com `coletar`, o total vem de `coletar()` (ou {valor do rótulo: total}) em vez de inc()."""
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulo = rotulo
+        self.coletar = coletar
+        self.valores = {} # {valor do rótulo: total}; sem rótulo, a chave é None
+        METRICAS.append(self)
+
+    def inc(self, valor_rotulo=None, n=1):
+        self.valores[valor_rotulo] = self.valores.get(valor_rotulo, 0) + n
+
+    def expor(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        valores = self.valores
+        if self.coletar is not None:
+            valores = self.coletar() if self.rotulo is not None else {None: self.coletar()}
+        for valor_rotulo, total in valores.items():
+            linhas.append(f"{self.nome}{_rotulos(self.rotulo, valor_rotulo)} {total}")
+        return linhas
+
+
+class Medidor:
+    def __init__(self, nome, ajuda, coletar, rotulo=None):
+        """`coletar()` devolve o valor, ou {valor do rótulo: valor} se houver `rotulo`."""
+        self.nome = nome
+        self.ajuda = ajuda
+        self.coletar = coletar
+        self.rotulo = rotulo
+        METRICAS.append(self)
+
+    def expor(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} gauge"]
+        valor = self.coletar()
+        if self.rotulo is None:
+            linhas.append(f"{self.nome} {valor}")
+        else:
+            for valor_rotulo, v in valor.items():
+                linhas.append(f"{self.nome}{_rotulos(self.rotulo, valor_rotulo)} {v}")
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome, ajuda, limites, rotulo=None, valores_rotulo=(None,)):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.limites = tuple(limites)
+        self.rotulo = rotulo
+        # {valor do rótulo: [contagem por bucket (o último é +Inf), soma]}, tudo alocado aqui
+        self.series = {v: [[0] * (len(self.limites) + 1), 0.0] for v in valores_rotulo}
+        METRICAS.append(self)
+
+    def observar(self, valor, valor_rotulo=None):
+        serie = self.series[valor_rotulo]
+        serie[0][bisect.bisect_left(self.limites, valor)] += 1
+        serie[1] += valor
+
+    def expor(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for valor_rotulo, (contagens, soma) in self.series.items():
+            acumulado = 0
+            for limite, contagem in zip(self.limites + ("+Inf",), contagens):
+                acumulado += contagem
+                le = 'le="' + str(limite) + '"'
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulo, valor_rotulo, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulo, valor_rotulo)} {soma}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulo, valor_rotulo)} {acumulado}")
+        return linhas
+
+
+def expor():
+    """Todas as métricas do processo, no formato de texto do Prometheus."""
+    linhas = []
+    for metrica in METRICAS:
+        linhas.extend(metrica.expor())
+    return "\n".join(linhas) + "\n"
+
+
+# --- Métricas das salas (app.py) ---
+mensagens_recebidas = Contador("cah_mensagens_recebidas_total", "Mensagens recebidas dos clientes, por action.", "action")
+mensagens_enviadas = Contador("cah_mensagens_enviadas_total", "Mensagens enviadas aos clientes (uma por destinatário), por action.", "action")
+duracao_descarga = Histograma("cah_broadcast_segundos", "Tempo para escrever nas conexões os frames de um tick de uma sala.", BUCKETS_RAPIDOS)
+duracao_fase = Histograma("cah_fase_segundos", "Duração das fases da rodada.", BUCKETS_FASES, "fase", ("envio", "votacao"))
+atraso_loop = Histograma("cah_loop_atraso_segundos", "Atraso do event loop em acordar uma tarefa que dormiu INTERVALO_LOOP.", BUCKETS_RAPIDOS)
+
+# --- Cache de frames pré-codificados (cache_frames.py), lidos na coleta ---
+Contador("cah_cache_frames_total", "Consultas ao cache de frames pré-codificados, por resultado.", "resultado",
+         lambda: {"acerto": frames_estaticos.acertos, "falta": frames_estaticos.faltas})
+Contador("cah_cache_frames_descartes_total", "Frames descartados do cache pelo limite de bytes (LRU).",
+         coletar=lambda: frames_estaticos.descartes)
+Medidor("cah_cache_frames_bytes", "Tamanho dos frames guardados no cache.", lambda: frames_estaticos.bytes)
+
+INTERVALO_LOOP = 0.25 # Segundos entre as medidas do atraso do loop
+_monitor = None # Task do monitorar_loop (referência guardada para não ser coletada)
+
+
+async def monitorar_loop():
+    """Mede continuamente quanto o loop demora além do previsto para acordar uma tarefa."""
+    loop = asyncio.get_running_loop()
+    while True:
+        inicio = loop.time()
+        await asyncio.sleep(INTERVALO_LOOP)
+        atraso_loop.observar(max(0.0, loop.time() - inicio - INTERVALO_LOOP))
+
+
+async def _responder(leitor, escritor):
+    try:
+        requisicao = await asyncio.wait_for(leitor.readline(), 5)
+        while (await asyncio.wait_for(leitor.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass # Cabeçalhos ignorados
+        partes = requisicao.split()
+        if len(partes) >= 2 and partes[0] == b"GET" and partes[1].split(b"?")[0] == b"/metrics":
+            status, tipo, corpo = "200 OK", "text/plain; version=0.0.4; charset=utf-8", expor().encode()
+        else:
+            status, tipo, corpo = "404 Not Found", "text/plain; charset=utf-8", b"Use /metrics\n"
+        escritor.write(f"HTTP/1.1 {status}\r\nContent-Type: {tipo}\r\nContent-Length: {len(corpo)}\r\n"
+                       f"Connection: close\r\n\r\n".encode() + corpo)
+        await escritor.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        escritor.close()
+
+
+def porta_do_worker(indice):
+    """Porta de métricas do worker `indice` no modo supervisor (0 se desligado)."""
+    return PORTA + indice if PORTA else 0
+
+
+async def servir(porta=PORTA, host="127.0.0.1"):
+    """Sobe o endpoint /metrics e o monitor do loop neste event loop (porta 0: não faz nada).
+
+    Se a porta não abrir (ocupada, sem permissão), avisa e segue sem métricas:
+    o jogo não depende delas.
+    """
+    global _monitor
+    if not porta:
+        return None
+    try:
+        servidor = await asyncio.start_server(_responder, host, porta)
+    except OSError as erro:
+        log.aviso("metricas_indisponiveis", porta=porta, motivo=str(erro))
+        return None
+    _monitor = asyncio.get_running_loop().create_task(monitorar_loop())
+    return servidor
@@ -0,0 +1,60 @@
+"""Placar versionado de uma sala.
+
+Os jogadores são identificados por um ID numérico da sala (nomes podem se
+repetir). O placar é o dono da pontuação: a sala só guarda o ID do jogador.
+Cada alteração fica pendente até `publicar()`, que incrementa a versão e
+devolve um `scores_delta` só com as entradas que mudaram; se nada mudou, não
+há o que enviar. O `scores_update` completo (para quem acabou de entrar ou
+pediu resync) é serializado uma vez por codec (ver codec.py) e reaproveitado
+até a próxima alteração.
+"""
+import codec
+
+
+class Placar:
+    def __init__(self):
+        self.versao = 0
+        self.entradas = {} # {jogador_id: [nome, score]}
+        self._alteradas = {} # {jogador_id: [nome, score] ou None (saiu)} desde a última publicação
+        self._snapshots = {} # {Codec: frame scores_update pré-codificado}
+
+    def definir(self, jogador_id, nome, score):
+        entrada = [nome, score]
+        if self.entradas.get(jogador_id) == entrada:
+            return
+        self.entradas[jogador_id] = entrada
+        self._alteradas[jogador_id] = entrada
+        self._snapshots.clear()
+
+    def remover(self, jogador_id):
+        if self.entradas.pop(jogador_id, None) is not None:
+            self._alteradas[jogador_id] = None
+            self._snapshots.clear()
+
+    def pontos(self, jogador_id):
+        """Pontuação atual do jogador (0 se ele ainda não está no placar)."""
+        entrada = self.entradas.get(jogador_id)
+        return entrada[1] if entrada is not None else 0
+
+    def pontuar(self, jogador_id, pontos=1):
+        """Soma `pontos` ao jogador e devolve a nova pontuação."""
+        nome, score = self.entradas[jogador_id]
+        self.definir(jogador_id, nome, score + pontos)
+        return score + pontos
+
+    def publicar(self):
+        """Mensagem scores_delta com as alterações pendentes (nova versão), ou None se nada mudou."""
+        if not self._alteradas:
+            return None
+        self.versao += 1
+        self._snapshots.clear()
+        alteradas, self._alteradas = self._alteradas, {}
+        return {"action": "scores_delta", "versao": self.versao, "scores": alteradas}
+
+    def snapshot(self, codec_conexao=codec.JSON):
+        """Frame scores_update com o placar inteiro na versão atual, no codec pedido."""
+        frame = self._snapshots.get(codec_conexao)
+        if frame is None:
+            frame = self._snapshots[codec_conexao] = codec_conexao.codificar(
+                {"action": "scores_update", "versao": self.versao, "scores": self.entradas})
+        return frame
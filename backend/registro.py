@@ -0,0 +1,172 @@
+"""Log estruturado que não bloqueia o event loop.
+
+Quem registra (a sala, o gateway) só monta uma tupla e a coloca numa fila em
+memória; uma thread em segundo plano formata os registros (uma linha JSON por
+registro) e escreve na saída em lotes, a cada INTERVALO segundos ou quando a
+fila passa da metade. Assim uma escrita lenta no stdout (terminal, pipe, disco)
+não aumenta as iterações do loop.
+
+    log = registro.com(sala="1234")
+    log.info("rodada_iniciada", carta=17)
+    log.debug("voto", amostra=100, jogador="Ana")  # 1 a cada 100 (com "omitidos")
+    log.erro("falha_no_evento", exc=True)          # traceback formatado na thread
+
+Configuração pelo ambiente: LOG_NIVEL (debug, info, aviso, erro; padrão info).
+Se a fila encher (saída travada), os registros novos são descartados e contados;
+a contagem sai no próximo registro escrito.
+"""
+import atexit
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+NIVEIS = {"debug": 10, "info": 20, "aviso": 30, "erro": 40}
+INTERVALO = 0.1 # Segundos entre escritas da thread
+FILA_MAX = 10000 # Registros pendentes antes de descartar
+
+
+class Escritor:
+    """Fila de registros + thread que os formata e escreve."""
+
+    def __init__(self, saida=None, nivel="info", sincrono=False):
+        self.saida = saida # None: sys.stdout do momento da escrita (respeita redirecionamentos)
+        self.nivel = NIVEIS[nivel]
+        self.sincrono = sincrono # Escreve na hora, na thread de quem registrou (para comparação)
+        self.fila = collections.deque()
+        self.descartados = 0
+        self.acordar = threading.Event()
+        self.trava = threading.Lock() # Um descarregamento por vez (thread, configurar, atexit)
+        self.thread = None
+        self.amostras = {} # {evento: registros vistos}, para a amostragem
+
+    def registrar(self, nivel, evento, contexto, campos, exc):
+        if self.sincrono:
+            self.escrever([(time.time(), nivel, evento, contexto, campos, exc)])
+            return
+        if len(self.fila) >= FILA_MAX:
+            self.descartados += 1
+            return
+        # deque.append é atômico: não precisa de lock do lado do event loop
+        self.fila.append((time.time(), nivel, evento, contexto, campos, exc))
+        if self.thread is None:
+            self.iniciar()
+        elif len(self.fila) > FILA_MAX // 2:
+            self.acordar.set()
+
+    def iniciar(self):
+        self.thread = threading.Thread(target=self.executar, name="registro", daemon=True)
+        self.thread.start()
+        atexit.register(self.descarregar)
+
+    def executar(self):
+        while True:
+            self.acordar.wait(INTERVALO)
+            self.acordar.clear()
+            self.descarregar()
+
+    def descarregar(self):
+        with self.trava:
+            registros = []
+            try:
+                while True:
+                    registros.append(self.fila.popleft())
+            except IndexError:
+                pass
+            if registros:
+                self.escrever(registros)
+
+    def escrever(self, registros):
+        saida = self.saida or sys.stdout
+        linhas = []
+        if self.descartados:
+            descartados, self.descartados = self.descartados, 0
+            linhas.append(json.dumps({"ts": round(time.time(), 3), "nivel": "aviso", "evento": "registros_descartados",
+                                      "quantidade": descartados}))
+        for instante, nivel, evento, contexto, campos, exc in registros:
+            linha = {"ts": round(instante, 3), "nivel": nivel, "evento": evento}
+            linha.update(contexto)
+            linha.update(campos)
+            if exc is not None:
+                linha["traceback"] = "".join(traceback.format_exception(*exc))
+            # default=str: endereços, exceções e afins viram texto em vez de derrubar o log
+            linhas.append(json.dumps(linha, ensure_ascii=False, default=str))
+            if not self.sincrono:
+                # Solta o GIL a cada registro: se o loop acordou enquanto formatamos, ele
+                # não espera o intervalo de troca inteiro (sys.getswitchinterval, 5 ms)
+                time.sleep(0)
+        try:
+            saida.write("\n".join(linhas) + "\n")
+            saida.flush()
+        except (OSError, ValueError):
+            pass # Saída fechada (ex.: no encerramento): o log não derruba o servidor
+
+    def apos_fork(self):
+        # A thread não sobrevive ao fork (workers do sharding.py): o filho sobe a sua e
+        # não reescreve o que o pai ainda tinha pendente
+        self.fila.clear()
+        self.thread = None
+        self.acordar = threading.Event()
+        self.trava = threading.Lock()
+
+
+escritor = Escritor(nivel=os.environ.get("LOG_NIVEL", "info"))
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=escritor.apos_fork)
+
+
+def configurar(nivel=None, saida=None, sincrono=None):
+    """Troca o nível, a saída ou o modo do escritor do processo (pendentes são escritos antes)."""
+    escritor.descarregar()
+    if nivel is not None:
+        escritor.nivel = NIVEIS[nivel]
+    if saida is not None:
+        escritor.saida = saida
+    if sincrono is not None:
+        escritor.sincrono = sincrono
+
+
+class Registro:
+    """Registrador com contexto fixo (ex.: sala=<código>), incluído em todos os registros."""
+
+    __slots__ = ("contexto",)
+
+    def __init__(self, contexto=None):
+        self.contexto = contexto or {}
+
+    def com(self, **contexto):
+        """Registrador com o contexto deste mais `contexto`."""
+        return Registro({**self.contexto, **contexto})
+
+    def registrar(self, nivel, evento, amostra=1, exc=False, **campos):
+        if NIVEIS[nivel] < escritor.nivel:
+            return
+        if amostra > 1:
+            # Eventos frequentes: escreve o 1º de cada `amostra` e diz quantos foram omitidos
+            vistos = escritor.amostras.get(evento, 0)
+            escritor.amostras[evento] = vistos + 1
+            if vistos % amostra:
+                return
+            if vistos:
+                campos["omitidos"] = amostra - 1
+        escritor.registrar(nivel, evento, self.contexto, campos, sys.exc_info() if exc else None)
+
+    def debug(self, evento, **campos):
+        self.registrar("debug", evento, **campos)
+
+    def info(self, evento, **campos):
+        self.registrar("info", evento, **campos)
+
+    def aviso(self, evento, **campos):
+        self.registrar("aviso", evento, **campos)
+
+    def erro(self, evento, **campos):
+        self.registrar("erro", evento, **campos)
+
+
+def com(**contexto):
+    """Registrador do processo com o contexto dado (ex.: registro.com(sala="1234"))."""
+    return Registro(contexto)
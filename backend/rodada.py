@@ -0,0 +1,69 @@
+"""Apuração de uma rodada.
+
+Guarda quem ainda precisa jogar e votar, de quem é cada carta e a contagem de
+votos com o(s) líder(es) atualizados a cada voto. Submeter, votar e saber se a
+fase terminou custam O(1), independentemente do número de jogadores.
+
+Só participa da rodada quem estava na sala quando ela começou (para submeter)
+ou quando a votação abriu (para votar); quem entra no meio espera a próxima e
+não trava a rodada dos outros.
+"""
+import random
+
+
+class Rodada:
+    def __init__(self, jogadores=()):
+        self.pendentes_envio = set(jogadores) # Quem ainda não submeteu
+        self.pendentes_voto = set()           # Quem ainda não votou (preenchido ao abrir a votação)
+        self.autores = {}                     # {card_id: websocket de quem submeteu}, em ordem de envio
+        self.votos = {}                       # {card_id: votos}
+        self.total_votos = 0
+        self.max_votos = 0
+        self.lideres = []                     # Cartas empatadas com max_votos
+        self.votacao_aberta = False
+        self.apurada = False
+
+    def submeter(self, jogador, card_id):
+        """Registra a carta do jogador. Retorna False se ele não deve submeter nesta rodada."""
+        if self.votacao_aberta or jogador not in self.pendentes_envio:
+            return False
+        self.pendentes_envio.discard(jogador)
+        self.autores[card_id] = jogador
+        return True
+
+    def envios_completos(self):
+        return not self.votacao_aberta and not self.pendentes_envio and bool(self.autores)
+
+    def abrir_votacao(self, jogadores):
+        self.votacao_aberta = True
+        self.pendentes_voto = set(jogadores)
+
+    def votar(self, jogador, card_id):
+        """Registra o voto. Retorna False se o voto não vale (fora da votação, repetido ou carta inválida)."""
+        if not self.votacao_aberta or jogador not in self.pendentes_voto or card_id not in self.autores:
+            return False
+        self.pendentes_voto.discard(jogador)
+        votos = self.votos.get(card_id, 0) + 1
+        self.votos[card_id] = votos
+        self.total_votos += 1
+        if votos > self.max_votos:
+            self.max_votos = votos
+            self.lideres = [card_id]
+        elif votos == self.max_votos:
+            self.lideres.append(card_id)
+        return True
+
+    def votos_completos(self):
+        return self.votacao_aberta and not self.apurada and not self.pendentes_voto
+
+    def remover_jogador(self, jogador):
+        """Quem sai da sala deixa de ser esperado (a carta dele, se já jogou, continua valendo)."""
+        self.pendentes_envio.discard(jogador)
+        self.pendentes_voto.discard(jogador)
+
+    def vencedora(self):
+        """Carta mais votada (sorteio em caso de empate), ou None se ninguém votou."""
+        return random.choice(self.lideres) if self.lideres else None
+
+    def cartas(self):
+        return list(self.autores)
@@ -1,52 +1,158 @@
+import argparse
 import asyncio
+import collections
 import websockets
-import json
-import subprocess
 import os
 
-def iniciar_partida(porta):
-    diretorio = __file__
-    diretorio = os.path.dirname(__file__)
-    subprocess.Popen(
-        ["python3", f"{diretorio}/app.py", str(porta)]
-    )
-    print(f"Partida iniciada na porta {porta}")
+from app import GameRoom
+from timers import agendador
+import codec
+import metricas
+import registro
+import sharding
 
-# Dicionário para armazenar as salas e nomes conectados
+log = registro.com()
+
+# Dicionário para armazenar as salas ativas: {codigo: GameRoom}
+# Todas as salas rodam no mesmo event loop deste processo (antes era um subprocesso por sala).
 salas = {}
 
+# Todas as conexões (lobby e jogo) chegam nesta porta; a sala é escolhida pelo caminho.
+PORT = int(os.environ.get("PORT", 4000))
+PREFIXO_SALA = "/sala/"
+
+# No modo supervisor, cada worker só hospeda as salas que o anel atribui a ele
+anel = None
+indice_worker = 0
+
+# Métricas lidas na coleta (ver metricas.py); as de mensagens, broadcast e fases vêm das salas
+metricas.Medidor("cah_salas_ativas", "Salas hospedadas neste processo.", lambda: len(salas))
+metricas.Medidor("cah_conexoes_ativas", "Conexões nas salas deste processo.",
+                 lambda: sum(sala.conexoes for sala in salas.values()))
+metricas.Medidor("cah_jogadores", "Jogadores nas salas deste processo.",
+                 lambda: sum(sala.get_player_count() for sala in salas.values()))
+metricas.Medidor("cah_salas_por_estado", "Salas em cada estado da máquina de estados.",
+                 lambda: collections.Counter(sala.game_state for sala in salas.values()), "estado")
+metricas.Medidor("cah_fila_eventos", "Eventos pendentes nas filas das salas (soma e maior fila).",
+                 lambda: {"soma": sum(sala.eventos.qsize() for sala in salas.values()),
+                          "max": max((sala.eventos.qsize() for sala in salas.values()), default=0)}, "medida")
+metricas.Medidor("cah_prazos_pendentes", "Prazos pendentes na roda de timers (countdowns, fases, pausas).",
+                 lambda: agendador().pendentes())
+
+def configurar_worker(indice, anel_do_supervisor):
+    global anel, indice_worker
+    indice_worker = indice
+    anel = anel_do_supervisor
+
+def sala_e_local(codigo):
+    return anel is None or anel.dono(codigo) == indice_worker
+
+def iniciar_partida(codigo):
+    sala = GameRoom(codigo)
+    salas[sala.codigo] = sala
+    log.info("sala_criada", sala=sala.codigo)
+    return sala
+
+def obter_sala(codigo):
+    """Busca a sala pelo código (O(1)), criando-a se ainda não existir."""
+    sala = salas.get(codigo)
+    if sala is None:
+        sala = iniciar_partida(codigo)
+    return sala
+
+def codigo_da_rota(path):
+    """Extrai o código da sala de um caminho `/sala/<codigo>` (ou `?sala=<codigo>`)."""
+    caminho, _, query = path.partition("?")
+    if caminho.startswith(PREFIXO_SALA):
+        return caminho[len(PREFIXO_SALA):].strip("/") or None
+    for parametro in query.split("&"):
+        chave, _, valor = parametro.partition("=")
+        if chave == "sala" and valor:
+            return valor
+    return None
+
+async def entrar_na_sala(websocket, codigo, nome=""):
+    """Entrega a conexão para a sala. A partir daqui quem lê as mensagens é a GameRoom."""
+    sala = obter_sala(codigo)
+    try:
+        await sala.handler(websocket, nome)
+    finally:
+        # Descarta salas que ficaram vazias para não acumular memória
+        if sala.vazia() and salas.get(sala.codigo) is sala:
+            del salas[sala.codigo]
+            sala.encerrar()
+            log.info("sala_encerrada", sala=sala.codigo, motivo="sem_jogadores")
+
 async def handler(websocket):
+    # Conexão de jogo roteada pelo caminho (ex.: ws://host:4000/sala/1234)
+    codigo = codigo_da_rota(websocket.request.path)
+    if codigo is not None:
+        await entrar_na_sala(websocket, codigo)
+        return
+
+    # Sem sala no caminho: conexão de lobby, ou de jogo roteada pela primeira mensagem
+    codec_conexao = codec.da_conexao(websocket)
     try:
         async for message in websocket:
-            print("Mensagem recebida:", message)
+            # Uma por mensagem do lobby: amostrada, e sem o conteúdo (pode ser binário/grande)
+            log.debug("mensagem_lobby", amostra=100, tamanho=len(message))
 
             try:
-                data = json.loads(message)
-                if data["type"] == "join":
+                data = codec_conexao.decodificar(message)
+                if not isinstance(data, dict): # JSON/msgpack válido, mas não um objeto (ex.: [] ou 1)
+                    metricas.mensagens_recebidas.inc("desconhecida")
+                    await websocket.send("Tipo de mensagem não reconhecido.")
+                    continue
+                tipo = data.get("type") or data.get("action")
+                metricas.mensagens_recebidas.inc(tipo if tipo in ("join", "entrar_sala") else "desconhecida")
+                if data.get("type") == "join":
                     nome = data["nome"]
-                    sala = data["sala"]
+                    sala = str(data["sala"])
 
-                    if sala not in salas:
-                        salas[sala] = []
-                        iniciar_partida(sala)
-                    salas[sala].append(nome)
+                    # A sala só é criada quando o jogo conectar (entrar_na_sala, no worker dono):
+                    # criada aqui, ficaria no dicionário para sempre se ninguém entrasse nela
 
-                    print(f"{nome} entrou na sala '{sala}'")
+                    log.info("entrou_na_sala", sala=sala, nome=nome)
                     await websocket.send(f"Bem-vindo, {nome}! Você entrou na sala '{sala}'.")
 
+                elif data.get("action") == "entrar_sala" and data.get("sala"):
+                    sala = str(data["sala"])
+                    if not sala_e_local(sala):
+                        # Depois do handshake a conexão não pode mudar de processo
+                        await websocket.send(codec_conexao.codificar({"action": "error", "reason": f"Conecte-se por {PREFIXO_SALA}{sala}."}))
+                        return
+                    # A mensagem já foi decodificada aqui; a sala recebe só o nome
+                    await entrar_na_sala(websocket, sala, data.get("nome", ""))
+                    return
+
                 else:
                     await websocket.send("Tipo de mensagem não reconhecido.")
 
-            except json.JSONDecodeError:
+            except ValueError: # JSON/msgpack inválido (os erros de decodificação herdam de ValueError)
                 await websocket.send("Erro: mensagem JSON inválida.")
 
     except websockets.exceptions.ConnectionClosed:
-        print("Conexão encerrada.")
+        log.debug("conexao_encerrada", amostra=100)
 
-# Iniciar o servidor na porta 4000
+# Iniciar o servidor (porta única para todas as salas)
 async def main():
-    async with websockets.serve(handler, "0.0.0.0", 4000):
-        print("Servidor WebSocket iniciado em ws://localhost:4000")
+    await metricas.servir()
+    async with websockets.serve(handler, "0.0.0.0", PORT, select_subprotocol=codec.escolher_subprotocolo):
+        log.info("servidor_iniciado", url=f"ws://localhost:{PORT}")
         await asyncio.Future()  # mantém o servidor rodando
 
-asyncio.run(main())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de salas")
+    parser.add_argument("--supervisor", action="store_true",
+                        help="inicia um worker por núcleo, com as salas distribuídas por hashing consistente")
+    nucleos = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    parser.add_argument("--workers", type=int, default=nucleos,
+                        help="número de workers no modo supervisor (padrão: um por núcleo)")
+    args = parser.parse_args()
+
+    if args.supervisor and sharding.suportado():
+        sharding.supervisionar(args.workers, "0.0.0.0", PORT, handler, codigo_da_rota, configurar_worker)
+    else:
+        if args.supervisor:
+            log.aviso("supervisor_indisponivel", motivo="SO_REUSEPORT/send_fds indisponíveis; rodando em um único processo")
+        asyncio.run(main())
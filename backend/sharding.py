@@ -0,0 +1,280 @@
+"""Sharding de salas entre vários processos (modo supervisor do rooms.py).
+
+O supervisor inicia um worker por núcleo. Todos os workers escutam na mesma
+porta com SO_REUSEPORT, então o kernel distribui os accepts entre os núcleos.
+Cada sala pertence a um único worker, escolhido por hashing consistente do
+código da sala. Quando um worker aceita uma conexão de uma sala que não é
+dele, ele lê (sem consumir) a linha da requisição HTTP, descobre o caminho
+`/sala/<codigo>` e passa o file descriptor para o worker dono via socket Unix
+(SCM_RIGHTS). O handshake WebSocket acontece sempre no worker dono.
+"""
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import time
+
+from websockets.asyncio.server import Server, ServerConnection
+from websockets.extensions.permessage_deflate import enable_server_permessage_deflate
+from websockets.server import ServerProtocol
+
+import codec
+import metricas
+import registro
+
+log = registro.com()
+
+VNODES = 64 # Pontos por worker no anel (suaviza a distribuição das salas)
+TAMANHO_ESPIADA = 4096 # Bytes lidos com MSG_PEEK para achar a linha da requisição
+TIMEOUT_ESPIADA = 10 # Segundos (no total) esperando a linha da requisição antes de desistir
+RESPOSTA_INDISPONIVEL = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n"
+                         b"Connection: close\r\n\r\n")
+# Reinício dos workers: espera REINICIO_BASE * 2^(falhas-1) segundos (até REINICIO_MAXIMO) após
+# cada falha rápida (worker que viveu menos de FALHA_RAPIDA s) e desiste depois de MAX_FALHAS_RAPIDAS
+REINICIO_BASE = 0.5
+REINICIO_MAXIMO = 30
+FALHA_RAPIDA = 10
+MAX_FALHAS_RAPIDAS = 5
+
+
+def suportado():
+    """Indica se a plataforma tem o necessário para o modo supervisor."""
+    return hasattr(socket, "SO_REUSEPORT") and hasattr(socket, "send_fds")
+
+
+def _hash(texto):
+    # hash() do Python é aleatorizado por processo; o anel precisa ser igual em todos os workers
+    return int.from_bytes(hashlib.blake2b(texto.encode(), digest_size=8).digest(), "big")
+
+
+class AnelConsistente:
+    """Anel de hashing consistente: código da sala -> índice do worker."""
+
+    def __init__(self, workers, vnodes=VNODES):
+        pontos = sorted((_hash(f"worker-{w}#{v}"), w) for w in range(workers) for v in range(vnodes))
+        self._hashes = [h for h, _ in pontos]
+        self._donos = [w for _, w in pontos]
+
+    def dono(self, codigo):
+        i = bisect.bisect(self._hashes, _hash(str(codigo)))
+        return self._donos[i % len(self._donos)]
+
+
+def caminho_da_requisicao(dados):
+    """Extrai o caminho da linha `GET /sala/123 HTTP/1.1`, ou None se ainda incompleta."""
+    linha, separador, _ = dados.partition(b"\r\n")
+    if not separador:
+        return None
+    partes = linha.split()
+    return partes[1].decode("latin-1") if len(partes) >= 2 else ""
+
+
+class ServidorDeSockets(Server):
+    """Server do websockets alimentado com sockets já aceitos.
+
+    Os accepts são feitos pelo worker (para poder repassar a conexão ao dono
+    da sala), então não existe um asyncio.Server por baixo deste objeto.
+    """
+
+    def is_serving(self):
+        return True
+
+
+class Worker:
+    def __init__(self, indice, total, host, porta, canais, handler, codigo_da_rota):
+        self.indice = indice
+        self.anel = AnelConsistente(total)
+        self.host = host
+        self.porta = porta
+        self.canais = canais # [(recebe, envia)] de todos os workers
+        self.handler = handler
+        self.codigo_da_rota = codigo_da_rota
+
+    def _fabrica(self):
+        # Mesmos padrões do websockets.serve()
+        protocolo = ServerProtocol(extensions=enable_server_permessage_deflate(None),
+                                   select_subprotocol=codec.escolher_subprotocolo)
+        return ServerConnection(protocolo, self.servidor)
+
+    def _servir(self, sock):
+        """Entrega um socket já aceito ao websockets neste processo."""
+        self.loop.create_task(self.loop.connect_accepted_socket(self._fabrica, sock))
+
+    async def _espiar_caminho(self, conn):
+        """Caminho da requisição lido sem consumir os bytes, ou None se o cliente fechou antes.
+
+        Todo o espiar tem um único prazo (TIMEOUT_ESPIADA). Com a linha ainda
+        incompleta, SO_RCVLOWAT faz o socket só ficar legível quando chegar
+        mais do que já foi espiado, em vez de acordar de novo com os mesmos bytes.
+        """
+        pronto = None
+
+        def acordar():
+            if not pronto.done():
+                pronto.set_result(None)
+
+        prazo = self.loop.time() + TIMEOUT_ESPIADA
+        espiados = 0
+        try:
+            while True:
+                pronto = self.loop.create_future()
+                self.loop.add_reader(conn.fileno(), acordar)
+                try:
+                    await asyncio.wait_for(pronto, max(0, prazo - self.loop.time()))
+                finally:
+                    self.loop.remove_reader(conn.fileno())
+                dados = conn.recv(TAMANHO_ESPIADA, socket.MSG_PEEK)
+                if len(dados) <= espiados:
+                    return None # Fechou (ou erro) antes de mandar a requisição inteira
+                caminho = caminho_da_requisicao(dados)
+                if caminho is not None or len(dados) >= TAMANHO_ESPIADA:
+                    return caminho or ""
+                espiados = len(dados) # Linha incompleta: espera chegar o resto
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVLOWAT, espiados + 1)
+        finally:
+            if espiados:
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVLOWAT, 1)
+
+    async def _rotear(self, conn):
+        try:
+            caminho = await self._espiar_caminho(conn)
+        except (asyncio.TimeoutError, OSError):
+            conn.close()
+            return
+        if caminho is None:
+            conn.close()
+            return
+
+        codigo = self.codigo_da_rota(caminho)
+        dono = self.indice if codigo is None else self.anel.dono(codigo)
+        if dono == self.indice:
+            self._servir(conn)
+        else:
+            try:
+                socket.send_fds(self.canais[dono][1], [b"c"], [conn.fileno()])
+            except OSError as erro:
+                # Canal cheio (BlockingIOError) ou dono fora do ar: recusa em vez de travar o loop
+                log.aviso("repasse_falhou", worker=self.indice, dono=dono, motivo=type(erro).__name__)
+                try:
+                    conn.send(RESPOSTA_INDISPONIVEL)
+                except OSError:
+                    pass
+            finally:
+                conn.close() # O dono recebeu uma cópia do descriptor (ou a conexão foi recusada)
+
+    def _receber_repassadas(self):
+        _, fds, _, _ = socket.recv_fds(self.canais[self.indice][0], 16, 8)
+        for fd in fds:
+            sock = socket.socket(fileno=fd)
+            sock.setblocking(False)
+            self._servir(sock)
+
+    async def executar(self):
+        self.loop = asyncio.get_running_loop()
+        self.servidor = ServidorDeSockets(self.handler)
+
+        escuta = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        escuta.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        escuta.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        escuta.bind((self.host, self.porta))
+        escuta.listen(1024)
+        escuta.setblocking(False)
+
+        self.loop.add_reader(self.canais[self.indice][0].fileno(), self._receber_repassadas)
+        # Cada worker expõe as métricas das suas salas na própria porta
+        await metricas.servir(metricas.porta_do_worker(self.indice))
+        log.info("worker_escutando", worker=self.indice, pid=os.getpid(), porta=self.porta)
+
+        while True:
+            conn, _ = await self.loop.sock_accept(escuta)
+            conn.setblocking(False)
+            self.loop.create_task(self._rotear(conn))
+
+
+def _executar_worker(indice, total, host, porta, canais, handler, codigo_da_rota, ao_iniciar):
+    try:
+        worker = Worker(indice, total, host, porta, canais, handler, codigo_da_rota)
+        if ao_iniciar:
+            ao_iniciar(indice, worker.anel)
+        asyncio.run(worker.executar())
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        log.erro("worker_falhou", worker=indice, exc=True)
+        raise
+    finally:
+        registro.escritor.descarregar() # O processo filho sai por os._exit, sem passar pelo atexit
+
+
+def supervisionar(workers, host, porta, handler, codigo_da_rota, ao_iniciar=None):
+    """Inicia `workers` processos e os reinicia caso algum termine inesperadamente.
+
+    Um worker que cai logo depois de subir (porta ocupada, erro de
+    configuração) é reiniciado com espera exponencial; depois de
+    MAX_FALHAS_RAPIDAS falhas rápidas seguidas o supervisor desiste dele.
+    As salas desse worker ficam indisponíveis (o repasse responde 503).
+    """
+    canais = []
+    for _ in range(workers):
+        recebe, envia = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        recebe.setblocking(False)
+        envia.setblocking(False) # send_fds roda dentro do event loop dos workers
+        canais.append((recebe, envia))
+
+    # SIGTERM (ex.: parada do container) encerra os workers como um Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    contexto = multiprocessing.get_context("fork")
+    iniciados = [0.0] * workers
+    falhas = [0] * workers # Falhas rápidas seguidas de cada worker
+    reinicios = {} # índice -> instante (time.monotonic) do próximo reinício
+
+    def iniciar(indice):
+        processo = contexto.Process(
+            target=_executar_worker,
+            args=(indice, workers, host, porta, canais, handler, codigo_da_rota, ao_iniciar),
+            name=f"worker-{indice}",
+        )
+        processo.start()
+        iniciados[indice] = time.monotonic()
+        return processo
+
+    def agendar_reinicio(i):
+        processos[i].join() # Sentinela pronta: só falta recolher o exitcode
+        agora = time.monotonic()
+        falhas[i] = falhas[i] + 1 if agora - iniciados[i] < FALHA_RAPIDA else 1
+        if falhas[i] > MAX_FALHAS_RAPIDAS:
+            log.erro("worker_abandonado", worker=i, codigo=processos[i].exitcode, falhas=falhas[i] - 1)
+            processos[i] = None
+            return
+        espera = min(REINICIO_BASE * 2 ** (falhas[i] - 1), REINICIO_MAXIMO)
+        log.aviso("worker_reiniciado", worker=i, codigo=processos[i].exitcode, espera=espera)
+        reinicios[i] = agora + espera
+
+    processos = [iniciar(i) for i in range(workers)]
+    log.info("supervisor_iniciado", pid=os.getpid(), workers=workers, porta=porta)
+    try:
+        while True:
+            sentinelas = {p.sentinel: i for i, p in enumerate(processos) if p is not None and i not in reinicios}
+            if not sentinelas and not reinicios:
+                log.erro("supervisor_encerrado", motivo="todos os workers abandonados")
+                break
+            timeout = max(0.0, min(reinicios.values()) - time.monotonic()) if reinicios else None
+            for sentinela in multiprocessing.connection.wait(list(sentinelas), timeout):
+                agendar_reinicio(sentinelas[sentinela])
+            agora = time.monotonic()
+            for i in [i for i, instante in reinicios.items() if instante <= agora]:
+                del reinicios[i]
+                processos[i] = iniciar(i)
+    except KeyboardInterrupt:
+        log.info("supervisor_encerrado", motivo="KeyboardInterrupt")
+    finally:
+        for p in processos:
+            if p is not None:
+                p.terminate()
+        for p in processos:
+            if p is not None:
+                p.join()
@@ -0,0 +1,190 @@
+"""Agendador de prazos compartilhado por todas as salas do processo.
+
+Em vez de uma task dormindo (`asyncio.sleep`) por sala, os prazos de todas as
+salas ficam numa roda de timers hierárquica (timer wheel) e o event loop só tem
+um timer armado: o próximo instante em que a roda precisa andar. Os instantes
+estão no relógio monotônico do loop (`loop.time()`).
+
+A roda avança em ticks de RESOLUCAO segundos e tem 4 níveis: 256 slots de um
+tick, e depois 64 slots de 256 ticks, 64 de 256*64 ticks e 64 de 256*64*64
+ticks. Agendar é calcular nível e slot e anexar à lista do slot; cancelar é
+marcar o prazo (ele é descartado quando o slot for processado). As duas
+operações são O(1), independentemente de quantos prazos estejam pendentes.
+Quando o nível 0 dá a volta, o slot correspondente do nível de cima é
+redistribuído ("cascata") nos níveis de baixo.
+"""
+import asyncio
+import math
+import weakref
+
+import registro
+
+log = registro.com()
+
+RESOLUCAO = 0.01 # Segundos por tick
+BITS_NIVEIS = (8, 6, 6, 6) # Slots por nível = 2**bits
+
+_DESLOCAMENTOS = []
+_total = 0
+for _bits in BITS_NIVEIS:
+    _DESLOCAMENTOS.append(_total)
+    _total += _bits
+_CAPACIDADE = 1 << _total # Ticks alcançáveis a partir do tick atual
+
+
+class Prazo:
+    """Prazo agendado. Guarde-o para poder cancelar."""
+
+    __slots__ = ("instante", "tick", "callback", "args", "cancelado", "agendador")
+
+    def __init__(self, instante, tick, callback, args, agendador):
+        self.instante = instante
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelado = False
+        self.agendador = agendador
+
+    def cancelar(self):
+        if not self.cancelado and self.agendador is not None:
+            self.agendador._vivos -= 1
+        self.cancelado = True
+
+
+class Agendador:
+    def __init__(self, loop, resolucao=RESOLUCAO):
+        self.loop = loop
+        self.resolucao = resolucao
+        self._niveis = [[[] for _ in range(1 << bits)] for bits in BITS_NIVEIS]
+        self._nos_niveis_altos = 0 # Prazos (inclusive cancelados) acima do nível 0
+        self._vivos = 0 # Prazos agendados e ainda não disparados nem cancelados
+        self._tick = self._tick_de(loop.time()) # Último tick processado
+        self._armado = None # TimerHandle do loop
+        self._tick_armado = None
+
+    def _tick_de(self, instante):
+        return math.floor(instante / self.resolucao)
+
+    def agendar(self, instante, callback, *args):
+        """Chama `callback(*args)` no instante dado (loop.time()). Corrotinas viram tasks."""
+        if self._vivos == 0:
+            self._reiniciar()
+        # Nunca no tick atual (já processado) nem antes do instante pedido
+        tick = max(math.ceil(instante / self.resolucao), self._tick + 1)
+        prazo = Prazo(instante, tick, callback, args, self)
+        self._vivos += 1
+        despertar = self._inserir(prazo)
+        if self._tick_armado is None or despertar < self._tick_armado:
+            self._armar(despertar)
+        return prazo
+
+    def agendar_em(self, segundos, callback, *args):
+        return self.agendar(self.loop.time() + segundos, callback, *args)
+
+    def pendentes(self):
+        return self._vivos
+
+    def _inserir(self, prazo):
+        """Coloca o prazo no nível/slot certo. Retorna o tick em que a roda precisa acordar por ele."""
+        delta = min(prazo.tick - self._tick, _CAPACIDADE - 1)
+        tick = self._tick + delta # Prazos além do alcance esperam no último slot e voltam na cascata
+        for nivel, bits in enumerate(BITS_NIVEIS):
+            deslocamento = _DESLOCAMENTOS[nivel]
+            if delta < 1 << (deslocamento + bits):
+                self._niveis[nivel][(tick >> deslocamento) & ((1 << bits) - 1)].append(prazo)
+                if nivel == 0:
+                    return tick
+                self._nos_niveis_altos += 1
+                # Acorda na próxima volta do nível 0 para fazer a cascata
+                return ((self._tick >> BITS_NIVEIS[0]) + 1) << BITS_NIVEIS[0]
+
+    def _reiniciar(self):
+        """Roda sem prazos vivos: descarta cancelados e alinha o tick com o relógio (evita recuperar ticks ociosos)."""
+        agora = self._tick_de(self.loop.time())
+        if agora - self._tick <= 1 << BITS_NIVEIS[0]:
+            return
+        for nivel in self._niveis:
+            for slot in nivel:
+                slot.clear()
+        self._nos_niveis_altos = 0
+        self._tick = agora
+
+    def _armar(self, tick):
+        if self._armado is not None:
+            self._armado.cancel()
+        self._tick_armado = tick
+        self._armado = self.loop.call_at(tick * self.resolucao, self._disparar)
+
+    def _disparar(self):
+        # O loop pode acordar uma fração antes do instante armado; o tick armado conta como alcançado
+        ate = max(self._tick_de(self.loop.time()), self._tick_armado)
+        self._armado = None
+        self._tick_armado = None
+        nivel0 = self._niveis[0]
+        mascara0 = (1 << BITS_NIVEIS[0]) - 1
+        while self._tick < ate:
+            self._tick += 1
+            tick = self._tick
+            if tick & mascara0 == 0 and self._nos_niveis_altos:
+                self._cascata(tick)
+            slot = nivel0[tick & mascara0]
+            if slot:
+                prazos = slot[:]
+                slot.clear()
+                for prazo in prazos:
+                    if not prazo.cancelado:
+                        self._vivos -= 1
+                        prazo.agendador = None
+                        _executar(prazo)
+        if self._vivos:
+            self._armar(self._proximo_despertar())
+
+    def _cascata(self, tick):
+        # Do nível mais alto para o mais baixo: tudo que desce cai em slots ainda não processados
+        for nivel in range(len(BITS_NIVEIS) - 1, 0, -1):
+            deslocamento = _DESLOCAMENTOS[nivel]
+            if tick & ((1 << deslocamento) - 1):
+                continue
+            slot = self._niveis[nivel][(tick >> deslocamento) & ((1 << BITS_NIVEIS[nivel]) - 1)]
+            if not slot:
+                continue
+            prazos = slot[:]
+            slot.clear()
+            self._nos_niveis_altos -= len(prazos)
+            for prazo in prazos:
+                if not prazo.cancelado:
+                    self._inserir(prazo)
+
+    def _proximo_despertar(self):
+        """Próximo slot ocupado do nível 0, ou a próxima volta do nível 0 se houver prazos acima."""
+        nivel0 = self._niveis[0]
+        tamanho = 1 << BITS_NIVEIS[0]
+        volta = ((self._tick >> BITS_NIVEIS[0]) + 1) << BITS_NIVEIS[0]
+        for i in range(1, tamanho + 1):
+            tick = self._tick + i
+            if tick == volta and self._nos_niveis_altos:
+                return tick
+            if nivel0[tick & (tamanho - 1)]:
+                return tick
+        return volta
+
+
+def _executar(prazo):
+    try:
+        resultado = prazo.callback(*prazo.args)
+        if asyncio.iscoroutine(resultado):
+            asyncio.ensure_future(resultado)
+    except Exception:
+        log.erro("falha_no_prazo", callback=getattr(prazo.callback, "__qualname__", repr(prazo.callback)), exc=True)
+
+
+_agendadores = weakref.WeakKeyDictionary()
+
+
+def agendador():
+    """Agendador do event loop atual (um por loop, compartilhado por todas as salas)."""
+    loop = asyncio.get_running_loop()
+    instancia = _agendadores.get(loop)
+    if instancia is None:
+        instancia = _agendadores[loop] = Agendador(loop)
+    return instancia
@@ -0,0 +1,146 @@
+"""Duração das rodadas com jogadores AFK e custo de agendar/cancelar prazos.
+
+Sobe o gateway (rooms.py) em localhost com várias salas ao mesmo tempo. Em cada
+sala alguns bots jogam normalmente (com um tempo de "pensar" aleatório) e os
+demais ficam AFK: nunca submetem nem votam. Sem prazos a sala travaria na
+primeira rodada; com eles, toda rodada termina em no máximo
+SUBMIT_TIMEOUT + VOTE_TIMEOUT. Mede a duração de cada rodada (black_card até
+round_result, vista por um bot ativo) e reporta p50/p99/máximo.
+
+Em seguida mede agendar + cancelar um prazo na roda de timers (timers.py) com
+cada vez mais prazos pendentes: o custo deve ficar constante.
+
+Uso:
+    python3 benchmarks/bench_afk.py [--salas 20] [--jogadores 4] [--afk 1] [--rodadas 5]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import websockets  # noqa: E402
+
+import app  # noqa: E402
+import registro  # noqa: E402
+import rooms  # noqa: E402
+import timers  # noqa: E402
+
+
+class Bot:
+    def __init__(self, afk, pensar, observador=False):
+        self.afk = afk
+        self.pensar = pensar
+        self.observador = observador # Só um bot por sala registra as durações
+        self.mao = []
+        self.inicio_rodada = None
+        self.duracoes = []
+
+    async def jogar(self, porta, sala, rodadas, fim):
+        async with websockets.connect(f"ws://127.0.0.1:{porta}/sala/{sala}?cartas=ids&lote=1", compression=None) as ws:
+            leitura = asyncio.create_task(self._ler(ws, rodadas, fim))
+            await fim.wait()
+            leitura.cancel()
+
+    async def _ler(self, ws, rodadas, fim):
+        async for frame in ws:
+            data = json.loads(frame)
+            for mensagem in data["messages"] if data.get("action") == "batch" else [data]:
+                await self._processar(ws, mensagem, rodadas, fim)
+
+    async def _processar(self, ws, data, rodadas, fim):
+        action = data.get("action")
+        if action == "nova_mao":
+            self.mao = data["ids"]
+        elif action == "mao_delta":
+            removidas = set(data["cards_removed"])
+            self.mao = [c for c in self.mao if c not in removidas] + data["cards_added"]
+        elif action == "black_card":
+            self.inicio_rodada = time.perf_counter()
+            if not self.afk and self.mao:
+                asyncio.create_task(self._enviar(ws, {"action": "submit_white_card", "id": self.mao[0]}))
+        elif action == "start_vote" and not self.afk:
+            asyncio.create_task(self._enviar(ws, {"action": "vote", "id": random.choice(data["ids"])}))
+        elif action == "round_result" and self.observador and self.inicio_rodada is not None:
+            self.duracoes.append(time.perf_counter() - self.inicio_rodada)
+            self.inicio_rodada = None
+            if len(self.duracoes) >= rodadas:
+                fim.set()
+
+    async def _enviar(self, ws, mensagem):
+        await asyncio.sleep(random.uniform(0, self.pensar))
+        with contextlib.suppress(websockets.ConnectionClosed):
+            await ws.send(json.dumps(mensagem))
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def medir_rodadas(args):
+    bots_por_sala = []
+    async with websockets.serve(rooms.handler, "127.0.0.1", 0) as servidor:
+        porta = servidor.sockets[0].getsockname()[1]
+        tarefas = []
+        for i in range(args.salas):
+            fim = asyncio.Event()
+            bots = [Bot(afk=j < args.afk, pensar=args.pensar, observador=j == args.afk) for j in range(args.jogadores)]
+            bots_por_sala.append(bots)
+            tarefas += [bot.jogar(porta, f"afk-{i}", args.rodadas, fim) for bot in bots]
+        # O log das salas atrapalharia a leitura do resultado
+        registro.configurar(nivel="erro")
+        await asyncio.gather(*tarefas)
+    return [d for bots in bots_por_sala for bot in bots for d in bot.duracoes]
+
+
+async def medir_agendador(pendentes, operacoes=100_000):
+    """ns por agendar + cancelar, com `pendentes` prazos já na roda (até 1 h no futuro)."""
+    roda = timers.Agendador(asyncio.get_running_loop())
+    agora = roda.loop.time()
+    nada = lambda: None  # noqa: E731
+    for _ in range(pendentes):
+        roda.agendar(agora + random.uniform(1, 3600), nada)
+    instantes = [agora + random.uniform(1, 3600) for _ in range(operacoes)]
+    inicio = time.perf_counter()
+    for instante in instantes:
+        roda.agendar(instante, nada).cancelar()
+    return (time.perf_counter() - inicio) / operacoes * 1e9
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salas", type=int, default=20)
+    parser.add_argument("--jogadores", type=int, default=4)
+    parser.add_argument("--afk", type=int, default=1, help="bots AFK por sala")
+    parser.add_argument("--rodadas", type=int, default=5)
+    parser.add_argument("--envio", type=float, default=1.0, help="SUBMIT_TIMEOUT (s)")
+    parser.add_argument("--voto", type=float, default=1.0, help="VOTE_TIMEOUT (s)")
+    parser.add_argument("--pensar", type=float, default=0.5, help="tempo máximo de resposta dos bots ativos (s)")
+    parser.add_argument("--pendentes", type=int, nargs="+", default=[0, 1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    app.max_points = args.rodadas * args.jogadores + 1
+    app.COUNTDOWN_DURATION = 1
+    app.ROUND_RESULT_DELAY = 0
+    app.SUBMIT_TIMEOUT = args.envio
+    app.VOTE_TIMEOUT = args.voto
+
+    duracoes = await medir_rodadas(args)
+    limite = args.envio + args.voto
+    print(f"{args.salas} salas x {args.jogadores} jogadores ({args.afk} AFK por sala), {len(duracoes)} rodadas")
+    print(f"duração da rodada: p50 {percentil(duracoes, 50):.3f}s  p99 {percentil(duracoes, 99):.3f}s"
+          f"  máx {max(duracoes):.3f}s  (prazos somados: {limite:.3f}s)")
+
+    print(f"{'prazos pendentes':>17} {'ns por agendar+cancelar':>25}")
+    for pendentes in args.pendentes:
+        print(f"{pendentes:>17} {await medir_agendador(pendentes):>25.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
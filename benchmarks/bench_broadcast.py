@@ -0,0 +1,96 @@
+"""Microbenchmark do broadcast: CPU por broadcast com 10, 100 e 1000 destinatários.
+
+Compara o caminho antigo (json.dumps + corrotina por cliente via asyncio.gather)
+com o atual GameRoom.broadcast + descarregar (enfileira, serializa uma vez por
+codec e escreve com websockets.broadcast), com a descarga dentro da medida.
+Tudo roda em localhost, com os clientes no mesmo processo.
+
+Uso:
+    python3 benchmarks/bench_broadcast.py [--repeticoes 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import websockets  # noqa: E402
+
+import codec  # noqa: E402
+from app import GameRoom  # noqa: E402
+
+MENSAGEM = {"action": "scores_update", "scores": {f"jogador{i}": i % 3 for i in range(10)}}
+
+
+async def broadcast_antigo(clients, message):
+    """Reprodução do broadcast anterior, para comparação."""
+    async def send_to_client(websocket):
+        try:
+            await websocket.send(json.dumps(message))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+    await asyncio.gather(*[send_to_client(client) for client in list(clients)])
+
+
+async def drenar(ws):
+    async for _ in ws:
+        pass
+
+
+async def medir(n, repeticoes):
+    sala = GameRoom("bench")
+    conectados = asyncio.Event()
+
+    async def handler(websocket):
+        # Registra como GameRoom.ao_entrar: broadcast() percorre clientes_por_codec
+        codec_conexao = codec.da_conexao(websocket)
+        sala.codecs[websocket] = codec_conexao
+        sala.clientes_por_codec.setdefault(codec_conexao, set()).add(websocket)
+        sala.clients.add(websocket)
+        if len(sala.clients) == n:
+            conectados.set()
+        await websocket.wait_closed()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as servidor:
+        porta = servidor.sockets[0].getsockname()[1]
+        clientes = [await websockets.connect(f"ws://127.0.0.1:{porta}") for _ in range(n)]
+        leitores = [asyncio.create_task(drenar(c)) for c in clientes]
+        await conectados.wait()
+
+        resultados = {}
+        for nome, envio in (("antigo", lambda: broadcast_antigo(sala.clients, MENSAGEM)),
+                            ("atual", lambda: sala.broadcast(MENSAGEM))):
+            total = 0.0
+            for _ in range(repeticoes):
+                inicio = time.process_time()
+                await envio()
+                # broadcast() só enfileira; a escrita nas conexões acontece em descarregar(), no fim do tick
+                sala.descarregar()
+                total += time.process_time() - inicio
+                # Deixa os clientes drenarem para não acumular buffer entre as medições
+                await asyncio.sleep(0)
+            resultados[nome] = total / repeticoes
+
+        for c in clientes:
+            await c.close()
+        for t in leitores:
+            t.cancel()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'destinatários':>14} {'antigo (µs)':>12} {'atual (µs)':>12} {'ganho':>7}")
+    for n in (10, 100, 1000):
+        r = asyncio.run(medir(n, args.repeticoes))
+        print(f"{n:>14} {r['antigo'] * 1e6:>12.1f} {r['atual'] * 1e6:>12.1f} {r['antigo'] / r['atual']:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Gerador de carga: muitas mesas de bots jogando partidas inteiras em localhost.
+
+Sobe o gateway (rooms.py) num processo separado, com as pausas do jogo
+encurtadas, e abre --salas x --jogadores conexões de bots. Cada bot faz o
+handshake do lobby ({"type": "join"}), conecta na sala por /sala/<codigo>,
+responde get_nome com "nome", submete uma carta a cada black_card e vota a
+cada start_vote, até a mesa completar --jogos partidas.
+
+Por mesa são medidos, do lado dos bots:
+  envio -> votação      do último submit_white_card enviado ao start_vote
+  voto -> resultado     do último vote enviado ao round_result
+que são o tempo de reação do servidor (fila da sala + transição + broadcast),
+sem o tempo de "pensar" dos bots. O resultado (rodadas por segundo, p50/p99
+e os parâmetros) vai para --saida em JSON, para acompanhar regressões (padrão:
+bench_carga.json no diretório temporário, fora do repositório).
+
+Com --porta, usa um servidor já rodando (com as pausas dele) em vez de subir um.
+
+Uso:
+    python3 benchmarks/bench_carga.py [--salas 250] [--jogadores 4] [--jogos 2] [--saida /tmp/bench_carga.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+from websockets.sync.client import connect
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+# Sobe o gateway com as pausas do jogo trocadas pelas da linha de comando
+INICIAR_SERVIDOR = """
+import asyncio, sys
+sys.path.insert(0, {backend!r})
+import app
+app.COUNTDOWN_DURATION = {countdown}
+app.ROUND_RESULT_DELAY = {pausa_resultado}
+app.GAME_OVER_DELAY = {pausa_fim}
+app.max_points = {pontos}
+import rooms
+asyncio.run(rooms.main())
+"""
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(porta, timeout=10.0):
+    # Com um handshake WebSocket de verdade: uma conexão TCP vazia faria o servidor registrar erro
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        try:
+            with connect(f"ws://127.0.0.1:{porta}", open_timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def resumo(segundos):
+    """p50/p99/máximo em ms de uma lista de durações em segundos."""
+    if not segundos:
+        return {"n": 0}
+    return {"n": len(segundos), "p50_ms": round(percentil(segundos, 50) * 1000, 3),
+            "p99_ms": round(percentil(segundos, 99) * 1000, 3), "max_ms": round(max(segundos) * 1000, 3)}
+
+
+class Mesa:
+    """Estado compartilhado pelos bots de uma sala: instantes dos últimos envios e medidas."""
+
+    def __init__(self, codigo, jogos):
+        self.codigo = codigo
+        self.jogos_alvo = jogos
+        self.ultimo_envio = None
+        self.ultimo_voto = None
+        self.rodadas = 0
+        self.jogos = 0
+        self.rodada_contada = False
+        self.jogo_contado = False
+        self.fim = asyncio.Event()
+
+
+class Bot:
+    def __init__(self, mesa, nome, pensar, medidas):
+        self.mesa = mesa
+        self.nome = nome
+        self.pensar = pensar
+        self.medidas = medidas
+        self.mao = []
+        self.minha_carta = None
+
+    async def jogar(self, porta, abertura, limite):
+        mesa = self.mesa
+        async with abertura:
+            # Handshake do lobby, como o frontend: a sala é criada aqui
+            async with websockets.connect(f"ws://127.0.0.1:{porta}", compression=None) as lobby:
+                await lobby.send(json.dumps({"type": "join", "nome": self.nome, "sala": mesa.codigo}))
+                await lobby.recv()
+            ws = await websockets.connect(f"ws://127.0.0.1:{porta}/sala/{mesa.codigo}?cartas=ids&lote=1",
+                                          compression=None)
+        async with ws:
+            leitura = asyncio.create_task(self._ler(ws))
+            try:
+                await asyncio.wait_for(mesa.fim.wait(), limite) # Mesa travada conta como erro
+            finally:
+                leitura.cancel()
+
+    async def _ler(self, ws):
+        with contextlib.suppress(websockets.ConnectionClosed):
+            async for frame in ws:
+                data = json.loads(frame)
+                for mensagem in data["messages"] if data.get("action") == "batch" else [data]:
+                    self._processar(ws, mensagem)
+
+    def _processar(self, ws, data):
+        mesa = self.mesa
+        action = data.get("action")
+        if action == "nova_mao":
+            self.mao = data["ids"]
+        elif action == "mao_delta":
+            removidas = set(data["cards_removed"])
+            self.mao = [c for c in self.mao if c not in removidas] + data["cards_added"]
+        elif action == "get_nome":
+            asyncio.create_task(self._enviar(ws, {"action": "nome", "nome": self.nome}, pensar=False))
+        elif action == "black_card" and self.mao:
+            mesa.rodada_contada = False
+            self.minha_carta = self.mao[0]
+            asyncio.create_task(self._enviar(ws, {"action": "submit_white_card", "id": self.minha_carta}, "ultimo_envio"))
+        elif action == "start_vote":
+            if mesa.ultimo_envio is not None:
+                self.medidas["envio_ate_votacao"].append(time.perf_counter() - mesa.ultimo_envio)
+                mesa.ultimo_envio = None
+            outras = [i for i in data["ids"] if i != self.minha_carta] or data["ids"]
+            asyncio.create_task(self._enviar(ws, {"action": "vote", "id": random.choice(outras)}, "ultimo_voto"))
+        elif action == "round_result":
+            if mesa.ultimo_voto is not None:
+                self.medidas["voto_ate_resultado"].append(time.perf_counter() - mesa.ultimo_voto)
+                mesa.ultimo_voto = None
+            if not mesa.rodada_contada:
+                mesa.rodada_contada = True
+                mesa.rodadas += 1
+        elif action == "game_state_update" and data.get("state") == "in_game":
+            mesa.jogo_contado = False
+        elif action == "game_over" and not mesa.jogo_contado:
+            mesa.jogo_contado = True
+            mesa.jogos += 1
+            if mesa.jogos >= mesa.jogos_alvo:
+                mesa.fim.set()
+
+    async def _enviar(self, ws, mensagem, instante=None, pensar=True):
+        if pensar and self.pensar:
+            await asyncio.sleep(random.uniform(0, self.pensar))
+        with contextlib.suppress(websockets.ConnectionClosed):
+            await ws.send(json.dumps(mensagem))
+            if instante is not None:
+                setattr(self.mesa, instante, time.perf_counter())
+
+
+async def gerar_carga(porta, args):
+    medidas = {"envio_ate_votacao": [], "voto_ate_resultado": []}
+    mesas = [Mesa(f"carga-{i}", args.jogos) for i in range(args.salas)]
+    abertura = asyncio.Semaphore(args.abertura) # Handshakes simultâneos (não estoura o backlog do accept)
+    bots = [Bot(mesa, f"bot-{i}-{j}", args.pensar, medidas) for i, mesa in enumerate(mesas) for j in range(args.jogadores)]
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*[bot.jogar(porta, abertura, args.limite) for bot in bots], return_exceptions=True)
+    duracao = time.perf_counter() - inicio
+    erros = [r for r in resultados if isinstance(r, BaseException)]
+    rodadas = sum(mesa.rodadas for mesa in mesas)
+    return {
+        "conexoes": len(bots),
+        "duracao_s": round(duracao, 3),
+        "rodadas": rodadas,
+        "rodadas_por_s": round(rodadas / duracao, 2),
+        "jogos": sum(mesa.jogos for mesa in mesas),
+        "envio_ate_votacao": resumo(medidas["envio_ate_votacao"]),
+        "voto_ate_resultado": resumo(medidas["voto_ate_resultado"]),
+        "erros": len(erros),
+        "exemplo_erro": repr(erros[0]) if erros else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salas", type=int, default=250)
+    parser.add_argument("--jogadores", type=int, default=4, help="bots por sala")
+    parser.add_argument("--jogos", type=int, default=2, help="partidas completas por sala")
+    parser.add_argument("--pensar", type=float, default=0.2, help="atraso aleatório máximo (s) antes de cada jogada")
+    parser.add_argument("--abertura", type=int, default=200, help="handshakes simultâneos")
+    parser.add_argument("--pontos", type=int, default=3, help="pontos para vencer (max_points do servidor)")
+    parser.add_argument("--countdown", type=float, default=0.5)
+    parser.add_argument("--pausa-resultado", type=float, default=0.2)
+    parser.add_argument("--pausa-fim", type=float, default=0.5)
+    parser.add_argument("--limite", type=float, default=600, help="segundos para cada mesa terminar as partidas")
+    parser.add_argument("--porta", type=int, help="usa um servidor já rodando nesta porta")
+    parser.add_argument("--saida", default=os.path.join(tempfile.gettempdir(), "bench_carga.json"))
+    args = parser.parse_args()
+
+    # Milhares de conexões: sobe o limite de descritores (o servidor herda o limite)
+    _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (maximo, maximo))
+
+    servidor = None
+    porta = args.porta
+    if porta is None:
+        porta = porta_livre()
+        codigo = INICIAR_SERVIDOR.format(backend=BACKEND, countdown=args.countdown, pausa_resultado=args.pausa_resultado,
+                                         pausa_fim=args.pausa_fim, pontos=args.pontos)
+        servidor = subprocess.Popen([sys.executable, "-c", codigo], stdout=subprocess.DEVNULL,
+                                    env={**os.environ, "PORT": str(porta), "METRICAS_PORTA": "0", "LOG_NIVEL": "erro"})
+        if not esperar_servidor(porta):
+            servidor.kill()
+            raise RuntimeError("servidor não subiu")
+    try:
+        resultado = asyncio.run(gerar_carga(porta, args))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    resultado = {"data": time.strftime("%Y-%m-%dT%H:%M:%S"), "parametros": vars(args), **resultado}
+    with open(args.saida, "w") as arquivo:
+        json.dump(resultado, arquivo, indent=2)
+
+    print(f"{resultado['conexoes']} conexões em {args.salas} salas, {resultado['jogos']} partidas em {resultado['duracao_s']} s")
+    print(f"rodadas: {resultado['rodadas']} ({resultado['rodadas_por_s']} por segundo), erros: {resultado['erros']}")
+    for nome in ("envio_ate_votacao", "voto_ate_resultado"):
+        r = resultado[nome]
+        if r["n"]:
+            print(f"{nome:>20}: p50 {r['p50_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms, máx {r['max_ms']:.1f} ms ({r['n']} rodadas)")
+    print(f"resultado em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Tempo de CPU por frame do client1.py e uso de CPU com a tela parada.
+
+Monta um GameClient com uma mão de 7 cartas (ou 7 cartas na votação), um
+placar de 8 jogadores e uma carta preta, textos tirados do catálogo do
+servidor, e desenha --frames frames seguidos com GameClient.draw(), como o
+loop do pygame faz. O hover anda para a carta seguinte a cada 10 frames,
+trocando a fonte do texto (font_card_text_hover).
+
+Cada tela roda sem os caches (TextCache com 0 bytes e CardSpriteCache com 0
+itens: toda quebra de linha, renderização de texto e fundo de carta é refeita)
+e com eles, e mostra quantas superfícies foram criadas por frame depois do
+aquecimento (AllocationCounter; com os caches, o esperado é zero). Usa o
+driver de vídeo "dummy" do SDL, então roda sem janela; o tempo do flip na
+tela de verdade fica de fora.
+Todo frame é redesenhado por inteiro, para medir o custo de desenhar a cena.
+
+Depois roda o loop de verdade (GameClient.frame) por --segundos nas telas de
+espera e de jogo sem nenhuma entrada nem mensagem do servidor, como uma janela
+esperando jogadores: "tudo" redesenha a tela inteira a cada frame (como antes
+das regiões sujas) e "regiões" só o que mudou, caindo para IDLE_FPS. Mostra a
+CPU usada (% de um núcleo) e quantos frames foram desenhados.
+
+Por fim joga uma partida de verdade: o servidor de salas (rooms.py) e dois
+bots (client_core.ScriptedSession) rodam numa thread, e o GameClient joga
+pelo loop do pygame, com cliques postados na fila de eventos (selecionar a
+carta e apertar Submeter/Votar). Mostra as latências medidas pelo cliente:
+do clique ao envio pela thread do WebSocket e da chegada de uma mensagem
+ao frame que a desenhou.
+
+Uso:
+    python3 benchmarks/bench_cliente.py [--frames 600] [--segundos 3] [--pontos 3]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "backend"))
+
+import websockets  # noqa: E402
+
+import app  # noqa: E402
+import client1  # noqa: E402
+import registro  # noqa: E402
+import rooms  # noqa: E402
+from client_core import ScriptedSession  # noqa: E402
+from deck import catalogo_brancas, catalogo_pretas  # noqa: E402
+
+
+def preparar(cliente, tela):
+    random.seed(1)
+    cliente.player_name = "bench"
+    cliente.room_code = "1234"
+    cliente.scores = {i: [f"jogador-{i}", random.randrange(5)] for i in range(8)}
+    cliente.current_black_card = random.choice(catalogo_pretas.textos)
+    cliente.hand = random.sample(catalogo_brancas.textos, 7)
+    cliente.game_state = "in_game"
+    cliente.voting_cards = random.sample(catalogo_brancas.textos, 7) if tela == "votacao" else []
+
+
+def medir(tela, frames, cache, sprites):
+    client1.text_cache = cache
+    client1.card_sprites = sprites
+    cliente = client1.GameClient()
+    preparar(cliente, tela)
+    tempos = []
+    alocacoes = []
+    cpu_inicio = time.process_time()
+    for frame in range(frames):
+        indice = (frame // 10) % 7
+        if tela == "votacao":
+            cliente.selected_vote_index = indice
+        else:
+            cliente.hover_card_index = indice
+        inicio = time.perf_counter()
+        cliente.invalidate()
+        cliente.draw()
+        tempos.append(time.perf_counter() - inicio)
+        alocacoes.append(cliente.frame_allocations)
+    cpu = (time.process_time() - cpu_inicio) / frames
+    return tempos, cpu, alocacoes[frames // 2:] # Regime: o hover já passou por todas as cartas
+
+
+def ocioso(tela, segundos, redesenhar_tudo):
+    cliente = client1.GameClient()
+    preparar(cliente, "jogo")
+    if tela == "espera":
+        cliente.game_state = "waiting_for_players"
+    relogio = client1.pygame.time.Clock()
+    cliente.frame(relogio) # Primeiro frame: a tela toda
+    desenhados = 0
+    desenhar = cliente.draw
+
+    def draw():
+        nonlocal desenhados
+        if redesenhar_tudo:
+            cliente.invalidate()
+        desenhou = desenhar()
+        desenhados += desenhou
+        return desenhou
+
+    cliente.draw = draw
+    cpu_inicio, inicio = time.process_time(), time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        cliente.frame(relogio)
+    return (time.process_time() - cpu_inicio) / segundos, desenhados
+
+
+def servidor_com_bots(sala, pontos, pronto, fim):
+    """Servidor de salas e dois bots num event loop próprio (roda numa thread)."""
+    async def rodar():
+        async with websockets.serve(rooms.handler, "127.0.0.1", 0) as servidor:
+            pronto.append(servidor.sockets[0].getsockname()[1])
+            await asyncio.sleep(0.5) # O GameClient entra primeiro
+            bots = [ScriptedSession(f"bot-{i}", sala) for i in range(2)]
+            tarefas = [asyncio.create_task(bot.websocket_client("127.0.0.1", pronto[0])) for bot in bots]
+            while not fim.is_set():
+                await asyncio.sleep(0.05)
+            for bot in bots:
+                await bot.close()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+
+    app.max_points = pontos
+    app.COUNTDOWN_DURATION = 0.5
+    app.ROUND_RESULT_DELAY = 0.3
+    registro.configurar(nivel="erro")
+    asyncio.run(rodar())
+
+
+def clicar(pos):
+    client1.pygame.event.post(client1.pygame.event.Event(client1.pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+
+
+def latencias(pontos, limite=60):
+    pronto, fim = [], threading.Event()
+    thread = threading.Thread(target=servidor_com_bots, args=("bench-cliente", pontos, pronto, fim), daemon=True)
+    thread.start()
+    while not pronto:
+        time.sleep(0.01)
+    os.environ["PORT"] = str(pronto[0])
+
+    cliente = client1.GameClient()
+    cliente.verbose = False
+    cliente.player_name, cliente.room_code = "bench", "bench-cliente"
+    cliente.connect_to_server()
+    relogio = client1.pygame.time.Clock()
+    inicio = time.perf_counter()
+    while cliente.game_state != "game_over" and time.perf_counter() - inicio < limite:
+        if cliente.game_state == "in_game" and not client1.pygame.event.peek(client1.pygame.MOUSEBUTTONDOWN):
+            if (not cliente.voting_cards and cliente.hand and not cliente.has_submitted_this_round
+                    and getattr(cliente, "card_rects_in_hand", None) and "submit" in cliente.buttons):
+                clicar(cliente.card_rects_in_hand[0].center)
+                clicar(cliente.buttons["submit"].center)
+            elif cliente.voting_cards and not cliente.has_voted_this_round and "vote" in cliente.buttons:
+                # Centro da primeira carta da votação, no layout de draw_voting_screen
+                por_linha = min(len(cliente.voting_cards), 3)
+                largura = por_linha * client1.CARD_WIDTH_VOTE + (por_linha - 1) * client1.CARD_MARGIN
+                clicar(((client1.SCREEN_WIDTH - largura) // 2 + client1.CARD_WIDTH_VOTE // 2,
+                        int(client1.SCREEN_HEIGHT * 0.35) + client1.CARD_HEIGHT_VOTE // 2))
+                clicar(cliente.buttons["vote"].center)
+        cliente.frame(relogio)
+    fim.set()
+    thread.join()
+    return cliente.game_state == "game_over", cliente.latency_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--segundos", type=float, default=3)
+    parser.add_argument("--pontos", type=int, default=3, help="pontos para vencer a partida de verdade")
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames por medida, {client1.SCREEN_WIDTH}x{client1.SCREEN_HEIGHT}")
+    print(f"{'tela':>8} {'caches':>6} {'CPU ms/frame':>13} {'p50 ms':>8} {'p99 ms':>8} {'superfícies/frame':>18}")
+    for tela in ("jogo", "votacao"):
+        for nome, cache, sprites in (("não", client1.TextCache(max_bytes=0), client1.CardSpriteCache(max_items=0)),
+                                     ("sim", client1.TextCache(), client1.CardSpriteCache())):
+            tempos, cpu, alocacoes = medir(tela, args.frames, cache, sprites)
+            tempos.sort()
+            p99 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))]
+            print(f"{tela:>8} {nome:>6} {cpu * 1000:>13.3f} {statistics.median(tempos) * 1000:>8.3f} {p99 * 1000:>8.3f}"
+                  f" {statistics.fmean(alocacoes):>18.1f}")
+
+    print(f"\ntela parada por {args.segundos:g} s (FPS {client1.FPS}, IDLE_FPS {client1.IDLE_FPS})")
+    print(f"{'tela':>8} {'desenho':>8} {'CPU %':>7} {'frames desenhados':>18}")
+    for tela in ("espera", "jogo"):
+        for nome, tudo in (("tudo", True), ("regiões", False)):
+            cpu, desenhados = ocioso(tela, args.segundos, tudo)
+            print(f"{tela:>8} {nome:>8} {cpu * 100:>7.1f} {desenhados:>18}")
+
+    terminou, stats = latencias(args.pontos)
+    print(f"\npartida com 2 bots até {args.pontos} pontos{'' if terminou else ' (não terminou no limite)'}")
+    print(f"{'latência':>18} {'n':>5} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for nome, r in stats.items():
+        if r["n"]:
+            print(f"{nome:>18} {r['n']:>5} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
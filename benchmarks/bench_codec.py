@@ -0,0 +1,113 @@
+"""Codecs das mensagens: json (stdlib) x orjson x msgpack.
+
+Usa as mensagens do jogo com os formatos reais (catálogo, mão, deltas, carta
+preta, votação, placar, envelope "batch" de um tick e as mensagens dos
+clientes) e mede, para cada codec disponível, o tempo de codificar e de
+decodificar cada uma e o tamanho do frame.
+
+Uso:
+    python3 benchmarks/bench_codec.py [--repeticoes 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import app  # noqa: E402
+import codec  # noqa: E402
+from deck import catalogo_brancas, catalogo_pretas  # noqa: E402
+from placar import Placar  # noqa: E402
+
+
+def mensagens_do_jogo(jogadores=8):
+    """Uma amostra de cada mensagem, montada como a sala monta."""
+    random.seed(1)
+    mao = random.sample(range(len(catalogo_brancas)), app.HAND_SIZE)
+    cartas_rodada = random.sample(range(len(catalogo_brancas)), jogadores)
+    preta = random.randrange(len(catalogo_pretas))
+    placar = Placar()
+    for i in range(1, jogadores + 1):
+        placar.definir(i, f"Jogador {i}", random.randint(0, app.max_points))
+    placar.publicar()
+    placar.pontuar(3)
+    delta_placar = placar.publicar()
+    tick_da_rodada = [
+        {"action": "get_nome"},
+        {"action": "mao_delta", "seq": 12, "cards_added": [mao[0]], "cards_removed": [cartas_rodada[0]]},
+        {"action": "next_round"},
+        {"action": "black_card", "id": preta},
+        {"action": "prazo_fase", "fase": "envio", "deadline": 123456789},
+    ]
+    return [
+        ("catalogo", app.mensagem_catalogo),
+        ("nova_mao (ids)", {"action": "nova_mao", "seq": 1, "ids": mao}),
+        ("nova_mao (textos)", {"action": "nova_mao", "seq": 1, "cartas": [catalogo_brancas.texto(i) for i in mao]}),
+        ("mao_delta", tick_da_rodada[1]),
+        ("black_card (texto)", {"action": "black_card", "card": catalogo_pretas.texto(preta)}),
+        ("white_card_submitted", {"action": "white_card_submitted", "count": 3}),
+        ("start_vote (ids)", {"action": "start_vote", "ids": cartas_rodada}),
+        ("round_result", {"action": "round_result", "winner_id": cartas_rodada[2], "winner_address": "Jogador 3"}),
+        ("scores_delta", delta_placar),
+        ("scores_update", {"action": "scores_update", "versao": placar.versao, "scores": placar.entradas}),
+        ("game_state_update", {"action": "game_state_update", "state": "in_game", "message": "Game started!"}),
+        ("submit (cliente)", {"action": "submit_white_card", "id": mao[0]}),
+        ("vote (cliente)", {"action": "vote", "id": cartas_rodada[1]}),
+        ("batch (tick da rodada)", tick_da_rodada),
+    ]
+
+
+def cronometrar(funcao, argumento, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao(argumento)
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def medir(codec_medido, mensagem, repeticoes):
+    if isinstance(mensagem, list):
+        # Envelope montado a partir dos frames já codificados, como em GameRoom.descarregar
+        frames = [codec_medido.codificar(m) for m in mensagem]
+        codificar = lambda ms: codec_medido.lote([codec_medido.codificar(m) for m in ms])  # noqa: E731
+        frame = codec_medido.lote(frames)
+    else:
+        codificar = codec_medido.codificar
+        frame = codificar(mensagem)
+    tamanho = len(frame) if codec_medido.binario else len(frame.encode())
+    return cronometrar(codificar, mensagem, repeticoes), cronometrar(codec_medido.decodificar, frame, repeticoes), tamanho
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=20000)
+    args = parser.parse_args()
+
+    codecs = [codec.CodecJson()]
+    if codec.orjson is not None:
+        codecs.append(codec.CodecOrjson())
+    if codec.msgpack is not None:
+        codecs.append(codec.CodecMsgpack())
+
+    print(f"{'mensagem':>24} {'codec':>8} {'codificar µs':>13} {'decodificar µs':>15} {'bytes':>7}")
+    totais = {c.nome: [0.0, 0.0, 0] for c in codecs}
+    for nome, mensagem in mensagens_do_jogo():
+        # O catálogo é enviado uma vez por cliente: poucas repetições bastam
+        repeticoes = max(1, args.repeticoes // 100) if nome == "catalogo" else args.repeticoes
+        for c in codecs:
+            codificar, decodificar, tamanho = medir(c, mensagem, repeticoes)
+            print(f"{nome:>24} {c.nome:>8} {codificar:>13.2f} {decodificar:>15.2f} {tamanho:>7}")
+            if nome != "catalogo":
+                total = totais[c.nome]
+                total[0] += codificar
+                total[1] += decodificar
+                total[2] += tamanho
+    print("total sem o catálogo:")
+    for c in codecs:
+        codificar, decodificar, tamanho = totais[c.nome]
+        print(f"{'':>24} {c.nome:>8} {codificar:>13.2f} {decodificar:>15.2f} {tamanho:>7}")
+
+
+if __name__ == "__main__":
+    main()
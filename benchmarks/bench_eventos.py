@@ -0,0 +1,149 @@
+"""Vazão do ator de uma sala: eventos aplicados por segundo.
+
+Sem sockets: cada jogador é uma conexão falsa em memória que entrega à sala as
+mensagens do bot e repassa ao bot o que a sala envia (websockets.broadcast
+escreve no "protocolo" da conexão falsa). Assim o número mede a sala (fila de
+eventos, máquina de estados, serialização das mensagens), não a rede.
+
+Duas cargas numa sala:
+  partida  bots jogando rodadas sem pausas (submetem, votam, rodada seguinte)
+  rajada   todos os jogadores mandando resync_placar o mais rápido possível; a
+           fila da sala enche (EVENTOS_MAX) e os handlers passam a esperar
+
+Uso:
+    python3 benchmarks/bench_eventos.py [--jogadores 8] [--rodadas 200] [--rajada 5000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from websockets.protocol import State  # noqa: E402
+
+import app  # noqa: E402
+import registro  # noqa: E402
+from app import GameRoom  # noqa: E402
+from cache_frames import frames_estaticos  # noqa: E402
+
+
+class ConexaoFalsa:
+    """O suficiente de uma conexão websockets para a GameRoom e para websockets.broadcast."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.request = SimpleNamespace(path="/sala/bench?cartas=ids&lote=1")
+        self.remote_address = ("memoria", id(self))
+        self.protocol = self
+        self.state = State.OPEN
+        self.fragmented_send_waiter = None
+        self.entrada = asyncio.Queue()
+
+    # Lado do servidor -> bot
+    def send_text(self, dados):
+        self.bot.receber(json.loads(dados))
+
+    def send_data(self):
+        pass
+
+    # Lado do bot -> servidor (o handler da sala itera a conexão)
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        mensagem = await self.entrada.get()
+        if mensagem is None:
+            raise StopAsyncIteration
+        return mensagem
+
+    def enviar(self, mensagem):
+        self.entrada.put_nowait(json.dumps(mensagem))
+
+    def fechar(self):
+        self.state = State.CLOSED
+        self.entrada.put_nowait(None)
+
+
+class Bot:
+    def __init__(self, rodadas, fim):
+        self.conexao = ConexaoFalsa(self)
+        self.rodadas = rodadas
+        self.fim = fim
+        self.mao = []
+        self.rodadas_jogadas = 0
+
+    def receber(self, data):
+        for mensagem in data["messages"] if data.get("action") == "batch" else [data]:
+            action = mensagem.get("action")
+            if action == "nova_mao":
+                self.mao = mensagem["ids"]
+            elif action == "mao_delta":
+                removidas = set(mensagem["cards_removed"])
+                self.mao = [c for c in self.mao if c not in removidas] + mensagem["cards_added"]
+            elif action == "black_card" and self.mao:
+                self.conexao.enviar({"action": "submit_white_card", "id": self.mao[0]})
+            elif action == "start_vote":
+                self.conexao.enviar({"action": "vote", "id": random.choice(mensagem["ids"])})
+            elif action == "round_result":
+                self.rodadas_jogadas += 1
+                if self.rodadas_jogadas >= self.rodadas:
+                    self.fim.set()
+
+
+async def partida(jogadores, rodadas):
+    sala = GameRoom("bench")
+    fim = asyncio.Event()
+    bots = [Bot(rodadas, fim) for _ in range(jogadores)]
+    inicio = time.perf_counter()
+    handlers = [asyncio.create_task(sala.handler(bot.conexao)) for bot in bots]
+    await fim.wait()
+    for bot in bots:
+        bot.conexao.fechar()
+    await asyncio.gather(*handlers)
+    return sala.eventos_processados, time.perf_counter() - inicio
+
+
+async def rajada(jogadores, mensagens):
+    sala = GameRoom("bench")
+    bots = [Bot(0, asyncio.Event()) for _ in range(jogadores)]
+    # Com as mensagens todas já na entrada, os handlers postam sem parar e a fila da sala enche
+    for bot in bots:
+        for _ in range(mensagens):
+            bot.conexao.enviar({"action": "resync_placar"})
+        bot.conexao.fechar()
+    inicio = time.perf_counter()
+    await asyncio.gather(*[sala.handler(bot.conexao) for bot in bots])
+    return sala.eventos_processados, time.perf_counter() - inicio
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jogadores", type=int, default=8)
+    parser.add_argument("--rodadas", type=int, default=200)
+    parser.add_argument("--rajada", type=int, default=5000, help="mensagens por jogador na rajada")
+    args = parser.parse_args()
+
+    app.max_points = args.rodadas * args.jogadores + 1
+    app.COUNTDOWN_DURATION = 0
+    app.ROUND_RESULT_DELAY = 0
+    # O log das salas atrapalharia a leitura (e a medida)
+    registro.configurar(nivel="erro")
+
+    print(f"1 sala, {args.jogadores} jogadores, fila de {app.EVENTOS_MAX} eventos")
+    print(f"{'carga':>8} {'eventos':>9} {'segundos':>9} {'eventos/s':>10}")
+    for nome, carga in (("partida", partida(args.jogadores, args.rodadas)),
+                        ("rajada", rajada(args.jogadores, args.rajada))):
+        eventos, segundos = await carga
+        print(f"{nome:>8} {eventos:>9} {segundos:>9.3f} {eventos / segundos:>10.0f}")
+    estatisticas = frames_estaticos.estatisticas()
+    print(f"cache de frames: {estatisticas['acertos']} acertos, {estatisticas['faltas']} faltas, "
+          f"{estatisticas['itens']} frames ({estatisticas['bytes']} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
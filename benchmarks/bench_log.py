@@ -0,0 +1,100 @@
+"""Latência do event loop com o log desligado, síncrono e em fila (registro.py).
+
+Uma sala em memória (as conexões falsas e os bots do bench_eventos.py) joga
+rodadas sem pausas enquanto uma sonda dorme 1 ms repetidamente e mede o quanto
+cada despertar atrasou: é o tempo que o loop ficou ocupado com outra coisa.
+Com LOG_NIVEL=debug a sala registra cada envio, voto e mudança de fase.
+
+  desligado   nível "erro": os registros são descartados na chamada
+  sincrono    nível "debug", escrito na hora pela thread do loop (como o print)
+  fila        nível "debug", escrito em lotes pela thread do registro.py
+
+A saída é um pipe (como o stdout sob um coletor de logs) esvaziado por uma
+thread que lê 4 KB a cada --lento-ms milissegundos; com 0 ela lê o mais rápido
+possível. Quando o leitor atrasa, o pipe enche e o write síncrono bloqueia o loop.
+
+Uso:
+    python3 benchmarks/bench_log.py [--jogadores 8] [--rodadas 300] [--lento-ms 0 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import app  # noqa: E402
+import registro  # noqa: E402
+from bench_eventos import partida  # noqa: E402
+
+MODOS = (
+    ("desligado", "erro", False),
+    ("sincrono", "debug", True),
+    ("fila", "debug", False),
+)
+
+
+async def sonda(atrasos, parar):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.001)
+        atrasos.append(time.perf_counter() - inicio - 0.001)
+
+
+async def medir(jogadores, rodadas):
+    atrasos = []
+    parar = asyncio.Event()
+    tarefa = asyncio.create_task(sonda(atrasos, parar))
+    eventos, segundos = await partida(jogadores, rodadas)
+    parar.set()
+    await tarefa
+    return atrasos, eventos / segundos
+
+
+def leitor(fd, atraso, linhas):
+    """Esvazia o pipe devagar e conta as linhas lidas."""
+    with os.fdopen(fd, "rb", buffering=0) as pipe:
+        while bloco := pipe.read(4096):
+            linhas[0] += bloco.count(b"\n")
+            time.sleep(atraso)
+
+
+def percentil(valores, p):
+    return sorted(valores)[min(len(valores) - 1, int(len(valores) * p))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jogadores", type=int, default=8)
+    parser.add_argument("--rodadas", type=int, default=300)
+    parser.add_argument("--lento-ms", type=float, nargs="+", default=[0, 50],
+                        help="pausa do leitor do pipe entre leituras de 4 KB")
+    args = parser.parse_args()
+
+    app.max_points = args.rodadas * args.jogadores + 1
+    app.COUNTDOWN_DURATION = 0
+    app.ROUND_RESULT_DELAY = 0
+
+    print(f"1 sala, {args.jogadores} jogadores, {args.rodadas} rodadas")
+    print(f"{'leitor':>8} {'modo':>10} {'p50 µs':>8} {'p99 µs':>8} {'máx µs':>8} {'média µs':>9} {'eventos/s':>10} {'linhas':>8}")
+    registro.configurar(nivel="erro")
+    await medir(args.jogadores, 20) # Aquecimento: o primeiro modo não paga os imports e caches
+    for lento in args.lento_ms:
+        for nome, nivel, sincrono in MODOS:
+            leitura, escrita = os.pipe()
+            linhas = [0]
+            thread = threading.Thread(target=leitor, args=(leitura, lento / 1000, linhas))
+            thread.start()
+            with open(escrita, "w", buffering=1) as saida:
+                registro.configurar(nivel=nivel, saida=saida, sincrono=sincrono)
+                atrasos, vazao = await medir(args.jogadores, args.rodadas)
+                registro.configurar(nivel="erro") # Escreve o que ficou na fila antes de fechar o pipe
+            thread.join()
+            print(f"{f'{lento:g} ms':>8} {nome:>10} {percentil(atrasos, 0.5) * 1e6:>8.0f} {percentil(atrasos, 0.99) * 1e6:>8.0f} "
+                  f"{max(atrasos) * 1e6:>8.0f} {statistics.fmean(atrasos) * 1e6:>9.0f} {vazao:>10.0f} {linhas[0]:>8}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""Bytes e frames por rodada: textos das cartas x IDs x IDs com envelope "batch".
+
+Sobe uma GameRoom em localhost e joga rodadas completas com bots (submetem a
+primeira carta da mão e votam em uma carta aleatória), uma vez em cada modo.
+Conta o payload e o número de frames WebSocket recebidos pelos bots a partir da
+primeira carta preta, sem compressão (permessage-deflate desligado nos bots), e
+divide pelo número de rodadas. O catálogo, baixado uma vez por cliente no modo
+por IDs, é medido à parte.
+
+Uso:
+    python3 benchmarks/bench_protocolo.py [--jogadores 4] [--rodadas 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import websockets  # noqa: E402
+
+import app  # noqa: E402
+import registro  # noqa: E402
+from app import GameRoom  # noqa: E402
+
+# (nome, query da conexão)
+MODOS = [
+    ("textos", ""),
+    ("ids", "?cartas=ids"),
+    ("ids+lote", "?cartas=ids&lote=1"),
+]
+
+
+class Bot:
+    def __init__(self, query):
+        self.query = query
+        self.modo_ids = "cartas=ids" in query
+        self.mao = []
+        self.medindo = False
+        self.bytes = 0
+        self.frames = 0
+        self.bytes_catalogo = 0
+        self.rodadas = 0
+
+    async def jogar(self, porta, rodadas, fim):
+        async with websockets.connect(f"ws://127.0.0.1:{porta}/sala/bench{self.query}", compression=None) as ws:
+            leitura = asyncio.create_task(self._ler(ws, rodadas, fim))
+            await fim.wait()
+            leitura.cancel()
+
+    async def _ler(self, ws, rodadas, fim):
+        async for frame in ws:
+            data = json.loads(frame)
+            if data.get("action") == "catalogo":
+                self.bytes_catalogo = len(frame.encode())
+                continue
+            mensagens = data["messages"] if data.get("action") == "batch" else [data]
+            if any(m.get("action") == "black_card" for m in mensagens):
+                self.medindo = True
+            if self.medindo:
+                self.bytes += len(frame.encode())
+                self.frames += 1
+            for mensagem in mensagens:
+                await self._processar(ws, mensagem, rodadas, fim)
+
+    async def _processar(self, ws, data, rodadas, fim):
+        action = data.get("action")
+        chave = "ids" if self.modo_ids else "cartas"
+        campo = "id" if self.modo_ids else "card"
+        if action == "nova_mao":
+            self.mao = data[chave]
+        elif action == "mao_delta":
+            removidas = set(data["cards_removed"])
+            self.mao = [c for c in self.mao if c not in removidas] + data["cards_added"]
+        elif action == "black_card" and self.mao:
+            await ws.send(json.dumps({"action": "submit_white_card", campo: self.mao[0]}))
+        elif action == "start_vote":
+            await ws.send(json.dumps({"action": "vote", campo: random.choice(data["ids" if self.modo_ids else "cards"])}))
+        elif action == "round_result":
+            self.rodadas += 1
+            if self.rodadas >= rodadas:
+                fim.set()
+
+
+async def medir(query, jogadores, rodadas):
+    sala = GameRoom("bench")
+    fim = asyncio.Event()
+    async with websockets.serve(sala.handler, "127.0.0.1", 0) as servidor:
+        porta = servidor.sockets[0].getsockname()[1]
+        bots = [Bot(query) for _ in range(jogadores)]
+        await asyncio.gather(*[bot.jogar(porta, rodadas, fim) for bot in bots])
+    rodadas_jogadas = max(bot.rodadas for bot in bots)
+    divisor = rodadas_jogadas * jogadores
+    return (sum(bot.bytes for bot in bots) / divisor,
+            sum(bot.frames for bot in bots) / divisor,
+            bots[0].bytes_catalogo)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jogadores", type=int, default=4)
+    parser.add_argument("--rodadas", type=int, default=20)
+    args = parser.parse_args()
+
+    # Partida longa e sem pausas: só o tráfego das rodadas interessa aqui
+    app.max_points = args.rodadas * args.jogadores + 1
+    app.COUNTDOWN_DURATION = 1
+    app.ROUND_RESULT_DELAY = 0
+    # O log das salas atrapalharia a leitura do resultado
+    registro.configurar(nivel="erro")
+
+    print(f"{args.jogadores} jogadores, {args.rodadas} rodadas (payload sem compressão)")
+    print(f"{'modo':>9} {'bytes/rodada/jogador':>22} {'frames/rodada/jogador':>23}")
+    catalogo = 0
+    for nome, query in MODOS:
+        media_bytes, media_frames, bytes_catalogo = await medir(query, args.jogadores, args.rodadas)
+        catalogo = bytes_catalogo or catalogo
+        print(f"{nome:>9} {media_bytes:>22.0f} {media_frames:>23.1f}")
+    print(f"catálogo (uma vez por cliente sem cache): {catalogo} bytes; com cache: só a versão")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""Benchmark de salas: memória por sala (salas por GB) e latência de criação.
+
+Compara o motor novo (várias GameRoom no mesmo processo/event loop) com o modo
+antigo (um processo `python3 app.py` por sala).
+
+Uso:
+    python3 benchmarks/bench_rooms.py [--salas 500] [--processos 20]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+
+import registro  # noqa: E402
+import rooms  # noqa: E402
+
+GB = 1024 ** 3
+
+
+def rss_bytes(pid="self"):
+    """RSS atual de um processo (Linux, via /proc)."""
+    with open(f"/proc/{pid}/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) * 1024
+    return 0
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_porta(porta, timeout=10.0):
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        try:
+            with socket.create_connection(("127.0.0.1", porta), timeout=0.05):
+                return True
+        except OSError:
+            time.sleep(0.002)
+    return False
+
+
+async def bench_motor(n):
+    rss_antes = rss_bytes()
+    latencias = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        rooms.iniciar_partida(f"bench-{i}")
+        latencias.append(time.perf_counter() - inicio)
+    rss_depois = rss_bytes()
+    rooms.salas.clear()
+    return (rss_depois - rss_antes) / n, latencias
+
+
+def bench_processos(n):
+    procs = []
+    latencias = []
+    try:
+        for _ in range(n):
+            porta = porta_livre()
+            inicio = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(BACKEND, "app.py"), str(porta)],
+                env={**os.environ, "PORT": str(porta), "METRICAS_PORTA": "0", "LOG_NIVEL": "erro"},
+                cwd=BACKEND,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            procs.append(proc)
+            if not esperar_porta(porta):
+                raise RuntimeError(f"app.py não abriu a porta {porta}")
+            latencias.append(time.perf_counter() - inicio)
+        total = sum(rss_bytes(p.pid) for p in procs)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+    return total / n, latencias
+
+
+def relatorio(nome, por_sala, latencias):
+    latencias = sorted(latencias)
+    p50 = latencias[len(latencias) // 2] * 1000
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+    salas_por_gb = GB / por_sala if por_sala > 0 else float("inf")
+    print(f"{nome:<22} {por_sala / 1024:>10.1f} KiB/sala {salas_por_gb:>12.0f} salas/GB "
+          f"criação p50={p50:.2f}ms p99={p99:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--salas", type=int, default=500, help="salas no motor em processo")
+    parser.add_argument("--processos", type=int, default=20, help="salas no modo processo-por-sala")
+    args = parser.parse_args()
+    # O log de cada sala criada atrapalharia a leitura do resultado e entraria no tempo de criação
+    registro.configurar(nivel="erro")
+
+    por_sala, latencias = asyncio.run(bench_motor(args.salas))
+    relatorio(f"GameRoom x{args.salas}", por_sala, latencias)
+
+    por_sala, latencias = bench_processos(args.processos)
+    relatorio(f"processo x{args.processos}", por_sala, latencias)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark de escala do modo supervisor: vazão com 1, 2, 4, ... workers.
+
+Para cada quantidade de workers, sobe `rooms.py --supervisor --workers N` numa
+porta livre e dispara processos geradores de carga que, em laço, conectam em
+`/sala/<codigo>` (salas aleatórias), recebem as mensagens iniciais da sala
+(MENSAGENS_INICIAIS) e fecham a conexão. A métrica é entradas em sala por segundo.
+
+Para medir escala real, os geradores não podem disputar CPU com os workers:
+rode com --host apontando para outra máquina, ou reserve núcleos para a carga.
+
+Uso:
+    python3 benchmarks/bench_scaling.py [--workers 1,2,4,8,16] [--duracao 10]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "rooms.py")
+MENSAGENS_INICIAIS = 5 # relogio, game_state_update, nova_mao, scores_update, codigo_sala
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_porta(host, porta, timeout=10.0):
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        try:
+            with socket.create_connection((host, porta), timeout=0.1):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+async def _gerar_carga(host, porta, concorrencia, duracao, salas):
+    import websockets
+
+    fim = time.perf_counter() + duracao
+    concluidas = 0
+
+    async def laco():
+        nonlocal concluidas
+        while time.perf_counter() < fim:
+            codigo = random.randrange(salas)
+            try:
+                async with websockets.connect(f"ws://{host}:{porta}/sala/bench{codigo}", compression=None) as ws:
+                    for _ in range(MENSAGENS_INICIAIS):
+                        await ws.recv()
+                concluidas += 1
+            except (OSError, websockets.exceptions.WebSocketException):
+                await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[laco() for _ in range(concorrencia)])
+    return concluidas
+
+
+def _processo_de_carga(host, porta, concorrencia, duracao, salas, fila):
+    fila.put(asyncio.run(_gerar_carga(host, porta, concorrencia, duracao, salas)))
+
+
+def medir(workers, args):
+    porta = porta_livre()
+    servidor = subprocess.Popen(
+        [sys.executable, ROOMS, "--supervisor", "--workers", str(workers)],
+        env={**os.environ, "PORT": str(porta), "METRICAS_PORTA": "0", "LOG_NIVEL": "erro"},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        if not esperar_porta(args.host, porta):
+            raise RuntimeError("servidor não subiu")
+        time.sleep(0.5) # Todos os workers precisam estar escutando
+        fila = multiprocessing.Queue()
+        geradores = [
+            multiprocessing.Process(target=_processo_de_carga,
+                                    args=(args.host, porta, args.concorrencia, args.duracao, args.salas, fila))
+            for _ in range(args.carregadores)
+        ]
+        for g in geradores:
+            g.start()
+        total = sum(fila.get() for _ in geradores)
+        for g in geradores:
+            g.join()
+        return total / args.duracao
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    nucleos = os.cpu_count() or 1
+    padrao = ",".join(str(n) for n in (1, 2, 4, 8, 16, 32) if n <= nucleos) or "1"
+    parser.add_argument("--workers", default=padrao, help="lista de quantidades de workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de carga por medição")
+    parser.add_argument("--carregadores", type=int, default=nucleos, help="processos geradores de carga")
+    parser.add_argument("--concorrencia", type=int, default=50, help="conexões simultâneas por gerador")
+    parser.add_argument("--salas", type=int, default=1000, help="quantidade de códigos de sala sorteados")
+    args = parser.parse_args()
+
+    base = None
+    print(f"{'workers':>8} {'entradas/s':>12} {'aceleração':>11} {'eficiência':>11}")
+    for workers in (int(n) for n in args.workers.split(",")):
+        vazao = medir(workers, args)
+        base = base or vazao / workers
+        aceleracao = vazao / base
+        print(f"{workers:>8} {vazao:>12.0f} {aceleracao:>10.2f}x {aceleracao / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
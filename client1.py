@@ -1,12 +1,13 @@
 import pygame
 import asyncio
-import websockets
-import json
+import collections
 import threading
 import sys
-import os
 import time
-from typing import Optional, List, Dict, Any, Tuple
+import math
+from typing import Optional, List, Dict, Tuple
+
+from client_core import GameSession
 
 # Inicialização do Pygame
 pygame.init()
@@ -79,6 +80,156 @@ CARD_HOVER_OFFSET_Y = 20
 CARD_SELECT_OFFSET_Y = 40
 CARD_TEXT_PADDING = 15
 
+# Taxa de quadros: cheia enquanto algo muda na tela, baixa quando está tudo parado
+FPS = 60
+IDLE_FPS = 10
+ACTIVE_GRACE = 0.5 # Segundos em FPS cheio depois do último evento de entrada
+# Postado pela thread do WebSocket quando chega algo na fila de entrada: acorda o loop parado
+WAKE_EVENT = pygame.event.custom_type()
+LATENCY_SAMPLES = 1000 # Medidas guardadas de cada latência (as mais recentes)
+
+# Cache de texto (quebras de linha e superfícies renderizadas) reaproveitado entre frames
+TEXT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Fundos de carta pré-renderizados (um por tamanho, cor e seleção)
+CARD_SPRITE_MAX_ITEMS = 32
+
+class AllocationCounter:
+    """Conta as superfícies criadas pelo cliente; GameClient.draw() guarda quantas saíram em cada frame."""
+
+    def __init__(self):
+        self.surfaces = 0
+        self.bytes = 0
+
+    def count(self, surface: pygame.Surface) -> pygame.Surface:
+        self.surfaces += 1
+        self.bytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+        return surface
+
+allocations = AllocationCounter()
+
+def wrap_text(text: str, font: pygame.font.Font, max_width: int) -> Tuple[str, ...]:
+    """Quebra texto em múltiplas linhas para caber na largura máxima."""
+    words = text.split(' ')
+    lines = []
+    current_line = ""
+    
+    for word in words:
+        test_line = current_line + word + " "
+        if font.size(test_line)[0] <= max_width:
+            current_line = test_line
+        else:
+            if current_line:
+                lines.append(current_line.strip())
+            current_line = word + " "
+    
+    if current_line:
+        lines.append(current_line.strip())
+        
+    return tuple(lines)
+
+class TextCache:
+    """LRU de textos quebrados em linhas e de linhas renderizadas, limitado em bytes.
+
+    A 60 FPS as mesmas cartas são desenhadas a cada frame, mas quebrar o texto
+    (um font.size() por palavra) e renderizar as linhas só precisa acontecer
+    quando o texto, a fonte, a largura ou a cor mudam: são essas as chaves. A
+    fonte maior do hover é só outra chave, e volta a acertar no próximo hover.
+
+    As superfícies são compartilhadas por quem pede o mesmo texto; para alterar
+    uma (set_alpha, por exemplo) é preciso copiá-la antes.
+    """
+
+    def __init__(self, max_bytes: int = TEXT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = collections.OrderedDict() # {chave: (valor, tamanho)}, do menos ao mais recente
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def _store(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        self._items[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, old_size) = self._items.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+    def wrap(self, text: str, font: pygame.font.Font, max_width: int) -> Tuple[str, ...]:
+        key = ("wrap", text, font, max_width)
+        lines = self._get(key)
+        if lines is None:
+            lines = wrap_text(text, font, max_width)
+            self._store(key, lines, len(text) + 64)
+        return lines
+
+    def render(self, text: str, font: pygame.font.Font, color: Tuple[int, ...]) -> pygame.Surface:
+        key = ("render", text, font, color)
+        surface = self._get(key)
+        if surface is None:
+            surface = allocations.count(font.render(text, True, color))
+            self._store(key, surface, surface.get_width() * surface.get_height() * surface.get_bytesize())
+        return surface
+
+    def clear(self):
+        self._items.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "items": len(self._items), "bytes": self.bytes}
+
+text_cache = TextCache()
+
+class CardSpriteCache:
+    """Fundos de carta (sombra, cor, borda) desenhados uma vez e reaproveitados a cada frame.
+
+    O sprite tem o tamanho da carta mais SHADOW_OFFSET: a sombra translúcida
+    fica deslocada por baixo e a carta opaca por cima, como draw_card fazia
+    direto na tela. O hover não muda o fundo (só a posição e a fonte), então
+    as variantes são por tamanho, cor (preta/branca) e seleção (cor da borda).
+    """
+
+    def __init__(self, max_items: int = CARD_SPRITE_MAX_ITEMS):
+        self.max_items = max_items
+        self._sprites = collections.OrderedDict() # {(largura, altura, preta, selecionada): superfície}
+
+    def get(self, width: int, height: int, is_black: bool, selected: bool) -> pygame.Surface:
+        key = (width, height, is_black, selected)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+        sprite = allocations.count(pygame.Surface((width + SHADOW_OFFSET, height + SHADOW_OFFSET), pygame.SRCALPHA))
+        pygame.draw.rect(sprite, SHADOW_COLOR, (SHADOW_OFFSET, SHADOW_OFFSET, width, height), 0, 10)
+        card_rect = pygame.Rect(0, 0, width, height)
+        pygame.draw.rect(sprite, COLOR_CARD_BLACK if is_black else COLOR_CARD_WHITE, card_rect, 0, 10)
+        pygame.draw.rect(sprite, COLOR_SELECTION if selected else COLOR_BORDER, card_rect, 3, 10)
+        if self.max_items > 0:
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_items:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def prerender(self, sizes):
+        """Desenha de antemão as variantes dos tamanhos dados ([(largura, altura, preta)])."""
+        for width, height, is_black in sizes:
+            for selected in (False, True):
+                self.get(width, height, is_black, selected)
+
+card_sprites = CardSpriteCache()
+
 class AnimatedMessage:
     def __init__(self, text: str, color: Tuple[int, int, int], font: pygame.font.Font, duration: float, fade_duration: float):
         self.text = text
@@ -88,6 +239,7 @@ class AnimatedMessage:
         self.duration = duration
         self.fade_duration = fade_duration
         self.alpha = 255
+        self.surface: Optional[pygame.Surface] = None # Renderizada no primeiro draw (só o alpha muda depois)
 
     def update(self):
         elapsed = time.time() - self.start_time
@@ -102,37 +254,40 @@ class AnimatedMessage:
 
     def draw(self, surface, center_pos: Tuple[int, int]):
         if self.alpha > 0:
-            text_surface = self.font.render(self.text, True, self.color)
-            text_surface.set_alpha(self.alpha)
-            text_rect = text_surface.get_rect(center=center_pos)
-            surface.blit(text_surface, text_rect)
+            if self.surface is None:
+                self.surface = allocations.count(self.font.render(self.text, True, self.color))
+            self.surface.set_alpha(self.alpha)
+            text_rect = self.surface.get_rect(center=center_pos)
+            surface.blit(self.surface, text_rect)
 
     def is_finished(self) -> bool:
         return time.time() - self.start_time > self.duration
 
-class GameClient:
+# Cores das mensagens do núcleo (GameSession.notify) na tela
+NOTIFY_COLORS = {
+    "info": COLOR_TEXT_LIGHT,
+    "success": COLOR_SUCCESS,
+    "error": COLOR_ERROR,
+    "highlight": COLOR_SELECTION,
+}
+
+class GameClient(GameSession):
+    """Tela pygame por cima de uma GameSession; a conexão roda num event loop em outra thread.
+
+    O estado do jogo só é lido e alterado na thread do pygame. A thread do
+    WebSocket não aplica as mensagens: ela as coloca em self.inbound, uma fila
+    de um produtor e um consumidor (deque: append e popleft são atômicos, sem
+    trava), que frame() esvazia uma vez por quadro. No outro sentido, post()
+    entrega as mensagens ao loop da conexão com call_soon_threadsafe, numa
+    asyncio.Queue que uma tarefa do loop envia em ordem.
+    """
+
     def __init__(self):
-        self.websocket: Optional[websockets.WebSocketClientProtocol] = None
+        # Estado do jogo e protocolo (client_core.py)
+        super().__init__(verbose=True)
         self.running = True
-        self.connected = False
-        
-        # Estado do jogo
-        self.game_state = "disconnected"
-        self.player_name = ""
-        self.room_code = ""
-        self.hand = []
-        self.current_black_card = ""
-        self.scores = {}
-        self.countdown = 0
-        self.submitted_count = 0
-        self.voting_cards = []
         self.selected_card_index = -1
         self.selected_vote_index = -1
-        self.round_result = {}
-        
-        # Flags para controlar ações por rodada
-        self.has_submitted_this_round = False
-        self.has_voted_this_round = False
         
         # UI
         self.input_text = ""
@@ -145,6 +300,14 @@ class GameClient:
         # Thread para WebSocket
         self.ws_thread = None
         self.websocket_loop: Optional[asyncio.AbstractEventLoop] = None # Definido como Optional
+        self.inbound = collections.deque() # (função, argumentos) para rodar na thread do pygame
+        self.outbound: Optional[asyncio.Queue] = None # (mensagem, instante da entrada), no loop da conexão
+
+        # Latências (s): da entrada do usuário ao envio e da chegada da mensagem ao frame que a mostra
+        self.latencies = {"input_to_send": collections.deque(maxlen=LATENCY_SAMPLES),
+                          "receive_to_render": collections.deque(maxlen=LATENCY_SAMPLES)}
+        self.input_started: Optional[float] = None # perf_counter() do evento de entrada sendo tratado
+        self.unrendered: List[float] = [] # Chegada das mensagens aplicadas e ainda não desenhadas
         
         # Botões para interatividade
         self.buttons: Dict[str, pygame.Rect] = {}
@@ -155,30 +318,119 @@ class GameClient:
 
         # Para hover das cartas na mão
         self.hover_card_index = -1
+
+        # Renderização por regiões sujas: a tela guarda o último frame e só o que mudou é redesenhado
+        card_sprites.prerender([(CARD_WIDTH_BLACK, CARD_HEIGHT_BLACK, True),
+                                (CARD_WIDTH_HAND, CARD_HEIGHT_HAND, False),
+                                (CARD_WIDTH_VOTE, CARD_HEIGHT_VOTE, False)])
+        self.frame_allocations = 0 # Superfícies criadas no último frame desenhado (ver AllocationCounter)
+
+        self.full_redraw = True
+        self.dirty_rects: List[pygame.Rect] = []
+        self.regions: Dict[str, pygame.Rect] = {} # Áreas de elementos que mudam sozinhos, gravadas ao desenhar
+        self.hover_button: Optional[str] = None
+        self.clock_values: Tuple[int, int] = (-1, -1) # (countdown, tempo da fase) mostrados no último frame
+        self.last_input = 0.0
     
     def set_message(self, text: str, color: Tuple[int, int, int] = COLOR_TEXT_LIGHT, 
                     duration: float = MESSAGE_DISPLAY_TIME, fade_duration: float = MESSAGE_FADE_DURATION):
         self.current_message = AnimatedMessage(text, color, font_medium, duration, fade_duration)
 
-    def wrap_text(self, text: str, font: pygame.font.Font, max_width: int) -> List[str]:
-        """Quebra texto em múltiplas linhas para caber na largura máxima."""
-        words = text.split(' ')
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            test_line = current_line + word + " "
-            if font.size(test_line)[0] <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line.strip())
-                current_line = word + " "
-        
-        if current_line:
-            lines.append(current_line.strip())
-            
-        return lines
+    def invalidate(self, *regions: str):
+        """Marca regiões (de self.regions) para redesenhar no próximo frame; sem argumentos, a tela toda."""
+        if not regions:
+            self.full_redraw = True
+            return
+        for name in regions:
+            rect = self.regions.get(name)
+            if rect is not None:
+                self.dirty_rects.append(rect.copy())
+
+    # --- Filas entre a thread do WebSocket e a do pygame ---
+
+    def push_inbound(self, function, *args):
+        """Agenda function(*args) na thread do pygame (chamado da thread do WebSocket)."""
+        self.inbound.append((function, args))
+        # Sempre: decidir pela fila vazia correria com o drain_inbound da outra thread
+        pygame.event.post(pygame.event.Event(WAKE_EVENT))
+
+    def drain_inbound(self):
+        while True:
+            try:
+                function, args = self.inbound.popleft()
+            except IndexError:
+                return
+            function(*args)
+
+    async def receive(self, data):
+        self.push_inbound(self.apply_inbound, data, time.perf_counter())
+
+    def apply_inbound(self, data, received_at: float):
+        messages = data.get("messages", []) if data.get("action") == "batch" else [data]
+        for message in messages:
+            for reply in self.apply_server_message(message):
+                self.post(reply)
+        # Qualquer mensagem do servidor pode mudar o que está na tela (placar, mão, fase...)
+        self.invalidate()
+        self.unrendered.append(received_at)
+
+    def connection_made(self):
+        self.push_inbound(GameSession.connection_made, self)
+
+    def connection_lost(self, text: str):
+        self.push_inbound(GameSession.connection_lost, self, text)
+
+    def post(self, message: Dict, input_time: Optional[float] = None):
+        """Envia `message` pelo loop da conexão; `input_time` é o instante da entrada que a gerou."""
+        if self.websocket_loop is not None and self.outbound is not None:
+            self.websocket_loop.call_soon_threadsafe(self.outbound.put_nowait, (message, input_time))
+
+    async def websocket_client(self, host: str = "localhost", port: Optional[int] = None):
+        self.outbound = asyncio.Queue()
+        sender = asyncio.create_task(self.send_outbound())
+        try:
+            await super().websocket_client(host, port)
+        finally:
+            sender.cancel()
+            self.outbound = None
+
+    async def send_outbound(self):
+        while True:
+            message, input_time = await self.outbound.get()
+            try:
+                await self.send(message)
+            except Exception as e:
+                print(f"[CLIENT ERROR] Erro ao enviar {message.get('action')}: {e}")
+                continue
+            if input_time is not None:
+                self.push_inbound(self.latencies["input_to_send"].append, time.perf_counter() - input_time)
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """p50/p99/máximo (ms) das latências medidas."""
+        stats = {}
+        for name, samples in self.latencies.items():
+            ordered = sorted(samples)
+            if not ordered:
+                stats[name] = {"n": 0}
+                continue
+            stats[name] = {"n": len(ordered), "p50_ms": ordered[len(ordered) // 2] * 1000,
+                           "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+                           "max_ms": ordered[-1] * 1000}
+        return stats
+
+    def notify(self, text: str, level: str = "info"):
+        self.set_message(text, NOTIFY_COLORS.get(level, COLOR_TEXT_LIGHT))
+
+    def reset_selection(self, hand: bool = False, vote: bool = False):
+        if hand:
+            self.selected_card_index = -1
+            self.hover_card_index = -1
+        if vote:
+            self.selected_vote_index = -1
+
+    def wrap_text(self, text: str, font: pygame.font.Font, max_width: int) -> Tuple[str, ...]:
+        """Quebra texto em múltiplas linhas para caber na largura máxima (com cache)."""
+        return text_cache.wrap(text, font, max_width)
     
     def draw_text_multiline(self, surface, text, color, rect, font, align_x="center", align_y="center"):
         """Desenha texto multi-linha com alinhamento, considerando padding."""
@@ -196,7 +448,7 @@ class GameClient:
             start_y = text_rect_padded.bottom - total_text_height
         
         for i, line in enumerate(lines):
-            text_surface = font.render(line, True, color)
+            text_surface = text_cache.render(line, font, color)
             text_rect = text_surface.get_rect()
             
             if align_x == "center":
@@ -209,14 +461,19 @@ class GameClient:
             text_rect.y = start_y + i * line_height
             surface.blit(text_surface, text_rect)
 
+    def draw_current_message(self, center_pos: Tuple[int, int]):
+        # A faixa da mensagem é redesenhada enquanto ela aparece/some (ver animate)
+        height = font_medium.get_height()
+        self.regions["message"] = pygame.Rect(0, center_pos[1] - height, SCREEN_WIDTH, 2 * height)
+        if self.current_message:
+            self.current_message.draw(screen, center_pos)
+
     def draw_card(self, text: str, x: int, y: int, width: int, height: int, 
                   is_black: bool, selected: bool = False, hovered: bool = False):
         """Desenha uma carta na tela com sombra e bordas arredondadas.
            'hovered' agora controla o offset para cima.
         """
-        card_color = COLOR_CARD_BLACK if is_black else COLOR_CARD_WHITE
         text_color = COLOR_TEXT_LIGHT if is_black else COLOR_TEXT_DARK
-        border_color = COLOR_SELECTION if selected else COLOR_BORDER
         
         offset_y = 0
         if selected:
@@ -226,14 +483,9 @@ class GameClient:
         
         final_y = y + offset_y
 
-        shadow_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surface, SHADOW_COLOR, (0, 0, width, height), 0, 10)
-        screen.blit(shadow_surface, (x + SHADOW_OFFSET, final_y + SHADOW_OFFSET))
-        
+        # Sombra, fundo e borda vêm prontos do cache; só o texto é composto por cima
+        screen.blit(card_sprites.get(width, height, is_black, selected), (x, final_y))
         card_rect = pygame.Rect(x, final_y, width, height)
-        pygame.draw.rect(screen, card_color, card_rect, 0, 10)
-        
-        pygame.draw.rect(screen, border_color, card_rect, 3, 10)
         
         text_font = font_card_text
         if (hovered or selected) and not is_black:
@@ -261,7 +513,7 @@ class GameClient:
         pygame.draw.rect(screen, current_color, button_rect, 0, 5)
         pygame.draw.rect(screen, COLOR_BORDER, button_rect, 2, 5)
         
-        text_surface = font_medium.render(text, True, text_color)
+        text_surface = text_cache.render(text, font_medium, text_color)
         text_rect = text_surface.get_rect(center=button_rect.center)
         screen.blit(text_surface, text_rect)
         
@@ -277,7 +529,7 @@ class GameClient:
         pygame.draw.rect(screen, color, input_rect, 0, 5)
         pygame.draw.rect(screen, border_color, input_rect, 2, 5)
         
-        text_surface = font_medium.render(text, True, COLOR_TEXT_LIGHT)
+        text_surface = text_cache.render(text, font_medium, COLOR_TEXT_LIGHT)
         screen.blit(text_surface, (x + int(width * 0.02), y + (height - text_surface.get_height()) // 2))
         
         if active:
@@ -292,16 +544,16 @@ class GameClient:
         pygame.draw.rect(screen, COLOR_BUTTON_NORMAL, board_rect, 0, 10)
         pygame.draw.rect(screen, COLOR_BORDER, board_rect, 2, 10)
         
-        title_surface = font_small.render("PLACAR", True, COLOR_TEXT_LIGHT)
+        title_surface = text_cache.render("PLACAR", font_small, COLOR_TEXT_LIGHT)
         title_rect = title_surface.get_rect(centerx=board_rect.centerx, top=y + int(height * 0.03))
         screen.blit(title_surface, title_rect)
         
         y_offset = y + int(height * 0.15)
-        sorted_scores = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)
+        sorted_scores = sorted(self.scores.values(), key=lambda item: item[1], reverse=True)
 
         for name, score in sorted_scores:
             if name:
-                score_text = font_small.render(f"{name}: {score}", True, COLOR_TEXT_LIGHT)
+                score_text = text_cache.render(f"{name}: {score}", font_small, COLOR_TEXT_LIGHT)
                 score_rect = score_text.get_rect(left=x + int(width * 0.05), centery=y_offset)
                 screen.blit(score_text, score_rect)
                 y_offset += int(height * 0.05)
@@ -312,18 +564,27 @@ class GameClient:
         pygame.draw.rect(screen, DARK_GRAY, header_rect)
         pygame.draw.line(screen, COLOR_BORDER, (0, self.header_height), (SCREEN_WIDTH, self.header_height), 2)
         
-        title_surface = font_xlarge.render(title, True, COLOR_TEXT_LIGHT)
+        title_surface = text_cache.render(title, font_xlarge, COLOR_TEXT_LIGHT)
         title_rect = title_surface.get_rect(center=(SCREEN_WIDTH//2, self.header_height // 2))
         screen.blit(title_surface, title_rect)
 
-        player_name_surface = font_small.render(f"Você: {self.player_name}", True, COLOR_TEXT_LIGHT)
+        player_name_surface = text_cache.render(f"Você: {self.player_name}", font_small, COLOR_TEXT_LIGHT)
         screen.blit(player_name_surface, (int(SCREEN_WIDTH * 0.015), int(SCREEN_HEIGHT * 0.02)))
 
         if self.room_code:
-            room_code_surface = font_small.render(f"Sala: {self.room_code}", True, COLOR_TEXT_LIGHT)
+            room_code_surface = text_cache.render(f"Sala: {self.room_code}", font_small, COLOR_TEXT_LIGHT)
             room_code_rect = room_code_surface.get_rect(right=SCREEN_WIDTH - int(SCREEN_WIDTH * 0.015), top=int(SCREEN_HEIGHT * 0.02))
             screen.blit(room_code_surface, room_code_rect)
 
+        self.regions["timer"] = pygame.Rect(SCREEN_WIDTH // 2, 0, SCREEN_WIDTH - SCREEN_WIDTH // 2, self.header_height)
+        if self.game_state == "in_game" and self.phase_deadline is not None:
+            # Depois do prazo o servidor joga/vota por quem não jogou
+            restante = max(0, math.ceil(self.phase_deadline - time.monotonic()))
+            timer_color = COLOR_ERROR if restante <= 5 else COLOR_TEXT_LIGHT
+            timer_surface = text_cache.render(f"Tempo: {restante}s", font_small, timer_color)
+            timer_rect = timer_surface.get_rect(right=SCREEN_WIDTH - int(SCREEN_WIDTH * 0.015), bottom=self.header_height - int(SCREEN_HEIGHT * 0.01))
+            screen.blit(timer_surface, timer_rect)
+
     def draw_connection_screen(self):
         screen.fill(COLOR_BACKGROUND)
         self.draw_header("Conectar ao Jogo")
@@ -335,7 +596,7 @@ class GameClient:
         button_height = int(SCREEN_HEIGHT * 0.06)
         
         if self.input_type == "name":
-            prompt = font_medium.render("Digite seu nome:", True, COLOR_TEXT_LIGHT)
+            prompt = text_cache.render("Digite seu nome:", font_medium, COLOR_TEXT_LIGHT)
             prompt_rect = prompt.get_rect(center=(center_x, int(SCREEN_HEIGHT * 0.3)))
             screen.blit(prompt, prompt_rect)
             
@@ -346,7 +607,7 @@ class GameClient:
                                                       button_width, button_height)
             
         elif self.input_type == "room":
-            prompt = font_medium.render("Digite o código da sala:", True, COLOR_TEXT_LIGHT)
+            prompt = text_cache.render("Digite o código da sala:", font_medium, COLOR_TEXT_LIGHT)
             prompt_rect = prompt.get_rect(center=(center_x, int(SCREEN_HEIGHT * 0.3)))
             screen.blit(prompt, prompt_rect)
             
@@ -356,11 +617,7 @@ class GameClient:
             self.buttons["connect"] = self.draw_button("Conectar", center_x - button_width//2, int(SCREEN_HEIGHT * 0.48), 
                                                       button_width, button_height)
             
-        if self.current_message:
-            self.current_message.update()
-            self.current_message.draw(screen, (SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.6)))
-            if self.current_message.is_finished():
-                self.current_message = None
+        self.draw_current_message((SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.6)))
 
     def draw_waiting_screen(self):
         screen.fill(COLOR_BACKGROUND)
@@ -368,11 +625,7 @@ class GameClient:
         
         center_x = SCREEN_WIDTH // 2
         
-        if self.current_message:
-            self.current_message.update()
-            self.current_message.draw(screen, (center_x, int(SCREEN_HEIGHT * 0.25)))
-            if self.current_message.is_finished():
-                self.current_message = None
+        self.draw_current_message((center_x, int(SCREEN_HEIGHT * 0.25)))
         
         self.draw_score_board(SCREEN_WIDTH - self.scoreboard_width - int(SCREEN_WIDTH * 0.015), self.header_height + int(SCREEN_HEIGHT * 0.02), 
                               self.scoreboard_width, SCREEN_HEIGHT - self.header_height - int(SCREEN_HEIGHT * 0.04))
@@ -380,17 +633,17 @@ class GameClient:
         info_x = int(SCREEN_WIDTH * 0.03)
         y_offset = self.header_height + int(SCREEN_HEIGHT * 0.05)
         
-        player_count_text = font_medium.render(f"Jogadores conectados: {len(self.scores)}", True, COLOR_TEXT_LIGHT)
+        player_count_text = text_cache.render(f"Jogadores conectados: {len(self.scores)}", font_medium, COLOR_TEXT_LIGHT)
         screen.blit(player_count_text, (info_x, y_offset))
         y_offset += int(SCREEN_HEIGHT * 0.05)
         
-        current_players_title = font_medium.render("Jogadores na Sala:", True, COLOR_TEXT_LIGHT)
+        current_players_title = text_cache.render("Jogadores na Sala:", font_medium, COLOR_TEXT_LIGHT)
         screen.blit(current_players_title, (info_x, y_offset))
         y_offset += int(SCREEN_HEIGHT * 0.05)
         
-        for name in self.scores.keys():
+        for name, _ in self.scores.values():
             if name:
-                player_text = font_small.render(f"- {name}", True, COLOR_TEXT_LIGHT)
+                player_text = text_cache.render(f"- {name}", font_small, COLOR_TEXT_LIGHT)
                 screen.blit(player_text, (info_x + int(SCREEN_WIDTH * 0.02), y_offset))
                 y_offset += int(SCREEN_HEIGHT * 0.04)
 
@@ -398,11 +651,16 @@ class GameClient:
         screen.fill(COLOR_BACKGROUND)
         self.draw_header("Jogo Começando!")
         
+        if self.countdown_deadline is not None:
+            # O servidor só manda o prazo; a contagem é feita aqui a cada frame
+            self.countdown = max(0, math.ceil(self.countdown_deadline - time.monotonic()))
+        
         center_x = SCREEN_WIDTH // 2
         center_y = SCREEN_HEIGHT // 2
         
-        countdown_text = font_xlarge.render(f"Começando em: {self.countdown}", True, COLOR_SELECTION)
+        countdown_text = text_cache.render(f"Começando em: {self.countdown}", font_xlarge, COLOR_SELECTION)
         countdown_rect = countdown_text.get_rect(center=(center_x, center_y))
+        self.regions["countdown"] = pygame.Rect(0, center_y - font_xlarge.get_height(), SCREEN_WIDTH, 2 * font_xlarge.get_height())
         screen.blit(countdown_text, countdown_rect)
         
         self.draw_score_board(SCREEN_WIDTH - self.scoreboard_width - int(SCREEN_WIDTH * 0.015), self.header_height + int(SCREEN_HEIGHT * 0.02), 
@@ -421,7 +679,7 @@ class GameClient:
             self.draw_card(self.current_black_card, black_card_x, black_card_y, 
                            CARD_WIDTH_BLACK, CARD_HEIGHT_BLACK, True)
         
-        submitted_text = font_medium.render(f"Cartas submetidas: {self.submitted_count}/{len(self.scores) - 1 if len(self.scores) > 0 else 0}", True, COLOR_TEXT_LIGHT)
+        submitted_text = text_cache.render(f"Cartas submetidas: {self.submitted_count}/{len(self.scores) - 1 if len(self.scores) > 0 else 0}", font_medium, COLOR_TEXT_LIGHT)
         submitted_text_rect = submitted_text.get_rect(left=black_card_x + CARD_WIDTH_BLACK + int(SCREEN_WIDTH * 0.03), 
                                                       centery=black_card_y + CARD_HEIGHT_BLACK // 2)
         screen.blit(submitted_text, submitted_text_rect)
@@ -429,6 +687,9 @@ class GameClient:
         if self.hand:
             available_hand_width = SCREEN_WIDTH - self.scoreboard_width - (2 * int(SCREEN_WIDTH * 0.03))
             base_hand_y = SCREEN_HEIGHT - CARD_HEIGHT_HAND - int(SCREEN_HEIGHT * 0.03)
+            # Hover e seleção só mexem nesta faixa (a carta sobe até CARD_SELECT_OFFSET_Y)
+            hand_top = base_hand_y - CARD_SELECT_OFFSET_Y
+            self.regions["hand"] = pygame.Rect(0, hand_top, SCREEN_WIDTH, SCREEN_HEIGHT - hand_top)
 
             if len(self.hand) > 1:
                 full_width_no_overlap = len(self.hand) * CARD_WIDTH_HAND
@@ -480,11 +741,7 @@ class GameClient:
                                                  submit_button_y, submit_button_width, submit_button_height, 
                                                  COLOR_SUCCESS, disabled=self.has_submitted_this_round or self.selected_card_index == -1)
         
-        if self.current_message:
-            self.current_message.update()
-            self.current_message.draw(screen, (SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.5)))
-            if self.current_message.is_finished():
-                self.current_message = None
+        self.draw_current_message((SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.5)))
 
     def draw_voting_screen(self):
         screen.fill(COLOR_BACKGROUND)
@@ -499,7 +756,7 @@ class GameClient:
             self.draw_card(self.current_black_card, black_card_x, black_card_y, 
                            CARD_WIDTH_BLACK, CARD_HEIGHT_BLACK, True)
         
-        vote_title = font_medium.render("Vote na melhor resposta:", True, COLOR_TEXT_LIGHT)
+        vote_title = text_cache.render("Vote na melhor resposta:", font_medium, COLOR_TEXT_LIGHT)
         vote_rect = vote_title.get_rect(centerx=SCREEN_WIDTH//2, top=self.header_height + int(SCREEN_HEIGHT * 0.05))
         screen.blit(vote_title, vote_rect)
         
@@ -535,11 +792,7 @@ class GameClient:
                                                vote_button_y, vote_button_width, vote_button_height, 
                                                COLOR_SUCCESS, disabled=self.has_voted_this_round or self.selected_vote_index == -1)
         
-        if self.current_message:
-            self.current_message.update()
-            self.current_message.draw(screen, (SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.5)))
-            if self.current_message.is_finished():
-                self.current_message = None
+        self.draw_current_message((SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.5)))
 
     def draw_result_screen(self):
         screen.fill(COLOR_BACKGROUND)
@@ -558,7 +811,7 @@ class GameClient:
             winner_card_text = self.round_result.get("winner_card", "")
             winner_name = self.round_result.get("winner_address", "")
             
-            result_title = font_medium.render("Carta Vencedora:", True, COLOR_TEXT_LIGHT)
+            result_title = text_cache.render("Carta Vencedora:", font_medium, COLOR_TEXT_LIGHT)
             result_rect = result_title.get_rect(centerx=SCREEN_WIDTH//2, top=self.header_height + int(SCREEN_HEIGHT * 0.05))
             screen.blit(result_title, result_rect)
             
@@ -570,19 +823,15 @@ class GameClient:
             self.draw_card(winner_card_text, winner_card_x, winner_card_y, 
                            WINNER_CARD_WIDTH, WINNER_CARD_HEIGHT, False, True)
             
-            winner_text = font_medium.render(f"Vencedor da Rodada: {winner_name}", True, COLOR_SELECTION)
+            winner_text = text_cache.render(f"Vencedor da Rodada: {winner_name}", font_medium, COLOR_SELECTION)
             winner_text_rect = winner_text.get_rect(center=(SCREEN_WIDTH//2, winner_card_y + WINNER_CARD_HEIGHT + int(SCREEN_HEIGHT * 0.05)))
             screen.blit(winner_text, winner_text_rect)
         else:
-            no_winner_text = font_medium.render("Nenhum vencedor nesta rodada.", True, COLOR_TEXT_LIGHT)
+            no_winner_text = text_cache.render("Nenhum vencedor nesta rodada.", font_medium, COLOR_TEXT_LIGHT)
             no_winner_rect = no_winner_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
             screen.blit(no_winner_text, no_winner_rect)
 
-        if self.current_message:
-            self.current_message.update()
-            self.current_message.draw(screen, (SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.8)))
-            if self.current_message.is_finished():
-                self.current_message = None
+        self.draw_current_message((SCREEN_WIDTH // 2, int(SCREEN_HEIGHT * 0.8)))
 
     def draw_game_over_screen(self):
         screen.fill(COLOR_BACKGROUND)
@@ -591,7 +840,7 @@ class GameClient:
         center_x = SCREEN_WIDTH // 2
         y_start = self.header_height + int(SCREEN_HEIGHT * 0.05)
         
-        game_over_message = font_xlarge.render("FIM DE JOGO!", True, COLOR_ERROR)
+        game_over_message = text_cache.render("FIM DE JOGO!", font_xlarge, COLOR_ERROR)
         game_over_rect = game_over_message.get_rect(center=(center_x, y_start))
         screen.blit(game_over_message, game_over_rect)
         
@@ -599,25 +848,25 @@ class GameClient:
         if self.round_result and self.round_result.get("winner"):
             winner_name = self.round_result.get("winner", "")
             winner_score = self.round_result.get("score", "")
-            winner_text = font_large.render(f"Vencedor: {winner_name} com {winner_score} pontos!", True, COLOR_SELECTION)
+            winner_text = text_cache.render(f"Vencedor: {winner_name} com {winner_score} pontos!", font_large, COLOR_SELECTION)
             winner_rect = winner_text.get_rect(center=(center_x, y_start))
             screen.blit(winner_text, winner_rect)
             y_start += int(SCREEN_HEIGHT * 0.06)
         else:
-            no_winner_text = font_large.render("O jogo terminou.", True, COLOR_TEXT_LIGHT)
+            no_winner_text = text_cache.render("O jogo terminou.", font_large, COLOR_TEXT_LIGHT)
             no_winner_rect = no_winner_text.get_rect(center=(center_x, y_start))
             screen.blit(no_winner_text, no_winner_rect)
             y_start += int(SCREEN_HEIGHT * 0.06)
 
-        score_title = font_medium.render("Pontuações Finais:", True, COLOR_TEXT_LIGHT)
+        score_title = text_cache.render("Pontuações Finais:", font_medium, COLOR_TEXT_LIGHT)
         score_title_rect = score_title.get_rect(center=(center_x, y_start))
         screen.blit(score_title, score_title_rect)
         
         y_offset = y_start + int(SCREEN_HEIGHT * 0.05)
-        sorted_scores = sorted(self.scores.items(), key=lambda x: x[1], reverse=True)
+        sorted_scores = sorted(self.scores.values(), key=lambda x: x[1], reverse=True)
         for name, score in sorted_scores:
             if name:
-                score_text = font_small.render(f"{name}: {score} pontos", True, COLOR_TEXT_LIGHT)
+                score_text = text_cache.render(f"{name}: {score} pontos", font_small, COLOR_TEXT_LIGHT)
                 score_rect = score_text.get_rect(center=(center_x, y_offset))
                 screen.blit(score_text, score_rect)
                 y_offset += int(SCREEN_HEIGHT * 0.04)
@@ -629,13 +878,44 @@ class GameClient:
         
         self.buttons["new_game"] = self.draw_button("Nova Partida", new_game_button_x, 
                                                    new_game_button_y, new_game_button_width, new_game_button_height, COLOR_SUCCESS)
-        if self.current_message:
-            self.current_message.update()
-            self.current_message.draw(screen, (SCREEN_WIDTH // 2, SCREEN_HEIGHT - int(SCREEN_HEIGHT * 0.15)))
-            if self.current_message.is_finished():
+        self.draw_current_message((SCREEN_WIDTH // 2, SCREEN_HEIGHT - int(SCREEN_HEIGHT * 0.15)))
+
+    def animate(self):
+        """Marca como sujo o que muda com o tempo, sem depender de eventos: mensagem e contagens."""
+        message = self.current_message
+        if message is not None:
+            old_alpha = message.alpha
+            message.update()
+            if message.is_finished():
                 self.current_message = None
-
-    def draw(self):
+                self.invalidate("message")
+            elif message.surface is None or message.alpha != old_alpha:
+                self.invalidate("message")
+
+        now = time.monotonic()
+        countdown = math.ceil(self.countdown_deadline - now) if self.countdown_deadline is not None else self.countdown
+        remaining = math.ceil(self.phase_deadline - now) if self.phase_deadline is not None else -1
+        clock_values = (max(0, countdown), max(0, remaining))
+        if clock_values != self.clock_values:
+            self.clock_values = clock_values
+            self.invalidate("countdown", "timer")
+
+    def draw(self) -> bool:
+        """Redesenha as regiões sujas (ou a tela toda) e atualiza só elas no display.
+
+        As telas continuam desenhando a cena inteira, mas com o clip na união das
+        regiões sujas: pixels fora dela não são tocados e o display só recebe
+        essas regiões. Retorna False se não havia nada para desenhar.
+        """
+        self.animate()
+        full_redraw, self.full_redraw = self.full_redraw, False
+        dirty_rects, self.dirty_rects = self.dirty_rects, []
+        if full_redraw:
+            dirty_rects = [screen.get_rect()]
+        elif not dirty_rects:
+            return False
+        screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+        allocated_before = allocations.surfaces
         self.buttons.clear()
         
         if self.game_state == "disconnected":
@@ -654,7 +934,13 @@ class GameClient:
         elif self.game_state == "game_over":
             self.draw_game_over_screen()
         
-        pygame.display.flip()
+        screen.set_clip(None)
+        self.frame_allocations = allocations.surfaces - allocated_before
+        if full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
+        return True
     
     def handle_click(self, pos):
         if self.game_state == "disconnected":
@@ -750,8 +1036,12 @@ class GameClient:
         
         elif self.game_state == "game_over":
             if "new_game" in self.buttons and self.buttons["new_game"].collidepoint(pos):
-                self.restart_game()
-                self.set_message("Iniciando nova partida...", COLOR_TEXT_LIGHT)
+                if self.connected:
+                    # O servidor inicia a revanche sozinho com quem continua na sala
+                    self.set_message("Aguardando a revanche...", COLOR_TEXT_LIGHT)
+                else:
+                    self.restart_game()
+                    self.set_message("Iniciando nova partida...", COLOR_TEXT_LIGHT)
     
     def handle_mouse_motion(self, pos):
         if self.game_state == "in_game" and not self.voting_cards and self.hand and hasattr(self, 'card_rects_in_hand'):
@@ -761,10 +1051,20 @@ class GameClient:
                 if card_rect.collidepoint(pos):
                     new_hover_index = i
                     break
-            self.hover_card_index = new_hover_index
+            if new_hover_index != self.hover_card_index:
+                self.hover_card_index = new_hover_index
+                self.invalidate("hand")
         else:
             self.hover_card_index = -1
 
+        # Botões mudam de cor com o mouse em cima
+        hover_button = next((name for name, rect in self.buttons.items() if rect.collidepoint(pos)), None)
+        if hover_button != self.hover_button:
+            for name in (self.hover_button, hover_button):
+                if name in self.buttons:
+                    self.dirty_rects.append(self.buttons[name].copy())
+            self.hover_button = hover_button
+
     def handle_keydown(self, event):
         if self.input_active:
             if event.key == pygame.K_RETURN:
@@ -804,204 +1104,25 @@ class GameClient:
             self.websocket_loop.run_until_complete(self.websocket_client())
         except Exception as e:
             print(f"[CLIENT ERROR] Erro no loop da thread WebSocket: {e}")
-            self.set_message(f"Erro interno de conexão: {e}", COLOR_ERROR)
+            self.push_inbound(self.set_message, f"Erro interno de conexão: {e}", COLOR_ERROR)
         finally:
             if not self.websocket_loop.is_closed():
                 # self.websocket_loop.close() # Não fechar aqui, pode ser necessário para outras corrotinas
                 print("[CLIENT] Loop WebSocket thread finalizado.")
 
-    async def websocket_client(self):
-        port = int(os.environ.get("PORT", 10000))
-        uri = f"ws://localhost:{port}"
-        
-        try:
-            async with websockets.connect(uri) as websocket:
-                self.websocket = websocket
-                self.connected = True
-                print("[CLIENT] Conectado ao servidor WebSocket.")
-                self.set_message("Conectado! Aguardando o jogo começar.", COLOR_SUCCESS)
-                
-                await websocket.send(json.dumps({
-                    "action": "nome",
-                    "nome": self.player_name
-                }))
-                await websocket.send(json.dumps({
-                    "action": "entrar_sala",
-                    "sala": self.room_code
-                }))
-                
-                async for message in websocket:
-                    data = json.loads(message)
-                    await self.handle_server_message(data)
-                    
-        except websockets.exceptions.ConnectionClosedOK:
-            print("[CLIENT] Conexão WebSocket fechada normalmente.")
-            self.connected = False
-            self.game_state = "disconnected"
-            self.set_message("Desconectado do servidor.", COLOR_ERROR)
-        except websockets.exceptions.ConnectionClosedError as e:
-            print(f"[CLIENT ERROR] Conexão WebSocket fechada com erro: {e}")
-            self.connected = False
-            self.game_state = "disconnected"
-            self.set_message(f"Erro de conexão: {e}. Tente novamente.", COLOR_ERROR)
-        except Exception as e:
-            print(f"[CLIENT ERROR] Erro na conexão WebSocket: {e}")
-            self.connected = False
-            self.game_state = "disconnected"
-            self.set_message(f"Erro inesperado de conexão: {e}. Tente novamente.", COLOR_ERROR)
-        finally:
-            self.websocket = None # Garante que o websocket está limpo
-            print("[CLIENT] WebSocket instance set to None.")
-
-
-    async def handle_server_message(self, data):
-        action = data.get("action")
-        print(f"[CLIENT] Received action: {action} - Data: {data}")
-        
-        if action == "game_state_update":
-            old_state = self.game_state
-            self.game_state = data.get("state", "disconnected")
-            if self.game_state == "waiting_for_players" and old_state != "waiting_for_players":
-                self.set_message("Aguardando mais jogadores...", COLOR_TEXT_LIGHT)
-            elif self.game_state == "in_game" and old_state != "in_game":
-                self.set_message("O jogo começou!", COLOR_SUCCESS)
-            
-            # **CORREÇÃO CRÍTICA 1:** Resetar flags quando o estado de jogo transiciona para um estado final/de rodada
-            if self.game_state in ["round_result", "game_over"]:
-                self.has_submitted_this_round = False
-                self.has_voted_this_round = False
-                self.selected_card_index = -1 # Limpa seleção da mão
-                self.selected_vote_index = -1 # Limpa seleção de voto
-                print(f"[CLIENT] Flags de submissão/voto resetadas no state_update para '{self.game_state}'.")
-
-
-        elif action == "nova_mao":
-            new_hand_list = data.get("cartas", [])
-            self.hand = new_hand_list
-            self.selected_card_index = -1
-            self.hover_card_index = -1
-            self.set_message("Você recebeu uma nova mão!", COLOR_TEXT_LIGHT)
-        
-        elif action == "scores_update":
-            self.scores = data.get("scores", {})
-        
-        elif action == "codigo_sala":
-            self.room_code = data.get("sala", "")
-            self.set_message(f"Você está na sala: {self.room_code}", COLOR_TEXT_LIGHT)
-        
-        elif action == "countdown":
-            self.countdown = data.get("seconds", 0)
-            self.set_message(f"Jogo começando em: {self.countdown}", COLOR_SELECTION)
-        
-        elif action == "black_card":
-            self.current_black_card = data.get("card", "")
-            self.submitted_count = 0 
-            self.voting_cards = [] 
-            self.selected_vote_index = -1
-            # **CORREÇÃO CRÍTICA 1.1:** Resetar flags aqui também para garantir, caso o state_update falhe.
-            self.has_submitted_this_round = False 
-            self.has_voted_this_round = False 
-            self.set_message("Nova carta preta! Escolha sua melhor resposta.", COLOR_TEXT_LIGHT)
-        
-        elif action == "white_card_submitted":
-            self.submitted_count = data.get("count", 0)
-            self.set_message(f"{self.submitted_count} cartas submetidas.", COLOR_TEXT_LIGHT)
-        
-        elif action == "start_vote":
-            self.voting_cards = data.get("cards", [])
-            self.selected_vote_index = -1
-            self.game_state = "in_game" # Votação é uma sub-fase do in_game
-            self.set_message("Hora de votar!", COLOR_SELECTION)
-            self.has_voted_this_round = False # Garante que pode votar na rodada de votação
-        
-        elif action == "round_result":
-            self.round_result = {
-                "winner_card": data.get("winner_card", ""),
-                "winner_address": data.get("winner_address", "")
-            }
-            self.game_state = "round_result"
-            self.set_message(f"Vencedor da Rodada: {self.round_result['winner_address']}!", COLOR_SUCCESS)
-            # As flags já devem ter sido resetadas pelo game_state_update para 'round_result'
-            # Mas, para garantir, vamos resetar aqui também se o 'game_state_update' for perdido
-            self.has_submitted_this_round = False
-            self.has_voted_this_round = False
-
-        elif action == "game_over":
-            self.round_result = {
-                "winner": data.get("winner", ""),
-                "score": data.get("score", "")
-            }
-            self.game_state = "game_over"
-            self.set_message(f"Fim de Jogo! Vencedor: {self.round_result['winner']}.", COLOR_ERROR)
-            self.has_submitted_this_round = False
-            self.has_voted_this_round = False
-        
-        elif action == "next_round":
-            # **CORREÇÃO CRÍTICA 2:** Limpar o estado do cliente para a próxima rodada
-            print("[CLIENT] Recebido 'next_round'. Preparando para a nova rodada.")
-            self.voting_cards = [] # Limpa as cartas de votação da rodada anterior
-            self.selected_card_index = -1
-            self.selected_vote_index = -1
-            self.submitted_count = 0
-            self.set_message("Iniciando próxima rodada...", COLOR_TEXT_LIGHT)
-            # As flags de submissão/voto já foram resetadas quando entrou em "round_result" ou "game_over"
-        
-        elif action == "get_nome":
-            if self.websocket:
-                await self.websocket.send(json.dumps({
-                    "action": "nome",
-                    "nome": self.player_name
-                }))
-        
-        elif action == "error":
-            self.set_message(f"Erro do Servidor: {data.get('reason', 'Desconhecido')}", COLOR_ERROR)
-            print(f"[CLIENT ERROR] Server Error: {data.get('reason', 'Desconhecido')}")
-
     def submit_card(self):
-        if (self.selected_card_index != -1 and 
-            self.selected_card_index < len(self.hand) and 
-            self.websocket and
-            self.websocket_loop and
-            not self.has_submitted_this_round): 
-            
-            card = self.hand[self.selected_card_index]
-            
-            async def send_submit():
-                try:
-                    await self.websocket.send(json.dumps({
-                        "action": "submit_white_card",
-                        "card": card
-                    }))
-                    print(f"[CLIENT] Carta '{card}' submetida.")
-                except Exception as e:
-                    print(f"[CLIENT ERROR] Erro ao enviar submit_white_card: {e}")
-            
-            asyncio.run_coroutine_threadsafe(send_submit(), self.websocket_loop)
+        if self.selected_card_index != -1:
+            message = self.submit_message(self.selected_card_index)
+            if message is not None:
+                self.post(message, self.input_started)
             self.selected_card_index = -1
-            self.has_submitted_this_round = True
 
     def vote_card(self):
-        if (self.selected_vote_index != -1 and 
-            self.selected_vote_index < len(self.voting_cards) and 
-            self.websocket and
-            self.websocket_loop and
-            not self.has_voted_this_round): 
-            
-            card = self.voting_cards[self.selected_vote_index]
-            
-            async def send_vote():
-                try:
-                    await self.websocket.send(json.dumps({
-                        "action": "vote",
-                        "card": card
-                    }))
-                    print(f"[CLIENT] Voto em '{card}' enviado.")
-                except Exception as e:
-                    print(f"[CLIENT ERROR] Erro ao enviar vote: {e}")
-            
-            asyncio.run_coroutine_threadsafe(send_vote(), self.websocket_loop)
+        if self.selected_vote_index != -1:
+            message = self.vote_message(self.selected_vote_index)
+            if message is not None:
+                self.post(message, self.input_started)
             self.selected_vote_index = -1
-            self.has_voted_this_round = True
     
     def restart_game(self):
         print("[CLIENT] Reiniciando estado do cliente para nova partida.")
@@ -1046,31 +1167,66 @@ class GameClient:
         self.websocket = None
         self.websocket_loop = None # Força a criação de um novo loop/thread
         self.ws_thread = None # Permite que uma nova thread seja criada
+        self.inbound.clear() # Mensagens da conexão antiga não valem para a nova
+        self.unrendered.clear()
         print("[CLIENT] Variáveis de WebSocket resetadas.")
 
         # Reinicia o estado do jogo
-        self.game_state = "disconnected"
-        self.round_result = {}
-        self.voting_cards = []
-        self.selected_card_index = -1
-        self.selected_vote_index = -1
-        self.hand = []
-        self.current_black_card = ""
-        self.scores = {}
-        self.submitted_count = 0
-        self.countdown = 0
+        self.reset_state()
+        self.reset_selection(hand=True, vote=True)
         self.player_name = ""
         self.room_code = ""
         self.input_text = ""
         self.input_active = True
         self.input_type = "name"
-        self.has_submitted_this_round = False
-        self.has_voted_this_round = False
-        self.hover_card_index = -1
         self.set_message("Bem-vindo! Digite seu nome para começar.", COLOR_TEXT_LIGHT)
         print("[CLIENT] Cliente redefinido para estado inicial.")
 
 
+    def handle_event(self, event):
+        if event.type == WAKE_EVENT:
+            return # Só acorda o loop; a fila de entrada é esvaziada em frame()
+        self.last_input = time.monotonic()
+        self.input_started = time.perf_counter()
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                self.handle_click(event.pos)
+                self.invalidate()
+        elif event.type == pygame.KEYDOWN:
+            self.handle_keydown(event)
+            self.invalidate()
+        elif event.type == pygame.MOUSEMOTION:
+            self.handle_mouse_motion(event.pos)
+        else:
+            # Janela exposta, restaurada, redimensionada...: o conteúdo pode ter se perdido
+            self.invalidate()
+        self.input_started = None
+
+    def frame(self, clock: pygame.time.Clock):
+        """Uma volta do loop: eventos, mensagens do servidor, desenho das regiões sujas e espera."""
+        for event in pygame.event.get():
+            self.handle_event(event)
+        self.drain_inbound()
+        
+        drew = self.draw()
+        if drew and self.unrendered:
+            rendered_at = time.perf_counter()
+            for received_at in self.unrendered:
+                self.latencies["receive_to_render"].append(rendered_at - received_at)
+            self.unrendered.clear()
+        # Nada mudou, nenhuma mensagem animando e nenhuma entrada recente: tela parada
+        active = drew or self.current_message is not None or time.monotonic() - self.last_input < ACTIVE_GRACE
+        if active:
+            clock.tick(FPS)
+        else:
+            # Dorme até uma entrada ou um WAKE_EVENT da thread do WebSocket, no máximo um quadro de IDLE_FPS
+            event = pygame.event.wait(1000 // IDLE_FPS)
+            if event.type != pygame.NOEVENT:
+                self.handle_event(event)
+            clock.tick()
+
     def run(self):
         clock = pygame.time.Clock()
         
@@ -1078,19 +1234,7 @@ class GameClient:
         self.set_message("Bem-vindo! Digite seu nome para começar.", COLOR_TEXT_LIGHT)
 
         while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        self.handle_click(event.pos)
-                elif event.type == pygame.KEYDOWN:
-                    self.handle_keydown(event)
-                elif event.type == pygame.MOUSEMOTION:
-                    self.handle_mouse_motion(event.pos)
-            
-            self.draw()
-            clock.tick(60)
+            self.frame(clock)
         
         # Cleanup final
         # Garante que o loop do WebSocket é parado e fechado ao sair do Pygame
@@ -0,0 +1,445 @@
+"""Núcleo do cliente: protocolo e estado do jogo, sem pygame nem tela.
+
+GameSession conecta em uma sala, aplica as mensagens do servidor ao estado
+(mão, carta preta, votação, placar, prazos) e envia as jogadas. Não cria
+threads nem event loop próprios: websocket_client() é uma corrotina comum,
+então muitas sessões podem rodar no mesmo loop (testes de carga/soak), e o
+client1.py vira só a tela por cima dela (GameClient herda de GameSession).
+
+Cada mensagem do servidor passa por apply_server_message(), que só muda o
+estado e devolve as respostas a enviar (resync, nome); handle_server_message()
+junta isso à conexão. Uma interface que rode em outra thread pode aplicar as
+mensagens na própria thread e mandar as respostas pelo seu caminho.
+
+A interface reage às mudanças pelos ganchos notify() (mensagens para o
+jogador), reset_selection() (a mão ou a votação mudaram), connection_made() e
+connection_lost() (a conexão abriu/caiu) e on_action() (qualquer mensagem já
+aplicada; é onde um cliente roteirizado joga).
+
+Rodando este arquivo, N sessões roteirizadas jogam numa sala (soak test):
+
+    python3 client_core.py --sala 1234 --sessoes 50 [--porta 4000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Optional, List, Dict, Any
+
+import websockets
+
+try:
+    import msgpack # Opcional: mensagens em frames binários msgpack em vez de JSON
+except ImportError:
+    msgpack = None
+
+# Formato das mensagens, negociado com o servidor pelo subprotocolo WebSocket (ver backend/codec.py)
+SUBPROTOCOL_MSGPACK = "cah.msgpack"
+
+# Catálogo de cartas em cache local (protocolo por IDs: o servidor manda só os IDs das cartas)
+CATALOG_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cartas-contra-a-humanidade")
+
+def load_cached_catalog() -> Optional[Dict[str, Any]]:
+    """Carrega o catálogo mais recente salvo em disco, ou None se não houver cache."""
+    try:
+        arquivos = [f for f in os.listdir(CATALOG_CACHE_DIR) if f.startswith("catalogo-") and f.endswith(".json")]
+    except OSError:
+        return None
+    if not arquivos:
+        return None
+    arquivos.sort(key=lambda f: os.path.getmtime(os.path.join(CATALOG_CACHE_DIR, f)), reverse=True)
+    try:
+        with open(os.path.join(CATALOG_CACHE_DIR, arquivos[0]), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_cached_catalog(catalog: Dict[str, Any]):
+    try:
+        os.makedirs(CATALOG_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CATALOG_CACHE_DIR, f"catalogo-{catalog['versao']}.json"), "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"[CLIENT WARNING] Não foi possível salvar o catálogo em cache: {e}")
+
+class GameSession:
+    """Uma conexão de jogador: estado do jogo + protocolo. Todos os métodos rodam no loop da conexão."""
+
+    def __init__(self, catalog: Optional[Dict[str, Any]] = None, verbose: bool = False):
+        self.websocket: Optional[websockets.ClientConnection] = None
+        self.connected = False
+        self.verbose = verbose # Loga cada mensagem recebida (a tela sim; milhares de sessões não)
+        self.player_name = ""
+        self.room_code = ""
+        # Catálogo {"versao", "brancas", "pretas"} para traduzir os IDs recebidos do servidor.
+        # Sessões do mesmo processo podem compartilhar um só (é só leitura)
+        self.catalog = catalog if catalog is not None else load_cached_catalog()
+        self.reset_state()
+
+    def reset_state(self):
+        """Estado de jogo de uma sessão ainda não conectada."""
+        self.game_state = "disconnected"
+        self.hand = []
+        self.hand_ids = [] # IDs das cartas da mão, na mesma ordem de self.hand
+        self.hand_seq = 0 # Última mensagem de mão aplicada (nova_mao/mao_delta)
+        self.current_black_card = ""
+        self.scores = {} # {id do jogador: [nome, pontos]} (nomes podem se repetir)
+        self.scores_version = 0
+        self.countdown = 0
+        self.countdown_deadline: Optional[float] = None # Prazo do countdown no relógio local (time.monotonic())
+        self.phase_deadline: Optional[float] = None # Prazo da fase da rodada (envio/votação), mesmo relógio
+        self.use_msgpack = False # Negociado na conexão (subprotocolo cah.msgpack)
+        self.clock_offset = 0.0 # Relógio do servidor - relógio local, em segundos
+        self.submitted_count = 0
+        self.voting_cards = []
+        self.voting_ids = []
+        self.round_result = {}
+        # Flags para controlar ações por rodada
+        self.has_submitted_this_round = False
+        self.has_voted_this_round = False
+
+    # --- Ganchos da interface (a tela do client1.py sobrescreve) ---
+
+    def notify(self, text: str, level: str = "info"):
+        """Mensagem para o jogador; `level` é "info", "success", "error" ou "highlight"."""
+
+    def reset_selection(self, hand: bool = False, vote: bool = False):
+        """A mão (hand) ou as cartas da votação (vote) mudaram: seleções antigas não valem mais."""
+
+    async def on_action(self, action: str, data: Dict[str, Any]):
+        """Chamado depois que cada mensagem do servidor foi aplicada ao estado."""
+
+    def connection_made(self):
+        self.notify("Conectado! Aguardando o jogo começar.", "success")
+
+    def connection_lost(self, text: str):
+        self.game_state = "disconnected"
+        self.notify(text, "error")
+
+    async def receive(self, data: Dict[str, Any]):
+        """Mensagem decodificada recebida do servidor (na thread/loop da conexão)."""
+        await self.handle_server_message(data)
+
+    def log(self, text: str):
+        if self.verbose:
+            print(text)
+
+    # --- Conexão ---
+
+    async def websocket_client(self, host: str = "localhost", port: Optional[int] = None):
+        """Conecta na sala self.room_code e processa as mensagens até a conexão fechar."""
+        # Porta única do servidor de salas; a sala é escolhida pelo caminho
+        if port is None:
+            port = int(os.environ.get("PORT", 4000))
+        # cartas=ids: protocolo por IDs; lote=1: mensagens do mesmo tick chegam num único frame "batch"
+        uri = f"ws://{host}:{port}/sala/{self.room_code}?cartas=ids&lote=1"
+        if self.catalog:
+            # O servidor só reenvia o catálogo se a versão em cache estiver desatualizada
+            uri += f"&catalogo={self.catalog['versao']}"
+
+        # Sem o msgpack instalado (ou com um servidor que não o aceite) a conexão segue em JSON
+        subprotocols = [SUBPROTOCOL_MSGPACK] if msgpack else None
+        try:
+            async with websockets.connect(uri, subprotocols=subprotocols) as websocket:
+                self.websocket = websocket
+                self.use_msgpack = websocket.subprotocol == SUBPROTOCOL_MSGPACK
+                self.connected = True
+                self.log("[CLIENT] Conectado ao servidor WebSocket.")
+                self.connection_made()
+
+                await self.send({"action": "nome", "nome": self.player_name})
+
+                async for message in websocket:
+                    await self.receive(self.decode(message))
+
+        except websockets.exceptions.ConnectionClosedOK:
+            self.log("[CLIENT] Conexão WebSocket fechada normalmente.")
+            self.connected = False
+            self.connection_lost("Desconectado do servidor.")
+        except websockets.exceptions.ConnectionClosedError as e:
+            print(f"[CLIENT ERROR] Conexão WebSocket fechada com erro: {e}")
+            self.connected = False
+            self.connection_lost(f"Erro de conexão: {e}. Tente novamente.")
+        except Exception as e:
+            print(f"[CLIENT ERROR] Erro na conexão WebSocket: {e}")
+            self.connected = False
+            self.connection_lost(f"Erro inesperado de conexão: {e}. Tente novamente.")
+        finally:
+            self.connected = False
+            self.websocket = None # Garante que o websocket está limpo
+            self.log("[CLIENT] WebSocket instance set to None.")
+
+    async def close(self):
+        if self.websocket:
+            await self.websocket.close()
+
+    def encode(self, message: Dict[str, Any]):
+        return msgpack.packb(message) if self.use_msgpack else json.dumps(message)
+
+    def decode(self, frame):
+        # IDs de jogador chegam como chaves inteiras do placar no msgpack
+        return msgpack.unpackb(frame, strict_map_key=False) if self.use_msgpack else json.loads(frame)
+
+    async def send(self, message: Dict[str, Any]):
+        if self.websocket:
+            await self.websocket.send(self.encode(message))
+
+    # --- Jogadas ---
+
+    def submit_message(self, index: int) -> Optional[Dict[str, Any]]:
+        """Marca a carta `index` da mão como submetida e devolve a mensagem; None se não for possível."""
+        if not (0 <= index < len(self.hand)) or self.websocket is None or self.has_submitted_this_round:
+            return None
+        self.has_submitted_this_round = True
+        self.log(f"[CLIENT] Submetendo a carta '{self.hand[index]}'.")
+        return {"action": "submit_white_card", "id": self.hand_ids[index]}
+
+    def vote_message(self, index: int) -> Optional[Dict[str, Any]]:
+        """Marca o voto na carta `index` da votação e devolve a mensagem; None se não for possível."""
+        if not (0 <= index < len(self.voting_cards)) or self.websocket is None or self.has_voted_this_round:
+            return None
+        self.has_voted_this_round = True
+        self.log(f"[CLIENT] Votando em '{self.voting_cards[index]}'.")
+        return {"action": "vote", "id": self.voting_ids[index]}
+
+    async def send_submit(self, index: int) -> bool:
+        """Submete a carta `index` da mão; False se não for possível nesta rodada."""
+        message = self.submit_message(index)
+        if message is None:
+            return False
+        try:
+            await self.send(message)
+        except Exception as e:
+            print(f"[CLIENT ERROR] Erro ao enviar submit_white_card: {e}")
+        return True
+
+    async def send_vote(self, index: int) -> bool:
+        """Vota na carta `index` da votação; False se não for possível nesta rodada."""
+        message = self.vote_message(index)
+        if message is None:
+            return False
+        try:
+            await self.send(message)
+        except Exception as e:
+            print(f"[CLIENT ERROR] Erro ao enviar vote: {e}")
+        return True
+
+    # --- Mensagens do servidor ---
+
+    async def handle_server_message(self, data):
+        action = data.get("action")
+        if action == "batch":
+            # Várias mensagens num único frame: processa na ordem em que foram enviadas
+            for message in data.get("messages", []):
+                await self.handle_server_message(message)
+            return
+        for reply in self.apply_server_message(data):
+            await self.send(reply)
+        await self.on_action(action, data)
+
+    def apply_server_message(self, data) -> List[Dict[str, Any]]:
+        """Aplica uma mensagem (que não seja "batch") ao estado; devolve as mensagens a responder."""
+        action = data.get("action")
+        if self.verbose:
+            print(f"[CLIENT] Received action: {action} - Data: {data}")
+
+        if action == "game_state_update":
+            old_state = self.game_state
+            self.game_state = data.get("state", "disconnected")
+            if self.game_state == "waiting_for_players" and old_state != "waiting_for_players":
+                if old_state == "game_over":
+                    # Revanche: a sala continua a mesma, só a partida recomeça
+                    self.round_result = {}
+                self.notify("Aguardando mais jogadores...")
+            elif self.game_state == "in_game" and old_state != "in_game":
+                self.notify("O jogo começou!", "success")
+
+            # **CORREÇÃO CRÍTICA 1:** Resetar flags quando o estado de jogo transiciona para um estado final/de rodada
+            if self.game_state in ["round_result", "game_over"]:
+                self.has_submitted_this_round = False
+                self.has_voted_this_round = False
+                self.reset_selection(hand=True, vote=True)
+                self.log(f"[CLIENT] Flags de submissão/voto resetadas no state_update para '{self.game_state}'.")
+
+        elif action == "catalogo":
+            if "brancas" in data:
+                self.catalog = {"versao": data["versao"], "brancas": data["brancas"], "pretas": data["pretas"]}
+                save_cached_catalog(self.catalog)
+                self.log(f"[CLIENT] Catálogo {data['versao']} recebido e salvo em cache.")
+
+        elif action == "nova_mao":
+            self.hand_seq = data.get("seq", 0)
+            self.hand_ids = data.get("ids", [])
+            self.hand = [self.catalog["brancas"][i] for i in self.hand_ids]
+            self.reset_selection(hand=True)
+            self.notify("Você recebeu uma nova mão!")
+
+        elif action == "mao_delta":
+            if data.get("seq") != self.hand_seq + 1:
+                # Perdemos alguma mensagem de mão: pede a mão inteira de novo
+                print(f"[CLIENT] Buraco na sequência da mão ({self.hand_seq} -> {data.get('seq')}). Pedindo resync.")
+                return [{"action": "resync_mao"}]
+            self.hand_seq = data["seq"]
+            for card_id in data.get("cards_removed", []):
+                if card_id in self.hand_ids:
+                    i = self.hand_ids.index(card_id)
+                    del self.hand_ids[i]
+                    del self.hand[i]
+            for card_id in data.get("cards_added", []):
+                self.hand_ids.append(card_id)
+                self.hand.append(self.catalog["brancas"][card_id])
+            self.reset_selection(hand=True)
+            if data.get("cards_added"):
+                self.notify("Você recebeu novas cartas!")
+
+        elif action == "scores_update":
+            # Placar completo (ao entrar ou após resync)
+            self.scores = data.get("scores", {})
+            self.scores_version = data.get("versao", 0)
+
+        elif action == "scores_delta":
+            if data.get("versao") != self.scores_version + 1:
+                print(f"[CLIENT] Buraco na versão do placar ({self.scores_version} -> {data.get('versao')}). Pedindo resync.")
+                return [{"action": "resync_placar"}]
+            self.scores_version = data["versao"]
+            for player_id, entry in data.get("scores", {}).items():
+                if entry is None:
+                    self.scores.pop(player_id, None)
+                else:
+                    self.scores[player_id] = entry
+
+        elif action == "codigo_sala":
+            self.room_code = data.get("sala", "")
+            self.notify(f"Você está na sala: {self.room_code}")
+
+        elif action == "relogio":
+            # Offset entre o relógio do servidor e o local (a latência da conexão fica de fora)
+            self.clock_offset = data["agora"] / 1000 - time.monotonic()
+
+        elif action == "countdown":
+            self.countdown = data.get("seconds", 0)
+            if data.get("deadline") is not None:
+                self.countdown_deadline = data["deadline"] / 1000 - self.clock_offset
+            self.notify(f"Jogo começando em: {self.countdown}", "highlight")
+
+        elif action == "prazo_fase":
+            self.phase_deadline = data["deadline"] / 1000 - self.clock_offset
+
+        elif action == "black_card":
+            if self.game_state == "round_result":
+                # Nova rodada: o servidor não reenvia o estado in_game depois do resultado
+                self.game_state = "in_game"
+            self.current_black_card = self.catalog["pretas"][data["id"]] if data.get("id") is not None else ""
+            self.submitted_count = 0
+            self.voting_cards = []
+            self.reset_selection(vote=True)
+            # **CORREÇÃO CRÍTICA 1.1:** Resetar flags aqui também para garantir, caso o state_update falhe.
+            self.has_submitted_this_round = False
+            self.has_voted_this_round = False
+            self.notify("Nova carta preta! Escolha sua melhor resposta.")
+
+        elif action == "white_card_submitted":
+            self.submitted_count = data.get("count", 0)
+            self.notify(f"{self.submitted_count} cartas submetidas.")
+
+        elif action == "start_vote":
+            self.voting_ids = data.get("ids", [])
+            self.voting_cards = [self.catalog["brancas"][i] for i in self.voting_ids]
+            self.reset_selection(vote=True)
+            self.game_state = "in_game" # Votação é uma sub-fase do in_game
+            self.notify("Hora de votar!", "highlight")
+            self.has_voted_this_round = False # Garante que pode votar na rodada de votação
+
+        elif action == "round_result":
+            self.round_result = {
+                "winner_card": self.catalog["brancas"][data["winner_id"]] if data.get("winner_id") is not None else "",
+                "winner_address": data.get("winner_address", "")
+            }
+            self.game_state = "round_result"
+            self.phase_deadline = None
+            self.notify(f"Vencedor da Rodada: {self.round_result['winner_address']}!", "success")
+            # As flags já devem ter sido resetadas pelo game_state_update para 'round_result'
+            # Mas, para garantir, vamos resetar aqui também se o 'game_state_update' for perdido
+            self.has_submitted_this_round = False
+            self.has_voted_this_round = False
+
+        elif action == "game_over":
+            self.round_result = {
+                "winner": data.get("winner", ""),
+                "score": data.get("score", "")
+            }
+            self.game_state = "game_over"
+            self.notify(f"Fim de Jogo! Vencedor: {self.round_result['winner']}.", "error")
+            self.has_submitted_this_round = False
+            self.has_voted_this_round = False
+
+        elif action == "next_round":
+            # **CORREÇÃO CRÍTICA 2:** Limpar o estado do cliente para a próxima rodada
+            self.log("[CLIENT] Recebido 'next_round'. Preparando para a nova rodada.")
+            self.voting_cards = [] # Limpa as cartas de votação da rodada anterior
+            self.reset_selection(hand=True, vote=True)
+            self.submitted_count = 0
+            self.notify("Iniciando próxima rodada...")
+            # As flags de submissão/voto já foram resetadas quando entrou em "round_result" ou "game_over"
+
+        elif action == "get_nome":
+            return [{"action": "nome", "nome": self.player_name}]
+
+        elif action == "error":
+            self.notify(f"Erro do Servidor: {data.get('reason', 'Desconhecido')}", "error")
+            print(f"[CLIENT ERROR] Server Error: {data.get('reason', 'Desconhecido')}")
+
+        return []
+
+
+class ScriptedSession(GameSession):
+    """Jogador roteirizado: submete uma carta aleatória e vota numa carta que não é a sua."""
+
+    def __init__(self, name, room_code, games=1, catalog=None):
+        super().__init__(catalog)
+        self.player_name = name
+        self.room_code = room_code
+        self.games = games
+        self.games_played = 0
+        self.rounds_played = 0
+        self.my_card = None
+
+    async def on_action(self, action, data):
+        if action == "black_card" and self.hand:
+            index = random.randrange(len(self.hand))
+            self.my_card = self.hand_ids[index]
+            await self.send_submit(index)
+        elif action == "start_vote" and self.voting_ids:
+            others = [i for i, card_id in enumerate(self.voting_ids) if card_id != self.my_card] or [0]
+            await self.send_vote(random.choice(others))
+        elif action == "round_result":
+            self.rounds_played += 1
+        elif action == "game_over":
+            self.games_played += 1
+            if self.games_played >= self.games:
+                await self.close()
+
+
+async def soak(args):
+    catalog = load_cached_catalog() # Um catálogo para todas as sessões
+    sessions = [ScriptedSession(f"bot-{i}", args.sala, args.partidas, catalog) for i in range(args.sessoes)]
+    start = time.perf_counter()
+    await asyncio.gather(*[s.websocket_client(args.host, args.porta) for s in sessions])
+    elapsed = time.perf_counter() - start
+    rounds = max((s.rounds_played for s in sessions), default=0)
+    print(f"{len(sessions)} sessões, {rounds} rodadas, {min(s.games_played for s in sessions)} partidas em {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sessões roteirizadas jogando numa sala, num único event loop")
+    parser.add_argument("--sala", required=True)
+    parser.add_argument("--sessoes", type=int, default=10)
+    parser.add_argument("--partidas", type=int, default=1)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--porta", type=int, default=None, help="padrão: $PORT ou 4000")
+    args = parser.parse_args()
+    if args.sessoes < 1:
+        parser.error("--sessoes precisa ser pelo menos 1")
+    asyncio.run(soak(args))
@@ -7,7 +7,16 @@ const sala = params.get("sala")
 console.log(nome) // "adler"
 console.log(sala) // "8000"
 
-const WS_URL = `ws://localhost:10000` // Replace with server IP if not local
+// Catálogo de cartas em cache: o servidor manda só os IDs e o texto vem daqui
+const CATALOG_STORAGE_KEY = "catalogo_cartas"
+let catalog = loadCachedCatalog()
+let whiteCardIds = new Map(catalog ? catalog.brancas.map((texto, id) => [texto, id]) : [])
+
+// Todas as salas usam a mesma porta; o servidor escolhe a sala pelo caminho
+// cartas=ids pede o protocolo por IDs; catalogo=<versao> evita baixar o catálogo de novo;
+// lote=1 junta as mensagens de um mesmo instante num único frame "batch"
+const WS_URL = `ws://localhost:4000/sala/${encodeURIComponent(sala)}?cartas=ids&lote=1` +
+  (catalog ? `&catalogo=${catalog.versao}` : "") // Replace with server IP if not local
 
 // --- DOM Elements ---
 const statusMessage = document.getElementById("status-message")
@@ -41,15 +50,21 @@ const confettiContainer = document.getElementById("confetti-container")
 // --- Game State ---
 let gameState = "connecting"
 let myWhiteCards = ["resposta 1", "resposta 2", "resposta 3", "resposta 4", "outra resposta", "mais uma resposta"]
+let handSeq = 0 // Última mensagem de mão aplicada (nova_mao/mao_delta)
 let currentBlackCardText = ""
 let selectableSubmittedCardsTexts = []
 let selectedWhiteCardText = null
 let selectedSubmittedCardText = null
-let allScores = {}
+let allScores = {} // {id do jogador: [nome, pontos]} (nomes podem se repetir)
+let scoresVersion = 0
 let roundWinnerCard = ""
 let roundWinnerAddress = ""
 const myAddress = ""
 let hasSubmittedThisRound = false
+let clockOffset = 0 // Relógio do servidor - performance.now(), em ms
+let countdownDeadline = null // Prazo do countdown no relógio local (performance.now())
+let countdownInterval = null
+let phaseDeadline = null // Prazo da fase da rodada (envio/votação) no relógio local
 
 // Variáveis para o showcase
 let showcaseCards = []
@@ -65,6 +80,29 @@ let bestCardPlayer = ""
 // Declaring jogadorNome variable
 let jogadorNome
 
+// --- Card Catalog ---
+function loadCachedCatalog() {
+  try {
+    return JSON.parse(localStorage.getItem(CATALOG_STORAGE_KEY))
+  } catch (error) {
+    return null
+  }
+}
+
+function setCatalog(message) {
+  catalog = { versao: message.versao, brancas: message.brancas, pretas: message.pretas }
+  whiteCardIds = new Map(catalog.brancas.map((texto, id) => [texto, id]))
+  try {
+    localStorage.setItem(CATALOG_STORAGE_KEY, JSON.stringify(catalog))
+  } catch (error) {
+    console.warn("Não foi possível salvar o catálogo:", error)
+  }
+}
+
+function whiteCardText(id) {
+  return catalog.brancas[id]
+}
+
 // --- WebSocket Connection ---
 let websocket
 
@@ -241,7 +279,8 @@ function showVictoryScreen(winner, scores) {
   winnerNameElement.textContent = winner
   
   // Encontrar a pontuação do vencedor
-  const winnerScore = scores[winner] || 0
+  const winnerEntry = Object.values(scores).find(([player]) => player === winner)
+  const winnerScore = winnerEntry ? winnerEntry[1] : 0
   winnerScoreElement.textContent = `${winnerScore} pontos`
   
   // Preencher lista de pontuações final
@@ -261,11 +300,19 @@ function showVictoryScreen(winner, scores) {
   createConfetti()
 }
 
+function hideVictoryScreen() {
+  victoryScreen.style.display = "none"
+  confettiContainer.innerHTML = ""
+  bestCard = ""
+  bestCardPlayer = ""
+  gameWinner = ""
+}
+
 function updateFinalScoresList(scores, winner) {
   finalScoresList.innerHTML = ""
   
   // Ordenar pontuações em ordem decrescente
-  const sortedScores = Object.entries(scores).sort(([, scoreA], [, scoreB]) => scoreB - scoreA)
+  const sortedScores = Object.values(scores).sort(([, scoreA], [, scoreB]) => scoreB - scoreA)
   
   sortedScores.forEach(([player, score]) => {
     const listItem = document.createElement("li")
@@ -347,21 +394,76 @@ function createConfetti() {
   }
 }
 
+// --- Countdown ---
+// O servidor manda só o prazo final; a contagem é exibida localmente
+function startLocalCountdown(deadline) {
+  countdownDeadline = deadline - clockOffset
+  stopLocalCountdown()
+  renderCountdown()
+  countdownInterval = setInterval(renderCountdown, 250)
+}
+
+function stopLocalCountdown() {
+  if (countdownInterval !== null) {
+    clearInterval(countdownInterval)
+    countdownInterval = null
+  }
+}
+
+function renderCountdown() {
+  const seconds = Math.max(0, Math.ceil((countdownDeadline - performance.now()) / 1000))
+  countdownDisplay.textContent = seconds
+  countdownDisplay.style.display = "block"
+  statusMessage.textContent = `Jogo iniciando em ${seconds} segundos...`
+  if (seconds === 0) {
+    stopLocalCountdown()
+  }
+}
+
 // --- Message Handling ---
 function handleMessage(message) {
   const action = message.action
 
   switch (action) {
+    case "batch":
+      // Várias mensagens num único frame: processa na ordem em que foram enviadas
+      message.messages.forEach(handleMessage)
+      break
+
+    case "catalogo":
+      // Sem "brancas" a versão em cache ainda é a atual
+      if (message.brancas) {
+        setCatalog(message)
+      }
+      break
+
     case "game_state_update":
+      // Revanche: a sala sai de game_over sem derrubar a conexão
+      if (gameState === "game_over" && message.state !== "game_over") {
+        hideVictoryScreen()
+      }
       gameState = message.state
+      if (gameState !== "starting_countdown") {
+        // Countdown cancelado ou concluído
+        stopLocalCountdown()
+      }
       console.log(`Game state changed to: ${gameState}`)
       updateUI()
       break
 
+    case "relogio":
+      // Offset entre o relógio do servidor e o local (a latência da conexão fica de fora)
+      clockOffset = message.agora - performance.now()
+      break
+
     case "countdown":
-      countdownDisplay.textContent = message.seconds
-      countdownDisplay.style.display = "block"
-      statusMessage.textContent = `Jogo iniciando em ${message.seconds} segundos...`
+      startLocalCountdown(message.deadline)
+      break
+
+    case "prazo_fase":
+      // Depois do prazo o servidor joga/vota por quem não jogou
+      phaseDeadline = message.deadline - clockOffset
+      console.log(`Phase "${message.fase}" ends in ${Math.round((phaseDeadline - performance.now()) / 1000)}s`)
       break
 
     case "next_round":
@@ -378,7 +480,7 @@ function handleMessage(message) {
       break
 
     case "black_card":
-      currentBlackCardText = message.card
+      currentBlackCardText = message.id != null ? catalog.pretas[message.id] : ""
       gameState = "choosing_white_card"
       statusMessage.textContent = "Escolha uma carta preta."
       updateUI()
@@ -389,7 +491,7 @@ function handleMessage(message) {
       break
 
     case "start_vote":
-      selectableSubmittedCardsTexts = message.cards
+      selectableSubmittedCardsTexts = message.ids.map(whiteCardText)
       selectedSubmittedCardText = null
 
       // Iniciar showcase em vez de ir direto para votação
@@ -405,7 +507,7 @@ function handleMessage(message) {
       break
 
     case "round_result":
-      roundWinnerCard = message.winner_card
+      roundWinnerCard = message.winner_id != null ? whiteCardText(message.winner_id) : ""
       roundWinnerAddress = message.winner_address
       
       // Armazenar a melhor carta para a tela de vitória
@@ -421,7 +523,26 @@ function handleMessage(message) {
       break
 
     case "scores_update":
+      // Placar completo (ao entrar ou após resync)
       allScores = message.scores
+      scoresVersion = message.versao
+      updateScoresDisplay()
+      break
+
+    case "scores_delta":
+      if (message.versao !== scoresVersion + 1) {
+        console.warn(`Scoreboard version gap (${scoresVersion} -> ${message.versao}). Requesting resync.`)
+        sendMessage({ action: "resync_placar" })
+        break
+      }
+      scoresVersion = message.versao
+      for (const [playerId, entry] of Object.entries(message.scores)) {
+        if (entry === null) {
+          delete allScores[playerId]
+        } else {
+          allScores[playerId] = entry
+        }
+      }
       updateScoresDisplay()
       break
 
@@ -440,7 +561,23 @@ function handleMessage(message) {
       break
 
     case "nova_mao":
-      myWhiteCards = message.cartas
+      handSeq = message.seq
+      myWhiteCards = message.ids.map(whiteCardText)
+      break
+
+    case "mao_delta":
+      if (message.seq !== handSeq + 1) {
+        // Perdemos alguma mensagem de mão: pede a mão inteira de novo
+        console.warn(`Hand sequence gap (${handSeq} -> ${message.seq}). Requesting resync.`)
+        sendMessage({ action: "resync_mao" })
+        break
+      }
+      handSeq = message.seq
+      if (message.cards_removed.length > 0) {
+        const removed = new Set(message.cards_removed.map(whiteCardText))
+        myWhiteCards = myWhiteCards.filter((text) => !removed.has(text))
+      }
+      myWhiteCards.push(...message.cards_added.map(whiteCardText))
       break
 
     case "get_nome":
@@ -622,7 +759,7 @@ function displaySubmittedCardsForVoting() {
 
 function updateScoresDisplay() {
   scoresList.innerHTML = ""
-  const sortedScores = Object.entries(allScores).sort(([, scoreA], [, scoreB]) => scoreB - scoreA)
+  const sortedScores = Object.values(allScores).sort(([, scoreA], [, scoreB]) => scoreB - scoreA)
 
   if (sortedScores.length === 0) {
     return
@@ -641,7 +778,7 @@ function updateScoresDisplay() {
 // --- Button Event Listeners ---
 submitButton.addEventListener("click", () => {
   if (!hasSubmittedThisRound && selectedWhiteCardText && gameState === "choosing_white_card") {
-    sendMessage({ action: "submit_white_card", card: selectedWhiteCardText })
+    sendMessage({ action: "submit_white_card", id: whiteCardIds.get(selectedWhiteCardText) })
     hasSubmittedThisRound = true
     submitButton.disabled = true
     whiteCardsContainer.querySelectorAll(".white-card").forEach((card) => {
@@ -660,7 +797,7 @@ submitButton.addEventListener("click", () => {
 
 voteButton.addEventListener("click", () => {
   if (selectedSubmittedCardText && gameState === "voting") {
-    sendMessage({ action: "vote", card: selectedSubmittedCardText })
+    sendMessage({ action: "vote", id: whiteCardIds.get(selectedSubmittedCardText) })
     voteButton.disabled = true
     whiteCardsContainer.querySelectorAll(".white-card").forEach((card) => {
       card.style.pointerEvents = "none"
@@ -680,8 +817,9 @@ voteButton.addEventListener("click", () => {
 
 // Botão "Jogar Novamente"
 playAgainButton.addEventListener("click", () => {
-  // Recarregar a página para reiniciar o jogo
-  window.location.reload()
+  // A sala inicia a revanche sozinha com quem continua conectado; não é preciso reconectar
+  hideVictoryScreen()
+  statusMessage.textContent = "Aguardando a próxima partida..."
 })
 
 function showEmojiEffect(event) {